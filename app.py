@@ -9,10 +9,9 @@ from src.content import (
     METHODOLOGY_TEXT,
     SUPPORT_TEXT,
 )
-
-from src.expert import expert_mode
-from src.calculator import calculator_mode
-from src.token_estimator import token_estimator
+from src.debug import debug_enabled, debug_panel, record_trace
+from src.tracing import finish_trace, start_trace
+from src.warmup import StartupBudgetExceeded, StartupReport, warm_up
 
 st.set_page_config(layout="wide", page_title="EcoLogits Calculator", page_icon="🧮")
 
@@ -21,36 +20,95 @@ with open("src/style.css") as css:
 
 st.html(HERO_TEXT)
 
-tab_calculator, tab_expert, tab_token, tab_method, tab_about, tab_support = st.tabs(
-    [
-        "🧮 Calculator",
-        "🤓 Expert Mode",
-        "🪙 Tokens estimator",
-        "📖 Methodology",
-        "ℹ️ About",
-        "🩷 Support us",
-    ]
-)
 
-with tab_calculator:
+@st.cache_resource(show_spinner="Warming up the calculator...")
+def startup_report() -> StartupReport:
+    # Runs once per server process. Going over ECOLOGITS_STARTUP_BUDGET is returned rather
+    # than raised: exceptions are not cached, and the next rerun would warm up again.
+    try:
+        return warm_up()
+    except StartupBudgetExceeded as e:
+        return e.report
+
+
+startup = startup_report()
+if startup.over_budget:
+    st.error(f"The calculator took {startup.total:.3g}s to start, over its {startup.budget:g}s budget.")
+    st.code(startup.format(), language=None)
+    st.stop()
+
+
+@st.cache_resource
+def data_watchers():
+    # Reloads the throughputs and electricity mixes files when they change
+    from src.datasources import start_watchers
+    return start_watchers()
+
+
+data_watchers()
+
+
+# Only the selected page runs on each rerun. Views are imported when first shown so that
+# their heavy dependencies (ecologits, plotly, tiktoken) are only loaded when needed.
+
+def calculator_page():
+    from src.calculator import calculator_mode
     calculator_mode()
 
-with tab_expert:
+
+def expert_page():
+    from src.expert import expert_mode
     expert_mode()
 
-with tab_token:
+
+def workload_page():
+    from src.workload import workload_mode
+    workload_mode()
+
+
+def token_page():
+    from src.token_estimator import token_estimator
     token_estimator()
 
-with tab_method:
+
+def methodology_page():
     st.write(METHODOLOGY_TEXT)
 
-with tab_about:
+
+def about_page():
     st.markdown(ABOUT_TEXT, unsafe_allow_html=True)
 
-with tab_support:
+
+def support_page():
     st.markdown(SUPPORT_TEXT, unsafe_allow_html=True)
 
 
+page = st.navigation(
+    [
+        st.Page(calculator_page, title="Calculator", icon="🧮", url_path="calculator", default=True),
+        st.Page(expert_page, title="Expert Mode", icon="🤓", url_path="expert"),
+        st.Page(workload_page, title="Workload", icon="📈", url_path="workload"),
+        st.Page(token_page, title="Tokens estimator", icon="🪙", url_path="tokens"),
+        st.Page(methodology_page, title="Methodology", icon="📖", url_path="methodology"),
+        st.Page(about_page, title="About", icon="ℹ️", url_path="about"),
+        st.Page(support_page, title="Support us", icon="🩷", url_path="support"),
+    ],
+    position="top",
+)
+
+# Spans of every stage of the rerun, shown in a debug panel with `?debug` in the URL
+debug = debug_enabled()
+trace = start_trace(page.title) if debug else None
+try:
+    page.run()
+finally:
+    if trace is not None:
+        record_trace(finish_trace(trace))
+
+if debug:
+    debug_panel(startup)
+
+
 with st.expander("📚 Citation"):
     st.html(CITATION_LABEL)
     st.code(CITATION_TEXT, language="bibtex")
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks of the calculator's hot paths.
+
+Usage (from the root of the repository):
+    python -m benchmarks run --output benchmarks/baselines/local.json
+    python -m benchmarks compare benchmarks/baselines/local.json current.json --threshold 0.2
+"""
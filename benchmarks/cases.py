@@ -0,0 +1,344 @@
+"""
+Benchmark cases. Each case is a setup function returning the callable to time, so
+that loading data and warming caches are not measured.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROVIDER = "openai"
+MODEL = "gpt-4o"
+OUTPUT_TOKENS = 500
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    setup: Callable[[], Callable[[], object]]
+    # Calls per measurement and measurements, calibrated / from the command line when None
+    number: int | None = None
+    repeat: int | None = None
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, number: int | None = None, repeat: int | None = None):
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(setup=setup, number=number, repeat=repeat)
+        return setup
+    return register
+
+
+def _impacts():
+    from ecologits.tracers.utils import llm_impacts
+
+    return llm_impacts(provider=PROVIDER, model_name=MODEL, output_token_count=OUTPUT_TOKENS, request_latency=6.)
+
+
+#####################################################################################
+### MODELS
+#####################################################################################
+
+
+@benchmark("models.load_models.cold")
+def _():
+    from src.catalog import build_models, get_catalog
+
+    def run():
+        get_catalog.cache_clear()
+        return build_models(filter_main=True)
+    return run
+
+
+@benchmark("models.load_models.warm")
+def _():
+    from src.catalog import build_models
+
+    return lambda: build_models(filter_main=True)
+
+
+@benchmark("models.catalog.find_by_display_name")
+def _():
+    from src.catalog import get_catalog
+
+    catalog = get_catalog(filter_main=True)
+    record = next(iter(catalog))
+    return lambda: catalog.find_by_display_name(record.provider_clean, record.name_clean)
+
+
+@benchmark("models.catalog.providers_models")
+def _():
+    from src.catalog import get_catalog
+
+    catalog = get_catalog(filter_main=True)
+    return lambda: [catalog.models(p) for p in catalog.providers]
+
+
+@benchmark("latency.estimate")
+def _():
+    from src.latency_estimator import latency_estimator
+
+    return lambda: latency_estimator.estimate(provider=PROVIDER, model_name=MODEL, output_tokens=OUTPUT_TOKENS)
+
+
+#####################################################################################
+### IMPACTS
+#####################################################################################
+
+
+@benchmark("impacts.llm_impacts")
+def _():
+    return _impacts
+
+
+@benchmark("impacts.compute_llm_impacts")
+def _():
+    from ecologits.impacts.llm import compute_llm_impacts
+
+    return lambda: compute_llm_impacts(
+        model_active_parameter_count=70,
+        model_total_parameter_count=70,
+        output_token_count=OUTPUT_TOKENS,
+        request_latency=6.,
+        if_electricity_mix_adpe=7.37708e-8,
+        if_electricity_mix_pe=9.988,
+        if_electricity_mix_gwp=0.38,
+        if_electricity_mix_wue=3.14,
+        datacenter_pue=1.2,
+        datacenter_wue=0.6,
+    )
+
+
+@benchmark("impacts.cached_llm_impacts.hit")
+def _():
+    from src.cache import cached_llm_impacts
+
+    return lambda: cached_llm_impacts(PROVIDER, MODEL, OUTPUT_TOKENS)
+
+
+@benchmark("impacts.compute_llm_impacts_batch.10k")
+def _():
+    import numpy as np
+    from src.engine import compute_llm_impacts_batch
+
+    rng = np.random.default_rng(0)
+    active = rng.uniform(1, 400, 10_000)
+    tokens = rng.integers(1, 2000, 10_000)
+    return lambda: compute_llm_impacts_batch(
+        model_active_parameter_count=active,
+        model_total_parameter_count=active * 2,
+        output_token_count=tokens,
+        request_latency=tokens / 80.,
+        if_electricity_mix_adpe=7.37708e-8,
+        if_electricity_mix_pe=9.988,
+        if_electricity_mix_gwp=0.38,
+        if_electricity_mix_wue=3.14,
+        datacenter_pue=1.2,
+        datacenter_wue=0.6,
+    )
+
+
+@benchmark("impacts.coefficients.impacts")
+def _():
+    from src.coefficients import extract_coefficients
+
+    coefficients = extract_coefficients(70., 70., 7.37708e-8, 9.988, 0.38, 3.14, 1.2, 0.6)
+    return lambda: coefficients.impacts(OUTPUT_TOKENS, 6.)
+
+
+@benchmark("impacts.coefficients.evaluate.10k")
+def _():
+    import numpy as np
+    from src.coefficients import extract_coefficients
+
+    coefficients = extract_coefficients(70., 70., 7.37708e-8, 9.988, 0.38, 3.14, 1.2, 0.6)
+    tokens = np.random.default_rng(0).integers(1, 2000, 10_000)
+    return lambda: coefficients.evaluate(tokens, tokens / 80.)
+
+
+@benchmark("impacts.expert_graph.wue_change")
+def _():
+    import itertools
+    from src.catalog import get_catalog
+    from src.expert_graph import expert_graph
+
+    evaluation = expert_graph.evaluation()
+    evaluation.set(
+        data_version="",
+        provider="OpenAI",
+        model=get_catalog().models("OpenAI")[0],
+        active_parameters=70,
+        total_parameters=70,
+        throughput=80.,
+        output_tokens=OUTPUT_TOKENS,
+        datacenter_pue=1.2,
+        datacenter_wue=0.6,
+        electricity_mix_gwp=0.38,
+        electricity_mix_adpe=7.37708e-8,
+        electricity_mix_pe=9.988,
+        electricity_mix_wue=3.14,
+    )
+    evaluation["impacts"], evaluation["location_impacts"]
+    wue = itertools.cycle([0.5, 0.6])
+
+    def run():
+        evaluation.set(datacenter_wue=next(wue))
+        return evaluation["impacts"], evaluation["location_impacts"]
+    return run
+
+
+@benchmark("impacts.score_workload")
+def _():
+    import pandas as pd
+    from src.projection import score_workload
+
+    workload = pd.DataFrame({
+        "provider": ["openai", "openai", "anthropic", "mistralai"],
+        "model": ["gpt-4o", "gpt-4o-mini", "claude-opus-4-1", "mistral-large-latest"],
+        "requests_per_day": [20e6, 10e6, 2e6, 3e6],
+        "output_tokens": [400, 250, 800, 300],
+        "tokens_spread": [0.2, 0., 0.1, 0.],
+    })
+    return lambda: score_workload(workload)
+
+
+#####################################################################################
+### FORMATTING
+#####################################################################################
+
+
+@benchmark("format.format_impacts")
+def _():
+    from src.utils import format_impacts
+
+    impacts = _impacts()
+    return lambda: format_impacts(impacts)
+
+
+@benchmark("format.equivalents")
+def _():
+    from src.utils import (
+        format_energy_eq_electric_vehicle,
+        format_energy_eq_electricity_consumption_ireland,
+        format_energy_eq_electricity_production,
+        format_energy_eq_physical_activity,
+        format_gwp_eq_airplane_paris_nyc,
+        format_gwp_eq_streaming,
+        format_impacts,
+    )
+
+    formatted, _, _ = format_impacts(_impacts())
+
+    def run():
+        format_energy_eq_physical_activity(formatted.energy)
+        format_energy_eq_electric_vehicle(formatted.energy)
+        format_gwp_eq_streaming(formatted.gwp)
+        format_energy_eq_electricity_production(formatted.energy)
+        format_energy_eq_electricity_consumption_ireland(formatted.energy)
+        format_gwp_eq_airplane_paris_nyc(formatted.gwp)
+    return run
+
+
+@benchmark("format.equivalence_engine")
+def _():
+    from src.equivalences import equivalence_engine
+
+    impacts = _impacts()
+    return lambda: equivalence_engine.compute_one(impacts.energy.value.mean, impacts.gwp.value.mean)
+
+
+@benchmark("format.equivalence_engine.10k")
+def _():
+    import numpy as np
+    from src.equivalences import equivalence_engine
+
+    rng = np.random.default_rng(0)
+    energy = rng.uniform(1e-6, 1e-2, 10_000)
+    return lambda: equivalence_engine.compute(energy, energy * 0.4)
+
+
+@benchmark("format.range_plot")
+def _():
+    from src.utils import range_plot
+
+    # Outside of a Streamlit run, `st.plotly_chart` only logs that there is no session
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    return lambda: range_plot(0.0125, 0.009, 0.016, "kgCO2eq")
+
+
+@benchmark("format.range_svg")
+def _():
+    from src.charts import range_svg
+
+    # Uncached, as on the first render of a value
+    return lambda: range_svg.__wrapped__(0.0125, 0.009, 0.016, "kgCO2eq")
+
+
+#####################################################################################
+### TOKENS
+#####################################################################################
+
+
+@benchmark("tokens.num_tokens_from_string.short")
+def _():
+    from src.token_estimator import num_tokens_from_string
+
+    return lambda: num_tokens_from_string("EcoLogits is a great project!", "cl100k_base")
+
+
+@benchmark("tokens.num_tokens_from_string.1mb")
+def _():
+    from src.token_estimator import num_tokens_from_string
+
+    with open(os.path.join(ROOT, "src", "content.py"), encoding="utf-8") as fd:
+        text = fd.read()
+    text = (text * (1_000_000 // len(text) + 1))[:1_000_000]
+    return lambda: num_tokens_from_string(text, "cl100k_base")
+
+
+#####################################################################################
+### END TO END
+#####################################################################################
+
+
+def _calculator_view(root: str) -> None:
+    import sys
+    sys.path.insert(0, root)
+    from src.calculator import calculator_mode
+    calculator_mode()
+
+
+def _expert_view(root: str) -> None:
+    import sys
+    sys.path.insert(0, root)
+    from src.expert import expert_mode
+    expert_mode()
+
+
+def _rerun(view):
+    from streamlit.testing.v1 import AppTest
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    app = AppTest.from_function(view, args=(ROOT,), default_timeout=60)
+    app.run()
+
+    def run():
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].value)
+    return run
+
+
+@benchmark("app.calculator_mode.rerun", number=1, repeat=5)
+def _():
+    return _rerun(_calculator_view)
+
+
+@benchmark("app.expert_mode.rerun", number=1, repeat=5)
+def _():
+    return _rerun(_expert_view)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from benchmarks.cases import BENCHMARKS
+
+DEFAULT_THRESHOLD = 0.2
+# Each measurement runs the case for at least this long to smooth out the clock resolution
+MIN_MEASURE_TIME = 0.2
+PACKAGES = ["ecologits", "numpy", "pandas", "pint", "plotly", "streamlit", "tiktoken"]
+
+
+@dataclass
+class Result:
+    name: str
+    number: int
+    times: list[float]
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    def to_dict(self) -> dict:
+        return {"number": self.number, "best": self.best, "median": self.median, "times": self.times}
+
+
+def _calibrate(func, min_time: float) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def measure(name: str, func, repeat: int, number: int | None = None, min_time: float = MIN_MEASURE_TIME) -> Result:
+    """Seconds per call of `func`, `repeat` times, like `timeit` (garbage collector disabled)."""
+    func()  # warm-up
+    if number is None:
+        number = _calibrate(func, min_time)
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            times.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return Result(name=name, number=number, times=times)
+
+
+def _environment() -> dict:
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = version(package)
+        except PackageNotFoundError:
+            packages[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "packages": packages,
+    }
+
+
+def run(pattern: str | None = None, repeat: int = 5) -> dict:
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        func = benchmark.setup()
+        result = measure(name, func, repeat=benchmark.repeat or repeat, number=benchmark.number)
+        print(f"{name:<45} {_format_time(result.median):>10}  (best {_format_time(result.best)}, {result.number} loops)",
+              file=sys.stderr)
+        results[name] = result.to_dict()
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": _environment(), "results": results}
+
+
+def compare(
+        baseline: dict,
+        current: dict,
+        threshold: float = DEFAULT_THRESHOLD,
+        pattern: str | None = None,
+) -> list[tuple[str, float | None, float | None, float | None]]:
+    """
+    Return `(name, baseline, current, ratio)` for every benchmark of either run (whose
+    name contains `pattern`), comparing the best times (the least noisy). Ratios above
+    `1 + threshold` are regressions. The time and ratio are None for a benchmark
+    missing from one of the runs.
+    """
+    names = list(baseline["results"]) + [name for name in current["results"] if name not in baseline["results"]]
+    rows = []
+    for name in names:
+        if pattern and pattern not in name:
+            continue
+        reference, result = baseline["results"].get(name), current["results"].get(name)
+        if reference is None or result is None:
+            rows.append((name, reference and reference["best"], result and result["best"], None))
+        else:
+            rows.append((name, reference["best"], result["best"], result["best"] / reference["best"]))
+    return rows
+
+
+def _format_time(seconds: float) -> str:
+    for unit, factor in (("s", 1), ("ms", 1e3), ("µs", 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.3g} {unit}"
+    return f"{seconds * 1e9:.3g} ns"
+
+
+def _load(path: str) -> dict:
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def _report(rows, threshold: float) -> bool:
+    """Print the comparison, return whether there are regressions or benchmarks missing from the current run."""
+    regressions = False
+    for name, reference, current, ratio in rows:
+        if current is None:
+            print(f"{name:<45} {_format_time(reference):>10} -> {'-':>10}  {'':7}  MISSING")
+            regressions = True
+            continue
+        if reference is None:
+            print(f"{name:<45} {'-':>10} -> {_format_time(current):>10}  {'':7}  new")
+            continue
+        status = ""
+        if ratio > 1 + threshold:
+            status, regressions = "REGRESSION", True
+        elif ratio < 1 - threshold:
+            status = "improved"
+        print(f"{name:<45} {_format_time(reference):>10} -> {_format_time(current):>10}  {ratio:6.2f}x  {status}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the calculator's hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write the results as JSON")
+    run_parser.add_argument("--output", default=None, help="JSON file to write (stdout by default)")
+    run_parser.add_argument("--filter", default=None, help="Only run the benchmarks whose name contains this")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--compare", default=None, help="Baseline JSON to compare the results with")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files, fail on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative slowdown flagged as a regression (0.2 = 20%%)")
+    compare_parser.add_argument("--filter", default=None, help="Only compare the benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(pattern=args.filter, repeat=args.repeat)
+        if args.output:
+            Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+            with open(args.output, "w") as fd:
+                json.dump(results, fd, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+        baseline = _load(args.compare) if args.compare else None
+    else:
+        baseline, results = _load(args.baseline), _load(args.current)
+
+    if baseline is not None:
+        if _report(compare(baseline, results, args.threshold, args.filter), args.threshold):
+            sys.exit(1)
@@ -1,9 +1,23 @@
-from .content import *
-from .constants import *
-from .expert import expert_mode
-from .token_estimator import token_estimator
-from .utils import *
-from .calculator import calculator_mode
-from .impacts import display_impacts
-from .models import load_models
-from .electricity_mix import *
+import importlib
+
+# Submodules are imported on first attribute access so that the Streamlit-free parts
+# of the package (engine, ingestion, API) can be imported without loading the UI.
+_UI_ATTRIBUTES = {
+    "expert_mode": ".expert",
+    "token_estimator": ".token_estimator",
+    "calculator_mode": ".calculator",
+    "display_impacts": ".impacts",
+    "load_models": ".models",
+}
+_STAR_MODULES = [".electricity_mix", ".utils", ".constants", ".content"]
+
+
+def __getattr__(name):
+    if name in _UI_ATTRIBUTES:
+        return getattr(importlib.import_module(_UI_ATTRIBUTES[name], __name__), name)
+    if not name.startswith("_"):
+        for module_name in _STAR_MODULES:
+            module = importlib.import_module(module_name, __name__)
+            if hasattr(module, name):
+                return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,290 @@
+"""
+Approximate totals of huge request volumes from histograms of output tokens.
+
+Instead of scoring every request, the requests of every model are counted in bins of
+output tokens and the impacts are computed with `llm_impacts` once per bin, at the
+mean tokens of the bin, and multiplied by its count. Bins are log-spaced with a
+tunable number of bins per decade, so the cost does not depend on the number of
+requests and the relative width of the bins is the same at every scale.
+
+The impacts of a request grow with its output tokens (latencies are estimated from
+the throughputs like in the calculator), so the impacts of a bin are bounded by the
+impacts at its smallest and largest tokens. The totals come with this error bound
+against exact per-request scoring.
+
+Histograms are built from CSV, JSONL or Parquet logs (`provider`, `model`,
+`output_tokens` and an optional `zone`), chunk by chunk, or read from a JSON file.
+
+Usage:
+    python -m src.aggregation requests.csv totals.csv --bins-per-decade 20
+    python -m src.aggregation histograms.json totals.csv --histograms
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from ecologits.tracers.utils import llm_impacts
+from ecologits.utils.range_value import RangeValue
+
+from src.ingestion import DEFAULT_CHUNK_SIZE, IMPACT_COLUMNS, read_logs, write_results
+from src.latency_estimator import latency_estimator
+
+DEFAULT_BINS_PER_DECADE = 20
+MAX_TOKENS = 1 << 20
+
+
+def token_bins(max_tokens: int = MAX_TOKENS, bins_per_decade: int = DEFAULT_BINS_PER_DECADE) -> np.ndarray:
+    """
+    Integer edges of log-spaced bins covering 0 to `max_tokens` output tokens, bin `i`
+    holding the requests with `edges[i] <= tokens < edges[i + 1]`. Small token counts
+    get one bin per integer.
+    """
+    count = max(1, math.ceil(math.log10(max_tokens + 1) * bins_per_decade))
+    edges = np.round(np.geomspace(1, max_tokens + 1, count + 1)).astype(np.int64)
+    return np.unique(np.concatenate([[0], edges]))
+
+
+#####################################################################################
+### HISTOGRAMS
+#####################################################################################
+
+
+@dataclass
+class TokenHistogram:
+    provider: str
+    model: str
+    edges: np.ndarray
+    counts: np.ndarray | None = None
+    token_sums: np.ndarray | None = None  # sum of the tokens of every bin, for the mean of the bin
+    zone: str | None = None
+    skipped: int = 0  # requests without output tokens or out of the bins, not counted
+
+    def __post_init__(self) -> None:
+        self.edges = np.asarray(self.edges, dtype=np.int64)
+        if self.counts is None:
+            self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+            self.token_sums = np.zeros(len(self.edges) - 1, dtype=np.float64)
+        self.counts = np.asarray(self.counts, dtype=np.int64)
+        if len(self.counts) != len(self.edges) - 1:
+            raise ValueError(f"Histogram of {self.provider}/{self.model} has {len(self.edges)} edges "
+                             f"for {len(self.counts)} bins.")
+        if self.token_sums is not None:
+            self.token_sums = np.asarray(self.token_sums, dtype=np.float64)
+
+    @property
+    def requests(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, tokens) -> None:
+        """Count requests with the given output tokens, skipping missing (NaN) or out of range ones."""
+        tokens = np.asarray(tokens, dtype=np.float64)
+        # NaN compares false, so missing tokens are out of the bins too
+        binned = (tokens >= self.edges[0]) & (tokens < self.edges[-1])
+        if not binned.all():
+            self.skipped += int((~binned).sum())
+            tokens = tokens[binned]
+        index = np.searchsorted(self.edges, tokens, side="right") - 1
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        if self.token_sums is not None:
+            self.token_sums += np.bincount(index, weights=tokens, minlength=len(self.counts))
+
+    def representatives(self) -> np.ndarray:
+        """Tokens at which every bin is evaluated: the mean of its requests, or its middle."""
+        lower, upper = self.edges[:-1], self.edges[1:] - 1
+        middle = (lower + upper) / 2
+        if self.token_sums is None:
+            return middle
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.token_sums / self.counts
+        return np.where(self.counts > 0, mean, middle)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "provider": self.provider,
+            "model": self.model,
+            "zone": self.zone,
+            "edges": self.edges.tolist(),
+            "counts": self.counts.tolist(),
+            "skipped": self.skipped,
+        }
+        if self.token_sums is not None:
+            data["token_sums"] = self.token_sums.tolist()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> TokenHistogram:
+        return cls(
+            provider=data["provider"],
+            model=data["model"],
+            edges=data["edges"],
+            counts=data["counts"],
+            token_sums=data.get("token_sums"),
+            zone=data.get("zone"),
+            skipped=data.get("skipped", 0),
+        )
+
+
+def histograms_from_logs(
+        path: str | Path,
+        edges: np.ndarray | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[TokenHistogram]:
+    """Histograms of the output tokens of every model (and zone) of a log file."""
+    edges = token_bins() if edges is None else edges
+    histograms: dict[tuple[str, str, str | None], TokenHistogram] = {}
+    for chunk in read_logs(path, chunk_size=chunk_size):
+        keys = ["provider", "model"] + (["zone"] if "zone" in chunk.columns else [])
+        for key, group in chunk.groupby(keys, dropna=False, sort=False):
+            provider, model = key[0], key[1]
+            zone = key[2] if len(key) > 2 and not pd.isna(key[2]) else None
+            histogram = histograms.get((provider, model, zone))
+            if histogram is None:
+                histogram = histograms[(provider, model, zone)] = TokenHistogram(provider, model, edges, zone=zone)
+            histogram.add(group["output_tokens"].to_numpy())
+    return list(histograms.values())
+
+
+def save_histograms(histograms: list[TokenHistogram], path: str | Path) -> None:
+    with open(path, "w") as fd:
+        json.dump({"histograms": [h.to_dict() for h in histograms]}, fd)
+
+
+def load_histograms(path: str | Path) -> list[TokenHistogram]:
+    with open(path) as fd:
+        return [TokenHistogram.from_dict(h) for h in json.load(fd)["histograms"]]
+
+
+#####################################################################################
+### AGGREGATION
+#####################################################################################
+
+
+def _bounds(value) -> tuple[float, float, float]:
+    if isinstance(value, RangeValue):
+        return float(value.mean), float(value.min), float(value.max)
+    return float(value), float(value), float(value)
+
+
+def _evaluate(provider: str, model: str, zone: str | None, tokens: np.ndarray) -> tuple[dict[str, np.ndarray], str | None]:
+    """Impacts of one request at every number of tokens (mean, min and max), or an error code."""
+    values = {f"{c}{s}": np.empty(len(tokens)) for c in IMPACT_COLUMNS for s in ("", "_min", "_max")}
+    latencies = latency_estimator.estimate_many(provider, model, tokens)
+    for i, (output_tokens, latency) in enumerate(zip(tokens.tolist(), latencies.tolist())):
+        impacts = llm_impacts(
+            provider=provider,
+            model_name=model,
+            output_token_count=output_tokens,
+            request_latency=latency,
+            electricity_mix_zone=zone,
+        )
+        if impacts.has_errors:
+            return {}, impacts.errors[0].code
+        for criterion in IMPACT_COLUMNS:
+            mean, low, high = _bounds(getattr(impacts, criterion).value)
+            values[criterion][i] = mean
+            values[f"{criterion}_min"][i] = low
+            values[f"{criterion}_max"][i] = high
+    return values, None
+
+
+def aggregate_histogram(histogram: TokenHistogram, electricity_mix_zone: str | None = None) -> dict[str, Any]:
+    """
+    Total impacts of the requests of a histogram (kWh, kgCO2eq, kgSbeq, MJ, L), with an
+    absolute `<criterion>_error` bound on the difference with exact per-request scoring.
+    """
+    zone = electricity_mix_zone or histogram.zone
+    row: dict[str, Any] = {
+        "provider": histogram.provider,
+        "model": histogram.model,
+        "zone": zone,
+        "requests": histogram.requests,
+    }
+    used = np.flatnonzero(histogram.counts)
+    counts = histogram.counts[used].astype(np.float64)
+    lower = histogram.edges[:-1][used].astype(np.float64)
+    upper = histogram.edges[1:][used].astype(np.float64) - 1
+    representative = histogram.representatives()[used]
+
+    # Every distinct number of tokens is evaluated once
+    points, index = np.unique(np.concatenate([lower, upper, representative]), return_inverse=True)
+    evaluations, error = _evaluate(histogram.provider, histogram.model, zone, points)
+    if error is not None:
+        return {**row, "error": error}
+    at_lower, at_upper, at_representative = np.split(index, 3)
+
+    for column, values in evaluations.items():
+        row[column] = float(np.dot(counts, values[at_representative]))
+        if column in IMPACT_COLUMNS:
+            spread = np.maximum(values[at_upper] - values[at_representative],
+                                values[at_representative] - values[at_lower])
+            row[f"{column}_error"] = float(np.dot(counts, spread))
+    row["error"] = None
+    return row
+
+
+def aggregate_histograms(
+        histograms: list[TokenHistogram],
+        electricity_mix_zone: str | None = None,
+) -> pd.DataFrame:
+    """Totals of every histogram and of all of them (last row, `TOTAL`), empty without histograms."""
+    columns = ["provider", "model", "zone", "requests"] + [
+        f"{c}{s}" for c in IMPACT_COLUMNS for s in ("", "_min", "_max", "_error")
+    ] + ["error"]
+    if not histograms:
+        return pd.DataFrame(columns=columns)
+    rows = [aggregate_histogram(h, electricity_mix_zone) for h in histograms]
+    df = pd.DataFrame(rows, columns=columns)
+    valid = df[df["error"].isna()]
+    total = {"provider": "TOTAL", "model": "", "zone": None, "requests": int(valid["requests"].sum())}
+    for column in df.columns:
+        if column.split("_")[0] in IMPACT_COLUMNS:
+            total[column] = valid[column].sum()
+    total["error"] = None
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True).reindex(columns=columns)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Approximate the total impacts of logs from histograms of output tokens.")
+    parser.add_argument("input", help="CSV, JSONL or Parquet logs, or histograms JSON with --histograms")
+    parser.add_argument("output", help="CSV, JSONL or Parquet file to write the totals to")
+    parser.add_argument("--histograms", action="store_true", help="Read histograms instead of logs")
+    parser.add_argument("--bins-per-decade", type=int, default=DEFAULT_BINS_PER_DECADE,
+                        help="Resolution of the bins, more bins give a smaller error bound")
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--save-histograms", default=None, help="JSON file to save the histograms of the logs to")
+    parser.add_argument("--zone", default=None, help="Electricity mix zone overriding the provider's default")
+    args = parser.parse_args(argv)
+
+    if args.histograms:
+        histograms = load_histograms(args.input)
+    else:
+        edges = token_bins(args.max_tokens, args.bins_per_decade)
+        histograms = histograms_from_logs(args.input, edges, chunk_size=args.chunk_size)
+        if args.save_histograms:
+            save_histograms(histograms, args.save_histograms)
+
+    totals = aggregate_histograms(histograms, electricity_mix_zone=args.zone)
+    write_results([totals], args.output)
+    if totals.empty:
+        print("No requests to aggregate")
+        return
+    total = totals.iloc[-1]
+    skipped = sum(h.skipped for h in histograms)
+    if skipped:
+        print(f"Skipped {skipped:,} requests without output tokens or out of the bins")
+    for row in totals[totals["error"].notna()].itertuples():
+        print(f"Skipped {row.provider}/{row.model}: {row.error}")
+    print(f"{total['requests']:,} requests: {total['gwp']:.6g} kgCO2eq (± {total['gwp_error']:.3g}), "
+          f"{total['energy']:.6g} kWh (± {total['energy_error']:.3g})")
+
+
+if __name__ == "__main__":
+    main()
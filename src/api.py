@@ -0,0 +1,362 @@
+"""
+Headless HTTP API of the calculator.
+
+A plain ASGI application (no Streamlit, no Plotly) exposing:
+
+    GET  /models              List the models of the catalog
+    GET  /electricity-mixes   List the electricity mixes
+    GET  /coefficients        Per-token impact coefficients of a model, to recompute its
+                              impacts for any number of tokens (`provider`, `model`
+                              and optional `zone` query parameters)
+    POST /impacts             Impacts of one request, formatted like the calculator,
+                              with its p50/p90 latency
+    POST /impacts/batch       Impacts of many requests in a single batch evaluation,
+                              also scaled to display units with `"format": true`
+                              and with their equivalences with `"equivalences": true`
+
+The model catalog and the electricity mixes are loaded once per process, at startup,
+and shared by every request. Throughputs and electricity mixes files are reloaded
+when they change (see `src.datasources`). The heavy modules (pint units, ecologits,
+pandas) are imported by the startup steps rather than with this module, so that the
+startup report and budget cover them.
+
+Usage (with the `api` extra installed):
+    uvicorn src.api:app --workers 4
+    python -m src.api --port 8000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs
+
+from src.warmup import warm_ecologits_repositories, warm_latency_estimator, warm_units, warm_up
+
+if TYPE_CHECKING:
+    from src.utils import QImpacts
+
+MAX_BATCH_SIZE = 100_000
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+#####################################################################################
+### SHARED STATE
+#####################################################################################
+
+
+class _State:
+    """Read-only data shared by every request of the process."""
+
+    def __init__(self) -> None:
+        from src.catalog import get_catalog
+
+        self.catalog = get_catalog(filter_main=False)
+        main_catalog = get_catalog(filter_main=True)
+        self.models: list[dict[str, Any]] = [
+            {**r.to_dict(), "main": (r.provider, r.name) in main_catalog} for r in self.catalog
+        ]
+        self.models_json = _dumps(self.models)
+        self.main_models_json = _dumps([m for m in self.models if m["main"]])
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Rebuild the data depending on the hot-reloaded files."""
+        import pandas as pd
+        from ecologits.electricity_mix_repository import electricity_mixes
+
+        from src.ingestion import score_requests
+
+        self.electricity_mixes_json = _dumps([
+            {"zone": em.zone, "gwp": em.gwp, "adpe": em.adpe, "pe": em.pe, "wue": em.wue}
+            for em in electricity_mixes.list_electricity_mixes()
+        ])
+        # Fill the lazy caches of the batch scorer before serving
+        score_requests(pd.DataFrame({"provider": [], "model": [], "output_tokens": []}))
+
+
+_state: _State | None = None
+
+
+def get_state() -> _State:
+    global _state
+    if _state is None:
+        _state = _State()
+    return _state
+
+
+#####################################################################################
+### HANDLERS
+#####################################################################################
+
+
+def _dumps(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":"), allow_nan=False).encode()
+
+
+def _loads(body: bytes) -> Any:
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Invalid JSON body.")
+
+
+def _quantity(impacts: QImpacts, criterion: str) -> dict[str, Any]:
+    value = getattr(impacts, criterion)
+    result = {"value": float(value.magnitude), "unit": str(value.units)}
+    if impacts.ranges:
+        result["min"] = float(getattr(impacts, f"{criterion}_min").magnitude)
+        result["max"] = float(getattr(impacts, f"{criterion}_max").magnitude)
+    return result
+
+
+def _raw_value(value) -> float | dict[str, float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return {"min": float(value.min), "max": float(value.max)}
+
+
+def _parse_request(data: Any) -> tuple[str, str, int, float | None, str | None]:
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Expected a JSON object.")
+    try:
+        provider = str(data["provider"])
+        model = str(data["model"])
+        output_tokens = int(data["output_tokens"])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        raise HTTPError(400, "Fields `provider`, `model` and `output_tokens` are required.")
+    if output_tokens < 0:
+        raise HTTPError(400, "Field `output_tokens` cannot be negative.")
+    latency = data.get("latency")
+    if latency is not None:
+        try:
+            latency = float(latency)
+        except (TypeError, ValueError):
+            raise HTTPError(400, "Field `latency` must be a number of seconds.")
+        if not math.isfinite(latency) or latency <= 0:
+            raise HTTPError(400, "Field `latency` must be a positive number of seconds.")
+    zone = data.get("electricity_mix_zone")
+    if zone is not None and not isinstance(zone, str):
+        raise HTTPError(400, "Field `electricity_mix_zone` must be a string.")
+    return provider, model, output_tokens, latency, zone
+
+
+def handle_impacts(data: Any) -> dict[str, Any]:
+    from src.cache import cached_llm_impacts
+    from src.ingestion import IMPACT_COLUMNS
+    from src.latency_estimator import latency_estimator
+    from src.utils import format_impacts
+
+    provider, model, output_tokens, latency, zone = _parse_request(data)
+    if (provider, model) not in get_state().catalog:
+        raise HTTPError(404, f"Could not find model `{model}` for {provider} provider.")
+    if latency is None:
+        latency = latency_estimator.estimate(provider=provider, model_name=model, output_tokens=output_tokens)
+
+    impacts = cached_llm_impacts(
+        provider=provider,
+        model_name=model,
+        output_token_count=output_tokens,
+        request_latency=latency,
+        electricity_mix_zone=zone,
+    )
+    if impacts.has_errors:
+        raise HTTPError(404, "; ".join(e.message for e in impacts.errors))
+
+    formatted, usage, embodied = format_impacts(impacts)
+    return {
+        "provider": provider,
+        "model": model,
+        "output_tokens": output_tokens,
+        "latency": latency,
+        "latency_p50": latency_estimator.estimate_percentile(provider, model, output_tokens, 50),
+        "latency_p90": latency_estimator.estimate_percentile(provider, model, output_tokens, 90),
+        "impacts": {c: _quantity(formatted, c) for c in IMPACT_COLUMNS},
+        "usage": {c: _raw_value(getattr(usage, c).value) for c in ["energy", "gwp", "adpe", "pe", "wcf"]},
+        "embodied": {c: _raw_value(getattr(embodied, c).value) for c in ["gwp", "adpe", "pe"]},
+        "warnings": [w.code for w in impacts.warnings or []],
+    }
+
+
+def _equivalence(eq) -> dict[str, Any]:
+    return {"value": eq.magnitude, "unit": eq.unit, "kind": eq.kind}
+
+
+def handle_coefficients(query: dict[str, list[str]]) -> dict[str, Any]:
+    from src.coefficients import model_coefficients
+
+    try:
+        provider, model = query["provider"][0], query["model"][0]
+    except KeyError:
+        raise HTTPError(400, "Query parameters `provider` and `model` are required.")
+    zone = query.get("zone", [None])[0]
+    coefficients = model_coefficients(provider, model, electricity_mix_zone=zone)
+    if coefficients is None:
+        if (provider, model) not in get_state().catalog:
+            raise HTTPError(404, f"Could not find model `{model}` for {provider} provider.")
+        raise HTTPError(404, f"Could not find electricity mix for `{zone}` zone.")
+    return coefficients
+
+
+def handle_batch(data: Any) -> dict[str, Any]:
+    import pandas as pd
+
+    from src.equivalences import equivalence_engine
+    from src.ingestion import IMPACT_COLUMNS, SPLIT_COLUMNS, score_requests
+    from src.utils import format_impacts_batch
+
+    requests = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(requests, list):
+        raise HTTPError(400, "Expected a JSON object with a `requests` list.")
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPError(413, f"Batches are limited to {MAX_BATCH_SIZE} requests.")
+
+    rows = [_parse_request(r) for r in requests]
+    df = pd.DataFrame(rows, columns=["provider", "model", "output_tokens", "latency", "zone"])
+    df["latency"] = df["latency"].astype("float64")
+    scored = score_requests(df)
+
+    columns = ["latency"] + [
+        f"{c}{suffix}" for c in IMPACT_COLUMNS for suffix in ("", "_min", "_max")
+    ] + SPLIT_COLUMNS
+    formatted = format_impacts_batch({c: scored[c].to_numpy() for c in IMPACT_COLUMNS}) if data.get("format") else None
+    equivalences = equivalence_engine.compute(
+        scored["energy"].to_numpy(), scored["gwp"].to_numpy()
+    ) if data.get("equivalences") else None
+
+    results = []
+    for i, record in enumerate(scored[columns + ["error"]].to_dict(orient="records")):
+        if not pd.isna(record["error"]):
+            results.append({"error": record["error"]})
+            continue
+        del record["error"]
+        if formatted is not None:
+            record["formatted"] = {
+                c: {"value": float(magnitudes[i]), "unit": units[i]} for c, (magnitudes, units) in formatted.items()
+            }
+        if equivalences is not None:
+            record["equivalences"] = {name: _equivalence(result[i]) for name, result in equivalences.items()}
+        results.append(record)
+    return {
+        "units": {"energy": "kWh", "gwp": "kgCO2eq", "adpe": "kgSbeq", "pe": "MJ", "wcf": "L", "latency": "s"},
+        "results": results,
+    }
+
+
+#####################################################################################
+### ASGI APPLICATION
+#####################################################################################
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _send_json(send, status: int, payload: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+# Timed at startup, against ECOLOGITS_STARTUP_BUDGET
+STARTUP_STEPS = {
+    "units": warm_units,
+    "ecologits_repositories": warm_ecologits_repositories,
+    "latency_estimator": warm_latency_estimator,
+    "api_state": get_state,
+}
+
+
+async def _lifespan(receive, send) -> None:
+    from src.datasources import on_reload, start_watchers, stop_watchers
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                report = warm_up(steps=STARTUP_STEPS)
+                if not report.errors:
+                    on_reload(get_state().refresh)
+                    start_watchers()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            if report.errors:
+                await send({"type": "lifespan.startup.failed", "message": report.format()})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            stop_watchers()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/")
+    try:
+        if path == "/models" and method == "GET":
+            query = parse_qs(scope.get("query_string", b"").decode())
+            main_only = query.get("main", ["false"])[0].lower() in ("1", "true")
+            state = get_state()
+            payload = state.main_models_json if main_only else state.models_json
+        elif path == "/electricity-mixes" and method == "GET":
+            payload = get_state().electricity_mixes_json
+        elif path == "/coefficients" and method == "GET":
+            query = parse_qs(scope.get("query_string", b"").decode())
+            # May extract coefficients from the DAG, kept off the event loop
+            payload = await asyncio.to_thread(lambda: _dumps(handle_coefficients(query)))
+        elif path in ("/impacts", "/impacts/batch") and method == "POST":
+            body = await _read_body(receive)
+            if path == "/impacts":
+                payload = _dumps(handle_impacts(_loads(body)))
+            else:
+                # Batches take up to seconds, single requests keep being served meanwhile
+                payload = await asyncio.to_thread(lambda: _dumps(handle_batch(_loads(body))))
+        elif path in ("/models", "/electricity-mixes", "/coefficients", "/impacts", "/impacts/batch"):
+            raise HTTPError(405, "Method not allowed.")
+        else:
+            raise HTTPError(404, "Not found.")
+    except HTTPError as e:
+        await _send_json(send, e.status, _dumps({"error": e.message}))
+        return
+    await _send_json(send, 200, payload)
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the EcoLogits calculator API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+    uvicorn.run("src.api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
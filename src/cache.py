@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from importlib.metadata import version
+from typing import TYPE_CHECKING, Any
+
+from ecologits.electricity_mix_repository import electricity_mixes
+from ecologits.impacts.llm import compute_llm_impacts
+from ecologits.impacts.modeling import Embodied, Impacts, Usage
+from ecologits.tracers.utils import PROVIDER_CONFIG_MAP, ImpactsOutput, llm_impacts
+from ecologits.utils.range_value import RangeValue
+
+from src.latency_estimator import latency_estimator
+
+if TYPE_CHECKING:
+    from src.utils import QImpacts
+
+IMPACTS_CACHE_SIZE = int(os.environ.get("ECOLOGITS_CACHE_SIZE", 4096))
+IMPACTS_CACHE_TTL = float(os.environ.get("ECOLOGITS_CACHE_TTL", 24 * 60 * 60))
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a maximum size and a time-to-live per entry."""
+
+    def __init__(self, maxsize: int = IMPACTS_CACHE_SIZE, ttl: float | None = IMPACTS_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= self.__clock():
+                    self.__entries.move_to_end(key)
+                    self.__hits += 1
+                    return value
+                del self.__entries[key]
+                self.__expirations += 1
+            self.__misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = self.__clock() + self.ttl if self.ttl is not None else float("inf")
+        with self.__lock:
+            self.__entries[key] = (expires_at, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            # Computed outside the lock: two sessions may compute the same entry concurrently,
+            # which is cheaper than serializing every computation.
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove the entries whose key matches `predicate` and return how many were removed."""
+        with self.__lock:
+            keys = [k for k in self.__entries if predicate(k)]
+            for k in keys:
+                del self.__entries[k]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self.__lock:
+            return CacheStats(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                expirations=self.__expirations,
+                size=len(self.__entries),
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+# Shared by every session of the process. Cached impacts are returned as-is: callers
+# must treat them as read-only.
+impacts_cache = LRUCache()
+
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, RangeValue):
+        return float(value.min), float(value.max)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def cached_llm_impacts(
+        provider: str,
+        model_name: str,
+        output_token_count: int,
+        request_latency: float | None = None,
+        electricity_mix_zone: str | None = None,
+) -> ImpactsOutput:
+    """Memoized `llm_impacts`, estimating the latency like the calculator when it is missing."""
+    if request_latency is None:
+        request_latency = latency_estimator.estimate(
+            provider=provider,
+            model_name=model_name,
+            output_tokens=output_token_count
+        )
+    key = (
+        "llm_impacts",
+        provider,
+        model_name,
+        _normalize(output_token_count),
+        _normalize(request_latency),
+        electricity_mix_zone,
+    )
+    return impacts_cache.get_or_compute(key, lambda: llm_impacts(
+        provider=provider,
+        model_name=model_name,
+        output_token_count=output_token_count,
+        request_latency=request_latency,
+        electricity_mix_zone=electricity_mix_zone,
+    ))
+
+
+def cached_compute_llm_impacts(**kwargs: Any) -> Impacts:
+    """Memoized `compute_llm_impacts`, keyed on every (normalized) keyword argument."""
+    key = ("compute_llm_impacts",) + tuple(sorted((k, _normalize(v)) for k, v in kwargs.items()))
+    return impacts_cache.get_or_compute(key, lambda: compute_llm_impacts(**kwargs))
+
+
+#####################################################################################
+### FORMATTED IMPACTS
+#####################################################################################
+
+
+_data_version: str | None = None
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def data_version() -> str:
+    """Digest of the ecologits version, throughputs and electricity mixes in use."""
+    global _data_version
+    if _data_version is None:
+        digest = hashlib.sha256(version("ecologits").encode())
+        digest.update(latency_estimator.version.encode())
+        for em in electricity_mixes.list_electricity_mixes():
+            digest.update(f"{em.zone},{em.adpe!r},{em.pe!r},{em.gwp!r},{em.wue!r};".encode())
+        _data_version = digest.hexdigest()[:16]
+    return _data_version
+
+
+def request_zone(provider: str, electricity_mix_zone: str | None = None) -> str:
+    """Electricity mix zone `llm_impacts` uses for a request of `provider`."""
+    if electricity_mix_zone is not None:
+        return electricity_mix_zone
+    config = PROVIDER_CONFIG_MAP.get(provider)
+    return (config.datacenter_location if config is not None else None) or "WOR"
+
+
+def llm_data_version(provider: str, model_name: str, electricity_mix_zone: str | None = None) -> tuple:
+    """
+    Data read by `cached_llm_impacts` besides its arguments: the throughput of the model
+    and the electricity mix of the zone. Formatted impacts keyed by it are only
+    invalidated by a reload changing that model or that zone.
+    """
+    zone = request_zone(provider, electricity_mix_zone)
+    em = electricity_mixes.find_electricity_mix(zone)
+    mix = (em.adpe, em.pe, em.gwp, em.wue) if em is not None else None
+    return latency_estimator.get_throughput(provider, model_name), zone, mix
+
+
+def get_disk_cache():
+    """The on-disk cache when `ECOLOGITS_DISK_CACHE` is set, opened once per process."""
+    from src.disk_cache import DISK_CACHE_PATH, DiskCache
+
+    global _disk_cache
+    if DISK_CACHE_PATH is None:
+        return None
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            disk_cache = DiskCache(DISK_CACHE_PATH)
+            disk_cache.set_version(version("ecologits"))
+            _disk_cache = disk_cache
+    return _disk_cache
+
+
+def refresh_data_version() -> None:
+    """Called after a data file is reloaded, for `data_version` to digest the new data."""
+    global _data_version
+    _data_version = None
+
+
+def cached_format_impacts(
+        inputs: dict[str, Any],
+        compute: Callable[[], Impacts],
+        data: Any = (),
+) -> tuple[QImpacts, Usage, Embodied]:
+    """
+    Memoized `format_impacts(compute())`, keyed on `inputs` that must identify the
+    impacts (e.g. every input of a view) and on `data`, the version of the data files
+    they are computed with that is not in `inputs` (see `llm_data_version`). Backed by
+    the on-disk cache, if enabled, to survive restarts and be shared by the processes
+    of a host.
+    """
+    from src.utils import format_impacts
+
+    return cached_formatted_impacts(inputs, lambda: format_impacts(compute()), data)
+
+
+def cached_formatted_impacts(
+        inputs: dict[str, Any],
+        compute: Callable[[], tuple[QImpacts, Usage, Embodied]],
+        data: Any = (),
+) -> tuple[QImpacts, Usage, Embodied]:
+    """Like `cached_format_impacts`, for a `compute` returning the formatted impacts."""
+    inputs = (_normalize(data), _normalize(inputs))
+    key = ("format_impacts",) + inputs
+
+    def load():
+        disk_cache = get_disk_cache()
+        if disk_cache is None:
+            return compute()
+        return disk_cache.get_or_compute(inputs, compute)
+
+    return impacts_cache.get_or_compute(key, load)
@@ -1,12 +1,12 @@
 import math
 import streamlit as st
 
-from ecologits.tracers.utils import llm_impacts
+from src.cache import cached_format_impacts, cached_llm_impacts, llm_data_version
 from src.impacts import display_impacts, display_equivalent_ghg, display_equivalent_energy
-from src.latency_estimator import latency_estimator
-from src.utils import format_impacts
 from src.content import WARNING_CLOSED_SOURCE, WARNING_MULTI_MODAL, WARNING_BOTH, HOW_TO_TEXT
-from src.models import load_models
+from src.catalog import get_catalog
+from src.debug import traced_fragment
+from src.tracing import span
 
 from src.constants import PROMPTS
 
@@ -15,13 +15,21 @@ def calculator_mode():
 
     st.expander("How to use this calculator?", expanded = False).markdown(HOW_TO_TEXT)
 
+    _calculator()
+
+
+# Changing the model or the prompt only reruns the calculator, not the whole app
+@traced_fragment
+def _calculator():
+
     with st.container(border=True):
-        df = load_models(filter_main=True)
+        with span("load_models"):
+            catalog = get_catalog(filter_main=True)
 
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            providers_clean = [x for x in df["provider_clean"].unique()]
+            providers_clean = list(catalog.providers)
             provider = st.selectbox(
                 label="Provider",
                 options=providers_clean,
@@ -29,14 +37,9 @@ def calculator_mode():
             )
 
         with col2:
-            models_clean = [
-                x
-                for x in df["name_clean"].unique()
-                if x in df[df["provider_clean"] == provider]["name_clean"].unique()
-            ]
             model = st.selectbox(
                 label="Model",
-                options=models_clean,
+                options=catalog.models(provider),
             )
 
         with col3:
@@ -47,46 +50,34 @@ def calculator_mode():
             )
 
         # WARNING DISPLAY
-        provider_raw = df[
-            (df["provider_clean"] == provider) & (df["name_clean"] == model)
-        ]["provider"].values[0]
-        model_raw = df[
-            (df["provider_clean"] == provider) & (df["name_clean"] == model)
-        ]["name"].values[0]
-
-        df_filtered = df[
-            (df["provider_clean"] == provider) & (df["name_clean"] == model)
-        ]
-
-        if (
-            df_filtered["warning_arch"].values[0]
-            and not df_filtered["warning_multi_modal"].values[0]
-        ):
+        record = catalog.find_by_display_name(provider, model)
+        provider_raw = record.provider
+        model_raw = record.name
+
+        if record.warning_arch and not record.warning_multi_modal:
             st.warning(WARNING_CLOSED_SOURCE, icon="⚠️")
-        if (
-            df_filtered["warning_multi_modal"].values[0]
-            and not df_filtered["warning_arch"].values[0]
-        ):
+        if record.warning_multi_modal and not record.warning_arch:
             st.warning(WARNING_MULTI_MODAL, icon="⚠️")
-        if (
-            df_filtered["warning_arch"].values[0]
-            and df_filtered["warning_multi_modal"].values[0]
-        ):
+        if record.warning_arch and record.warning_multi_modal:
             st.warning(WARNING_BOTH, icon="⚠️")
 
     try:
         output_tokens_count = [x[1] for x in PROMPTS if x[0] == output_tokens][0]
-        estimated_latency = latency_estimator.estimate(provider=provider_raw,
-                                                       model_name=model_raw,
-                                                       output_tokens=output_tokens_count)
-        impacts = llm_impacts(
-            provider=provider_raw,
-            model_name=model_raw,
-            output_token_count=output_tokens_count,
-            request_latency=estimated_latency
-        )
-
-        impacts, _, _ = format_impacts(impacts)
+
+        def compute_impacts():
+            with span("llm_impacts"):
+                return cached_llm_impacts(
+                    provider=provider_raw,
+                    model_name=model_raw,
+                    output_token_count=output_tokens_count
+                )
+
+        with span("format_impacts"):
+            impacts, _, _ = cached_format_impacts(
+                {"view": "calculator", "provider": provider_raw, "model": model_raw, "output_tokens": output_tokens_count},
+                compute_impacts,
+                llm_data_version(provider_raw, model_raw),
+            )
 
         with st.container(border=True):
 
@@ -94,18 +85,25 @@ def calculator_mode():
             #st.markdown('<p align = "center">To understand how the environmental impacts are computed go to the 📖 Methodology tab.</p>', unsafe_allow_html=True)
             display_impacts(impacts)                 
         
-        with st.container(border=False):
-            st.markdown('<h3 align = "center">Equivalences</h3>', unsafe_allow_html=True)
-            st.markdown('<p align = "center">Making this request to the LLM is equivalent to the following actions :</p>', unsafe_allow_html=True)
-            page = st.radio(' ', ['Energy' , 'GHG'], horizontal=True)
-        
-        with st.container(border=True):                                            
-             if page == 'Energy' :
-                display_equivalent_energy(impacts)
-             else :  
-                display_equivalent_ghg(impacts)
+        _equivalences(impacts)
         
             
     except Exception as e:
         st.error('Could not find the model in the repository. Please try another model.')
-        raise e
\ No newline at end of file
+        raise e
+
+
+# Only depends on the impacts, switching between Energy and GHG does not recompute them
+@traced_fragment
+def _equivalences(impacts):
+
+    with st.container(border=False):
+        st.markdown('<h3 align = "center">Equivalences</h3>', unsafe_allow_html=True)
+        st.markdown('<p align = "center">Making this request to the LLM is equivalent to the following actions :</p>', unsafe_allow_html=True)
+        page = st.radio(' ', ['Energy' , 'GHG'], horizontal=True)
+
+    with st.container(border=True):
+        if page == 'Energy' :
+            display_equivalent_energy(impacts)
+        else :
+            display_equivalent_ghg(impacts)
\ No newline at end of file
@@ -0,0 +1,300 @@
+"""
+Model catalog of the calculator.
+
+The catalog is built from the ecologits model repository, or loaded from a prebuilt
+Arrow snapshot when one matching the installed ecologits version is available.
+
+Build the snapshot with:
+    python -m src.catalog [--from-url]
+
+Without a matching snapshot, as on the Space, the catalog is rebuilt at startup.
+"""
+import argparse
+import logging
+import tempfile
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+
+import pandas as pd
+import requests
+from ecologits.model_repository import models as model_repository, ArchitectureTypes, ModelRepository
+from ecologits.status_messages import ModelArchNotReleasedWarning, ModelArchMultimodalWarning
+from ecologits.utils.range_value import RangeValue
+
+from src.constants import MAIN_MODELS, MODEL_REPOSITORY_URL
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = Path(__file__).parent / "data" / "models_snapshot.arrow"
+SNAPSHOT_FORMAT_VERSION = "1"
+
+
+PROVIDERS_FORMAT = {
+    "anthropic": "Anthropic",
+    "cohere": "Cohere",
+    "google_genai": "Google",
+    "mistralai": "Mistral AI",
+    "openai": "OpenAI",
+}
+
+
+class ModelRecord:
+    """Read-only description of a model of the catalog."""
+
+    __slots__ = (
+        "provider",
+        "provider_clean",
+        "name",
+        "name_clean",
+        "architecture_type",
+        "total_parameters",
+        "active_parameters",
+        "warning_arch",
+        "warning_multi_modal",
+    )
+
+    def __init__(self,
+                 provider: str,
+                 provider_clean: str,
+                 name: str,
+                 name_clean: str,
+                 architecture_type: str,
+                 total_parameters: float | RangeValue,
+                 active_parameters: float | RangeValue,
+                 warning_arch: bool,
+                 warning_multi_modal: bool) -> None:
+        self.provider = provider
+        self.provider_clean = provider_clean
+        self.name = name
+        self.name_clean = name_clean
+        self.architecture_type = architecture_type
+        self.total_parameters = total_parameters
+        self.active_parameters = active_parameters
+        self.warning_arch = warning_arch
+        self.warning_multi_modal = warning_multi_modal
+
+    @property
+    def has_ranges(self) -> bool:
+        return isinstance(self.total_parameters, RangeValue) or isinstance(self.active_parameters, RangeValue)
+
+    def to_dict(self) -> dict:
+        data = {k: getattr(self, k) for k in self.__slots__}
+        for k in ("total_parameters", "active_parameters"):
+            if isinstance(data[k], RangeValue):
+                data[k] = dict(data[k])
+        return data
+
+    def __repr__(self) -> str:
+        return f"ModelRecord(provider={self.provider!r}, name={self.name!r})"
+
+
+class ModelCatalog:
+    """
+    Immutable model catalog with constant-time lookups.
+
+    Models can be found by their ecologits identifiers (provider, name) or by their
+    display names (provider_clean, name_clean) as shown in the selectboxes.
+    """
+
+    def __init__(self, records: list[ModelRecord]) -> None:
+        self.__records = tuple(records)
+        self.__by_name: dict[tuple[str, str], ModelRecord] = {}
+        self.__by_display_name: dict[tuple[str, str], ModelRecord] = {}
+        models_by_provider: dict[str, list[str]] = {}
+        for r in self.__records:
+            self.__by_name.setdefault((r.provider, r.name), r)
+            if (r.provider_clean, r.name_clean) not in self.__by_display_name:
+                self.__by_display_name[(r.provider_clean, r.name_clean)] = r
+                models_by_provider.setdefault(r.provider_clean, []).append(r.name_clean)
+        self.__models_by_provider = {p: tuple(m) for p, m in models_by_provider.items()}
+        self.__providers = tuple(self.__models_by_provider)
+
+    @classmethod
+    def from_repository(cls, repository=model_repository, filter_main=True) -> "ModelCatalog":
+        records = []
+        for m in repository.list_models():
+            if filter_main and m.name not in MAIN_MODELS:
+                continue    # Ignore "not main" models when filter is enabled
+
+            if m.architecture.type == ArchitectureTypes.DENSE:
+                total_parameters = m.architecture.parameters
+                active_parameters = total_parameters
+
+            elif m.architecture.type == ArchitectureTypes.MOE:
+                total_parameters = m.architecture.parameters.total
+                active_parameters = m.architecture.parameters.active
+
+            else:
+                continue    # Ignore model
+
+            warning_arch = False
+            warning_multi_modal = False
+            for w in m.warnings:
+                if isinstance(w, ModelArchNotReleasedWarning):
+                    warning_arch = True
+                if isinstance(w, ModelArchMultimodalWarning):
+                    warning_multi_modal = True
+
+            records.append(ModelRecord(
+                provider=m.provider.value,
+                provider_clean=PROVIDERS_FORMAT.get(m.provider.value, m.provider.value),
+                name=m.name,
+                name_clean=clean_model_name(m.name),
+                architecture_type=m.architecture.type.value,
+                total_parameters=total_parameters,
+                active_parameters=active_parameters,
+                warning_arch=warning_arch,
+                warning_multi_modal=warning_multi_modal,
+            ))
+        return cls(records)
+
+    @classmethod
+    def from_snapshot(cls, path: str | Path = SNAPSHOT_PATH, filter_main=True) -> "ModelCatalog | None":
+        """Load a snapshot written by `write_snapshot`, or None if it is missing or outdated."""
+        import pyarrow as pa
+
+        try:
+            with pa.memory_map(str(path), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+        metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+        if (metadata.get("format_version") != SNAPSHOT_FORMAT_VERSION
+                or metadata.get("ecologits_version") != version("ecologits")):
+            logger.info("Ignoring model catalog snapshot built for ecologits %s", metadata.get("ecologits_version"))
+            return None
+
+        columns = table.to_pydict()
+        records = []
+        for i, name in enumerate(columns["name"]):
+            if filter_main and name not in MAIN_MODELS:
+                continue
+            records.append(ModelRecord(
+                provider=columns["provider"][i],
+                provider_clean=columns["provider_clean"][i],
+                name=name,
+                name_clean=columns["name_clean"][i],
+                architecture_type=columns["architecture_type"][i],
+                total_parameters=_from_bounds(columns["total_min"][i], columns["total_max"][i], columns["total_is_range"][i]),
+                active_parameters=_from_bounds(columns["active_min"][i], columns["active_max"][i], columns["active_is_range"][i]),
+                warning_arch=columns["warning_arch"][i],
+                warning_multi_modal=columns["warning_multi_modal"][i],
+            ))
+        return cls(records)
+
+    def write_snapshot(self, path: str | Path = SNAPSHOT_PATH, source: str = "ecologits") -> None:
+        """Write the catalog as an Arrow IPC file stamped with the installed ecologits version."""
+        import pyarrow as pa
+
+        columns: dict[str, list] = {k: [] for k in (
+            "provider", "provider_clean", "name", "name_clean", "architecture_type",
+            "total_min", "total_max", "total_is_range", "active_min", "active_max", "active_is_range",
+            "warning_arch", "warning_multi_modal",
+        )}
+        for r in self.__records:
+            for k in ("provider", "provider_clean", "name", "name_clean", "architecture_type",
+                      "warning_arch", "warning_multi_modal"):
+                columns[k].append(getattr(r, k))
+            for prefix, value in (("total", r.total_parameters), ("active", r.active_parameters)):
+                is_range = isinstance(value, RangeValue)
+                columns[f"{prefix}_min"].append(float(value.min if is_range else value))
+                columns[f"{prefix}_max"].append(float(value.max if is_range else value))
+                columns[f"{prefix}_is_range"].append(is_range)
+
+        table = pa.table(columns).replace_schema_metadata({
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "ecologits_version": version("ecologits"),
+            "source": source,
+        })
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @property
+    def providers(self) -> tuple[str, ...]:
+        """Display names of the providers, in catalog order."""
+        return self.__providers
+
+    def models(self, provider_clean: str) -> tuple[str, ...]:
+        """Display names of the models of a provider, in catalog order."""
+        return self.__models_by_provider.get(provider_clean, ())
+
+    def find(self, provider: str, model_name: str) -> ModelRecord | None:
+        return self.__by_name.get((provider, model_name))
+
+    def find_by_display_name(self, provider_clean: str, name_clean: str) -> ModelRecord | None:
+        return self.__by_display_name.get((provider_clean, name_clean))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame([r.to_dict() for r in self.__records])
+
+    def __iter__(self):
+        return iter(self.__records)
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self.__by_name
+
+
+def _from_bounds(min_value: float, max_value: float, is_range: bool) -> float | RangeValue:
+    min_value = int(min_value) if min_value.is_integer() else min_value
+    max_value = int(max_value) if max_value.is_integer() else max_value
+    if is_range:
+        return RangeValue(min=min_value, max=max_value)
+    return min_value
+
+
+@lru_cache(maxsize=None)
+def get_catalog(filter_main=True) -> ModelCatalog:
+    """
+    Catalog loaded once per process and shared (read-only) by every session.
+
+    Uses the prebuilt snapshot when it matches the installed ecologits version and
+    rebuilds the catalog from the model repository otherwise.
+    """
+    catalog = ModelCatalog.from_snapshot(filter_main=filter_main)
+    if catalog is None:
+        catalog = ModelCatalog.from_repository(filter_main=filter_main)
+    return catalog
+
+
+def build_models(filter_main=True) -> pd.DataFrame:
+    return get_catalog(filter_main=filter_main).to_dataframe()
+
+
+def clean_model_name(model_name: str) -> str:
+    model_name = model_name.replace("latest", "")
+    model_name = model_name.replace("-", " ")
+    model_name = model_name.replace("_", " ")
+    return model_name
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the model catalog snapshot.")
+    parser.add_argument("--output", default=str(SNAPSHOT_PATH))
+    parser.add_argument("--from-url", action="store_true",
+                        help=f"Build from the upstream model repository ({MODEL_REPOSITORY_URL}) "
+                             f"instead of the one shipped with ecologits")
+    args = parser.parse_args(argv)
+
+    repository, source = model_repository, "ecologits"
+    if args.from_url:
+        response = requests.get(MODEL_REPOSITORY_URL, timeout=30)
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile("wb", suffix=".json") as fd:
+            fd.write(response.content)
+            fd.flush()
+            repository = ModelRepository.from_json(fd.name)
+        source = MODEL_REPOSITORY_URL
+
+    catalog = ModelCatalog.from_repository(repository, filter_main=False)
+    catalog.write_snapshot(args.output, source=source)
+    print(f"Wrote {len(catalog)} models to {args.output} (ecologits {version('ecologits')})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Native SVG rendering of the fixed charts of the app: range bars and usage/embodied pies.
+
+The SVG markup is a few hundred bytes against tens of kilobytes of Plotly JSON, needs
+no JavaScript to hydrate and is cached by input values. Set `ECOLOGITS_PLOTLY=1` to
+render these charts with Plotly instead.
+"""
+from __future__ import annotations
+
+import math
+import os
+from functools import lru_cache
+from html import escape
+
+USE_PLOTLY = os.environ.get("ECOLOGITS_PLOTLY", "").lower() in ("1", "true", "yes")
+
+BAR_COLOR = "#0B3B36"
+MEAN_COLOR = "#00BF63"
+FONT = "font-family:sans-serif"
+
+
+@lru_cache(maxsize=1024)
+def range_svg(mean_val: float, min_val: float, max_val: float, unit: str) -> str:
+    """Bar spanning [min, max] with a marker and the value of the mean, like `range_plot`."""
+    left, right = 60., 340.
+    if max_val > min_val:
+        x = left + (right - left) * (mean_val - min_val) / (max_val - min_val)
+    else:
+        x = (left + right) / 2
+    unit = escape(str(unit))
+    return (
+        f'<svg viewBox="0 0 400 160" width="100%" style="max-width:400px;display:block;margin:auto" '
+        f'xmlns="http://www.w3.org/2000/svg" role="img">'
+        f'<text x="{x:.1f}" y="38" text-anchor="middle" style="{FONT};font-size:30px">{mean_val:.3g} {unit}</text>'
+        f'<rect x="{left}" y="55" width="{right - left}" height="40" fill="{BAR_COLOR}"/>'
+        f'<line x1="{x:.1f}" y1="48" x2="{x:.1f}" y2="102" stroke="{MEAN_COLOR}" stroke-width="3"/>'
+        f'<text x="{left}" y="122" text-anchor="middle" style="{FONT};font-size:15px">Min</text>'
+        f'<text x="{right}" y="122" text-anchor="middle" style="{FONT};font-size:15px">Max</text>'
+        f'<text x="{left}" y="146" text-anchor="middle" style="{FONT};font-size:15px">{min_val:.3g} {unit}</text>'
+        f'<text x="{right}" y="146" text-anchor="middle" style="{FONT};font-size:15px">{max_val:.3g} {unit}</text>'
+        f'</svg>'
+    )
+
+
+def _arc(cx: float, cy: float, r: float, start: float, end: float) -> str:
+    """Path of a pie slice between two angles (radians, clockwise from 12 o'clock)."""
+    x0, y0 = cx + r * math.sin(start), cy - r * math.cos(start)
+    x1, y1 = cx + r * math.sin(end), cy - r * math.cos(end)
+    large = 1 if end - start > math.pi else 0
+    return f"M{cx},{cy} L{x0:.2f},{y0:.2f} A{r},{r} 0 {large} 1 {x1:.2f},{y1:.2f} Z"
+
+
+@lru_cache(maxsize=1024)
+def pie_svg(values: tuple[float, ...], names: tuple[str, ...], title: str, colors: tuple[str, ...]) -> str:
+    """Pie chart with the share of each value written on its slice, like `px.pie`."""
+    cx, cy, r = 150., 170., 120.
+    total = sum(values)
+    parts = [
+        '<svg viewBox="0 0 300 300" width="100%" style="max-width:300px;display:block;margin:auto" '
+        'xmlns="http://www.w3.org/2000/svg" role="img">',
+        f'<text x="{cx}" y="28" text-anchor="middle" style="{FONT};font-size:17px">{escape(title)}</text>',
+    ]
+    start = 0.
+    for value, name, color in zip(values, names, colors):
+        share = value / total if total > 0 else 0.
+        if share <= 0:
+            continue
+        end = start + 2 * math.pi * share
+        label = escape(f"{name}: {share:.1%}")
+        if share >= 1:
+            parts.append(f'<circle cx="{cx}" cy="{cy}" r="{r}" fill="{color}"><title>{label}</title></circle>')
+        else:
+            parts.append(f'<path d="{_arc(cx, cy, r, start, end)}" fill="{color}" stroke="white">'
+                         f'<title>{label}</title></path>')
+        middle = (start + end) / 2
+        tx, ty = cx + 0.6 * r * math.sin(middle), cy - 0.6 * r * math.cos(middle)
+        if share >= 1:
+            tx, ty = cx, cy
+        parts.append(f'<text x="{tx:.1f}" y="{ty:.1f}" text-anchor="middle" dominant-baseline="middle" '
+                     f'style="{FONT};font-size:13px;fill:white">{share:.1%}</text>')
+        start = end
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def range_chart(mean_val: float, min_val: float, max_val: float, unit) -> None:
+    import streamlit as st
+
+    if USE_PLOTLY:
+        from src.utils import range_plot
+        range_plot(mean_val, min_val, max_val, unit)
+    else:
+        st.html(range_svg(float(mean_val), float(min_val), float(max_val), str(unit)))
+
+
+def pie_chart(values: list[float], names: list[str], title: str, colors: list[str]) -> None:
+    import streamlit as st
+
+    if USE_PLOTLY:
+        import plotly.express as px
+
+        fig = px.pie(values=values, names=names, title=title, color_discrete_sequence=colors, width=100)
+        fig.update_layout(showlegend=False, title_x=0.5)
+        st.plotly_chart(fig)
+    else:
+        st.html(pie_svg(tuple(float(v) for v in values), tuple(names), title, tuple(colors)))
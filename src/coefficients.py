@@ -0,0 +1,253 @@
+"""
+Per-token coefficients of the impacts of one configuration.
+
+For a fixed model, electricity mix and data center, every impact computed by
+`compute_llm_impacts` has the form
+
+    impact = per_token * output_tokens + per_second * generation_latency
+    generation_latency = min(request_latency, latency_per_token * output_tokens)
+
+The coefficients are extracted once per configuration from the ecologits DAG (the
+scalar reference), checked against it at a third point and cached. Changing the
+number of output tokens or the latency is then a multiply-add, for one request or
+for arrays of them.
+
+Usage:
+    python -m src.coefficients --output coefficients.json --zone FRA
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from ecologits.impacts.llm import compute_llm_impacts_dag
+from ecologits.impacts.modeling import GWP, PE, WCF, ADPe, Embodied, Energy, Impacts, Usage
+
+from src.engine import BatchImpacts
+from src.latency_estimator import latency_estimator
+
+# Impacts of the DAG, by field of `BatchImpacts`
+DAG_FIELDS = {
+    "energy": "request_energy",
+    "usage_gwp": "request_usage_gwp",
+    "usage_adpe": "request_usage_adpe",
+    "usage_pe": "request_usage_pe",
+    "usage_wcf": "request_usage_wcf",
+    "embodied_gwp": "request_embodied_gwp",
+    "embodied_adpe": "request_embodied_adpe",
+    "embodied_pe": "request_embodied_pe",
+}
+FIELDS = [f.name for f in fields(BatchImpacts)]
+
+# Relative tolerance of the check against the DAG
+CHECK_RTOL = 1e-9
+
+
+def _with_totals(values: dict[str, float]) -> dict[str, float]:
+    """Add the totals (usage + embodied) to the impacts of the DAG, in `BatchImpacts` order."""
+    values = {
+        **values,
+        "gwp": values["usage_gwp"] + values["embodied_gwp"],
+        "adpe": values["usage_adpe"] + values["embodied_adpe"],
+        "pe": values["usage_pe"] + values["embodied_pe"],
+        "wcf": values["usage_wcf"],
+    }
+    return {name: values[name] for name in FIELDS}
+
+
+@dataclass(frozen=True)
+class ImpactCoefficients:
+    per_token: dict[str, float]   # impacts of one output token, without the latency terms
+    per_second: dict[str, float]  # impacts of one second of generation latency
+    latency_per_token: float      # generation latency of one token when the request latency is unknown
+
+    def evaluate(self, output_tokens, request_latency=None) -> BatchImpacts:
+        """Impacts for scalars or arrays of output tokens and latencies, like `compute_llm_impacts_batch`."""
+        tokens = np.asarray(output_tokens, dtype=np.float64)
+        generation_latency = tokens * self.latency_per_token
+        if request_latency is not None:
+            latency = np.asarray(request_latency, dtype=np.float64)
+            # A NaN latency is unknown, as in the batch engine
+            generation_latency = np.where(latency < generation_latency, latency, generation_latency)
+        columns = np.broadcast_arrays(*(
+            self.per_token[name] * tokens + self.per_second[name] * generation_latency for name in FIELDS
+        ))
+        return BatchImpacts(*(np.atleast_1d(c) for c in columns))
+
+    def impacts(self, output_tokens: float, request_latency: float | None = None) -> Impacts:
+        """Impacts of one request as returned by `compute_llm_impacts`, for the views."""
+        generation_latency = output_tokens * self.latency_per_token
+        if request_latency is not None and request_latency < generation_latency:
+            generation_latency = request_latency
+        v = {
+            name: self.per_token[name] * output_tokens + self.per_second[name] * generation_latency
+            for name in DAG_FIELDS
+        }
+        energy = Energy(value=v["energy"])
+        gwp_usage, adpe_usage, pe_usage = GWP(value=v["usage_gwp"]), ADPe(value=v["usage_adpe"]), PE(value=v["usage_pe"])
+        wcf_usage = WCF(value=v["usage_wcf"])
+        gwp_embodied, adpe_embodied, pe_embodied = GWP(value=v["embodied_gwp"]), ADPe(value=v["embodied_adpe"]), PE(value=v["embodied_pe"])
+        return Impacts(
+            energy=energy,
+            gwp=gwp_usage + gwp_embodied,
+            adpe=adpe_usage + adpe_embodied,
+            pe=pe_usage + pe_embodied,
+            wcf=wcf_usage,
+            usage=Usage(energy=energy, gwp=gwp_usage, adpe=adpe_usage, pe=pe_usage, wcf=wcf_usage),
+            embodied=Embodied(gwp=gwp_embodied, adpe=adpe_embodied, pe=pe_embodied),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "latency_per_token": self.latency_per_token,
+            "per_token": self.per_token,
+            "per_second": self.per_second,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ImpactCoefficients:
+        return cls(
+            per_token={name: float(data["per_token"][name]) for name in FIELDS},
+            per_second={name: float(data["per_second"][name]) for name in FIELDS},
+            latency_per_token=float(data["latency_per_token"]),
+        )
+
+
+@lru_cache(maxsize=1024)
+def extract_coefficients(
+        model_active_parameter_count: float,
+        model_total_parameter_count: float,
+        if_electricity_mix_adpe: float,
+        if_electricity_mix_pe: float,
+        if_electricity_mix_gwp: float,
+        if_electricity_mix_wue: float,
+        datacenter_pue: float,
+        datacenter_wue: float,
+) -> ImpactCoefficients:
+    """
+    Coefficients of a configuration (same arguments as `compute_llm_impacts`, without
+    the tokens and the latency), from two evaluations of the DAG:
+
+    - one token with a zero latency only has the per-token terms,
+    - one token with an unknown latency adds `latency_per_token` seconds of latency terms.
+
+    Raises a ValueError if a third evaluation does not match the coefficients.
+    """
+    def dag(output_tokens: float, request_latency: float) -> dict[str, float]:
+        results = compute_llm_impacts_dag(
+            model_active_parameter_count=model_active_parameter_count,
+            model_total_parameter_count=model_total_parameter_count,
+            output_token_count=output_tokens,
+            request_latency=request_latency,
+            if_electricity_mix_adpe=if_electricity_mix_adpe,
+            if_electricity_mix_pe=if_electricity_mix_pe,
+            if_electricity_mix_gwp=if_electricity_mix_gwp,
+            if_electricity_mix_wue=if_electricity_mix_wue,
+            datacenter_pue=datacenter_pue,
+            datacenter_wue=datacenter_wue,
+        )
+        return {**{name: float(results[key]) for name, key in DAG_FIELDS.items()},
+                "generation_latency": float(results["generation_latency"])}
+
+    no_latency = dag(1, 0.)
+    unknown_latency = dag(1, math.inf)
+    latency_per_token = unknown_latency["generation_latency"]
+    coefficients = ImpactCoefficients(
+        per_token=_with_totals({name: no_latency[name] for name in DAG_FIELDS}),
+        per_second=_with_totals({
+            name: (unknown_latency[name] - no_latency[name]) / latency_per_token if latency_per_token > 0 else 0.
+            for name in DAG_FIELDS
+        }),
+        latency_per_token=latency_per_token,
+    )
+
+    # Check a request with a latency below the generation latency against the reference
+    tokens, latency = 1000., 500. * latency_per_token
+    reference = dag(tokens, latency)
+    estimate = coefficients.evaluate(tokens, latency)
+    for name in DAG_FIELDS:
+        if not math.isclose(getattr(estimate, name)[0], reference[name], rel_tol=CHECK_RTOL, abs_tol=1e-300):
+            raise ValueError(f"Impacts are not linear in output tokens and latency ({name}).")
+    return coefficients
+
+
+#####################################################################################
+### CATALOG COEFFICIENTS
+#####################################################################################
+
+
+def model_coefficients(
+        provider: str,
+        model_name: str,
+        electricity_mix_zone: str | None = None,
+) -> dict[str, Any] | None:
+    """
+    Coefficients of a model of the catalog with the data center of its provider, at the
+    lower and upper bounds of its parameters, PUE and WUE. None for an unknown model or zone.
+    """
+    from src.ingestion import _mix_table, _model_table
+
+    models = _model_table()
+    row = models[(models["provider"] == provider) & (models["model"] == model_name)]
+    if row.empty:
+        return None
+    row = row.iloc[0]
+    zone = electricity_mix_zone or row["zone"]
+    mixes = _mix_table()
+    mix = mixes[mixes["zone"] == zone]
+    if mix.empty:
+        return None
+    mix = mix.iloc[0]
+
+    throughput = latency_estimator.get_throughput(provider, model_name)
+    result = {"provider": provider, "model": model_name, "zone": zone, "throughput": throughput}
+    for bound in ("min", "max"):
+        result[bound] = extract_coefficients(
+            model_active_parameter_count=float(row[f"active_{bound}"]),
+            model_total_parameter_count=float(row[f"total_{bound}"]),
+            if_electricity_mix_adpe=float(mix["mix_adpe"]),
+            if_electricity_mix_pe=float(mix["mix_pe"]),
+            if_electricity_mix_gwp=float(mix["mix_gwp"]),
+            if_electricity_mix_wue=float(mix["mix_wue"]),
+            datacenter_pue=float(row[f"pue_{bound}"]),
+            datacenter_wue=float(row[f"wue_{bound}"]),
+        ).to_dict()
+    return result
+
+
+def export_coefficients(path: str | Path, electricity_mix_zone: str | None = None) -> int:
+    """Write the coefficients of every model of the catalog as JSON and return their number."""
+    from src.ingestion import _model_table
+
+    models = _model_table()
+    exported = []
+    for provider, model_name in zip(models["provider"], models["model"]):
+        coefficients = model_coefficients(provider, model_name, electricity_mix_zone)
+        if coefficients is not None:
+            exported.append(coefficients)
+    with open(path, "w") as fd:
+        json.dump({
+            "units": {"energy": "kWh", "gwp": "kgCO2eq", "adpe": "kgSbeq", "pe": "MJ", "wcf": "L", "latency": "s"},
+            "models": exported,
+        }, fd, indent=2)
+    return len(exported)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Export the per-token impact coefficients of every model.")
+    parser.add_argument("--output", default="coefficients.json", help="JSON file to write")
+    parser.add_argument("--zone", default=None, help="Electricity mix zone overriding the providers' default")
+    args = parser.parse_args(argv)
+
+    count = export_coefficients(args.output, electricity_mix_zone=args.zone)
+    print(f"Exported the coefficients of {count} models into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
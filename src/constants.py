@@ -10,6 +10,14 @@ PROMPTS = [(s + f" ({v} output tokens)", v) for (s, v) in PROMPTS]
 
 MODEL_REPOSITORY_URL = "https://raw.githubusercontent.com/genai-impact/ecologits/refs/heads/main/ecologits/data/models.json"
 
+IMPACTS_LABELS = {
+    "energy": "Energy",
+    "gwp": "GHG emissions",
+    "adpe": "Abiotic resources",
+    "pe": "Primary energy",
+    "wcf": "Water consumption",
+}
+
 main_models_openai = [
     "gpt-3.5-turbo",
     "gpt-4",
@@ -0,0 +1,176 @@
+"""
+Hot reload of the data files without restarting the server.
+
+A background thread polls the throughputs file (`ECOLOGITS_THROUGHPUTS`) and, when
+set, an electricity mixes CSV (`ECOLOGITS_ELECTRICITY_MIXES`, same columns as the
+ecologits one: name, adpe, pe, gwp, wue). A changed file is parsed and validated in
+that thread, then swapped in at once; an invalid file is logged and the current data
+is kept. Only the memoized impacts that depend on the changed entries are dropped.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable, Hashable
+from pathlib import Path
+
+from ecologits.electricity_mix_repository import ElectricityMixRepository, electricity_mixes
+
+from src.cache import impacts_cache, refresh_data_version, request_zone
+from src.latency_estimator import THROUGHPUTS_PATH, latency_estimator
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = float(os.environ.get("ECOLOGITS_WATCH_INTERVAL", 5))
+ELECTRICITY_MIXES_ENV = "ECOLOGITS_ELECTRICITY_MIXES"
+
+
+class FileWatcher:
+    """Call `on_change(path)` from a daemon thread whenever the file is modified."""
+
+    def __init__(self, path: str | Path, on_change: Callable[[Path], None], interval: float = WATCH_INTERVAL) -> None:
+        self.path = Path(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.__stamp = self.__read_stamp()
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def __read_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Reload the file if it changed since the last check, return whether it did."""
+        stamp = self.__read_stamp()
+        if stamp is None or stamp == self.__stamp:
+            return False
+        # Remembered even if the reload fails, so a broken file is reported once
+        self.__stamp = stamp
+        try:
+            self.on_change(self.path)
+        except Exception:
+            logger.exception("Could not reload %s, keeping the current data", self.path)
+        return True
+
+    def __run(self) -> None:
+        while not self.__stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name=f"watch-{self.path.name}", daemon=True)
+            self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+
+#####################################################################################
+### RELOADERS
+#####################################################################################
+
+
+_listeners: list[Callable[[], None]] = []
+
+
+def on_reload(callback: Callable[[], None]) -> None:
+    """Register a callback run after any data file is reloaded, to refresh derived data."""
+    _listeners.append(callback)
+
+
+def _notify() -> None:
+    for callback in _listeners:
+        callback()
+
+
+def _clear_batch_tables(*names: str) -> None:
+    # Only when the batch scorer is in use, no need to import it otherwise
+    ingestion = sys.modules.get("src.ingestion")
+    if ingestion is not None:
+        for name in names:
+            getattr(ingestion, name).cache_clear()
+
+
+def reload_throughputs(path: str | Path = THROUGHPUTS_PATH) -> set[tuple[str, str]]:
+    """Swap in a new throughputs file and drop the impacts cached with the old throughputs."""
+    changed = latency_estimator.reload(path)
+    if changed:
+        def depends(key: Hashable) -> bool:
+            return key[0] == "llm_impacts" and (key[1], key[2]) in changed
+
+        removed = impacts_cache.invalidate(depends)
+        refresh_data_version()
+        _notify()
+        logger.info("Reloaded %s: %d models changed, %d cached impacts dropped", path, len(changed), removed)
+    return changed
+
+
+def reload_electricity_mixes(path: str | Path) -> set[str]:
+    """Swap in the electricity mixes of a CSV file and drop the impacts cached with the old ones."""
+    new_mixes = ElectricityMixRepository.from_csv(str(path)).list_electricity_mixes()
+    if not new_mixes:
+        raise ValueError(f"{path}: no electricity mix.")
+    current = electricity_mixes.list_electricity_mixes()
+    old = {em.zone: em for em in current}
+    new = {em.zone: em for em in new_mixes}
+    changed = {zone for zone in old.keys() | new.keys() if old.get(zone) != new.get(zone)}
+    if not changed:
+        return changed
+
+    # The ecologits repository is shared by every module that imported it: its list is
+    # replaced in place, in a single operation.
+    current[:] = new_mixes
+
+    def depends(key: Hashable) -> bool:
+        return key[0] == "llm_impacts" and request_zone(key[1], key[5]) in changed
+
+    removed = impacts_cache.invalidate(depends)
+    from src.electricity_mix import electricity_mix_table
+    electricity_mix_table.cache_clear()
+    _clear_batch_tables("_mix_table")
+    refresh_data_version()
+    _notify()
+    logger.info("Reloaded %s: %d zones changed, %d cached impacts dropped", path, len(changed), removed)
+    return changed
+
+
+#####################################################################################
+### WATCHERS
+#####################################################################################
+
+
+_watchers: list[FileWatcher] = []
+_watchers_lock = threading.Lock()
+
+
+def start_watchers(interval: float = WATCH_INTERVAL) -> list[FileWatcher]:
+    """Start watching the data files, once per process."""
+    with _watchers_lock:
+        if not _watchers:
+            _watchers.append(FileWatcher(THROUGHPUTS_PATH, reload_throughputs, interval))
+            mixes_path = os.environ.get(ELECTRICITY_MIXES_ENV)
+            if mixes_path:
+                try:
+                    reload_electricity_mixes(mixes_path)
+                except Exception:
+                    logger.exception("Could not load %s, keeping the repository electricity mixes", mixes_path)
+                _watchers.append(FileWatcher(mixes_path, reload_electricity_mixes, interval))
+            for watcher in _watchers:
+                watcher.start()
+        return list(_watchers)
+
+
+def stop_watchers() -> None:
+    with _watchers_lock:
+        for watcher in _watchers:
+            watcher.stop()
+        _watchers.clear()
@@ -0,0 +1,86 @@
+import functools
+from collections import deque
+from collections.abc import Callable
+from html import escape
+
+import streamlit as st
+
+from src.tracing import TRACE_ENABLED, Trace, current_trace, finish_trace, span, start_trace
+from src.warmup import StartupReport
+
+DEBUG_HISTORY = 10
+
+_COLORS = ["#00BF63", "#0B3B36", "#4CAF93", "#1E6F5C", "#86D9B5"]
+
+
+def debug_enabled() -> bool:
+    """Whether reruns are traced, with `ECOLOGITS_TRACE=1` or `?debug` in the URL."""
+    return TRACE_ENABLED or "debug" in st.query_params
+
+
+def record_trace(trace: Trace) -> None:
+    history = st.session_state.setdefault("debug_traces", deque(maxlen=DEBUG_HISTORY))
+    history.append(trace)
+
+
+def traced_fragment(func: Callable) -> Callable:
+    """
+    `st.fragment` traced as a span of the rerun of the app, or as a trace of its own
+    when the fragment reruns alone (app.py, which traces the reruns, does not run then).
+    """
+    name = func.__name__.lstrip("_")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_trace() is not None or not debug_enabled():
+            with span(name):
+                return func(*args, **kwargs)
+        trace = start_trace(f"{name} (fragment)")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_trace(finish_trace(trace))
+    return st.fragment(wrapper)
+
+
+def _flame(trace: Trace) -> str:
+    """Spans of a trace as nested bars, one row per depth, widths relative to the rerun."""
+    total = trace.duration or 1e-9
+    depth = max([s.depth for s in trace.spans] + [0]) + 1
+    bars = []
+    for s in trace.spans:
+        label = escape(f"{s.name} {s.duration * 1000:.1f} ms")
+        bars.append(
+            f"<div title='{label}' style='position:absolute;top:{s.depth * 22}px;height:20px;"
+            f"left:{100 * s.start / total:.3f}%;width:{max(100 * s.duration / total, 0.2):.3f}%;"
+            f"background:{_COLORS[s.depth % len(_COLORS)]};color:white;font-size:11px;"
+            f"overflow:hidden;white-space:nowrap;border-radius:2px'>&nbsp;{label}</div>"
+        )
+    return f"<div style='position:relative;height:{depth * 22}px;width:100%'>{''.join(bars)}</div>"
+
+
+def debug_panel(startup: StartupReport | None = None) -> None:
+    traces = list(st.session_state.get("debug_traces", []))
+    with st.expander(f"🐞 Performance of the last {len(traces)} reruns"):
+        if startup is not None:
+            st.markdown("**Startup** (once per server process)")
+            st.code(startup.format(), language=None)
+
+        for trace in reversed(traces):
+            st.markdown(f"**{trace.name}** · {trace.duration * 1000:.1f} ms")
+            st.html(_flame(trace))
+
+        if traces:
+            totals = {}
+            for trace in traces:
+                for s in trace.spans:
+                    count, duration = totals.get(s.name, (0, 0.))
+                    totals[s.name] = (count + 1, duration + s.duration)
+            st.dataframe(
+                [
+                    {"Stage": name, "Calls": count, "Mean [ms]": 1000 * duration / count, "Total [ms]": 1000 * duration}
+                    for name, (count, duration) in sorted(totals.items(), key=lambda x: -x[1][1])
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
@@ -0,0 +1,177 @@
+"""
+Optional on-disk cache of formatted impacts, shared across restarts and by every
+process of a host.
+
+Enabled by setting `ECOLOGITS_DISK_CACHE` to the path of a SQLite database. Entries
+are keyed by a SHA-256 of the canonical JSON of the inputs, including the throughput
+and electricity mix they were computed with (see `src.cache.llm_data_version`), and
+of the ecologits version. Entries of other versions are never read but are kept, as
+other processes sharing the database may still use them (e.g. during a rolling
+deploy): they are evicted with the rest once they are no longer read.
+
+The database is in WAL mode, so readers of every process never block each other nor
+the writer. Above `ECOLOGITS_DISK_CACHE_SIZE` entries, the least recently read ones
+are evicted. Any database error is logged and the entry is computed as if the cache
+were disabled.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+from typing import Any
+
+from ecologits.impacts.modeling import Embodied, Usage
+
+from src.utils import QImpacts, q
+
+logger = logging.getLogger(__name__)
+
+DISK_CACHE_PATH = os.environ.get("ECOLOGITS_DISK_CACHE")
+DISK_CACHE_SIZE = int(os.environ.get("ECOLOGITS_DISK_CACHE_SIZE", 100_000))
+
+# Bump when the stored format changes, entries of other formats are then dropped
+SCHEMA_VERSION = 1
+# Seconds between two updates of the read time of an entry, to avoid a write per read
+TOUCH_INTERVAL = 60 * 60
+BUSY_TIMEOUT = 5.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_version ON entries (version);
+"""
+
+
+def canonical_key(inputs: Any, version: str) -> str:
+    """SHA-256 of the inputs (JSON types only) and of the ecologits version."""
+    payload = json.dumps([SCHEMA_VERSION, version, inputs], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+#####################################################################################
+### SERIALIZATION
+#####################################################################################
+
+
+def dump_formatted(formatted: tuple[QImpacts, Usage, Embodied]) -> str:
+    """JSON of the result of `format_impacts`."""
+    impacts, usage, embodied = formatted
+    quantities = {}
+    for f in fields(QImpacts):
+        value = getattr(impacts, f.name)
+        if value is not None and f.name != "ranges":
+            quantities[f.name] = [float(value.magnitude), str(value.units)]
+    return json.dumps({
+        "impacts": quantities,
+        "ranges": impacts.ranges,
+        "usage": usage.model_dump(mode="json"),
+        "embodied": embodied.model_dump(mode="json"),
+    }, separators=(",", ":"))
+
+
+def load_formatted(text: str) -> tuple[QImpacts, Usage, Embodied]:
+    data = json.loads(text)
+    impacts = QImpacts(
+        ranges=data["ranges"],
+        **{name: q(magnitude, unit) for name, (magnitude, unit) in data["impacts"].items()},
+    )
+    return impacts, Usage.model_validate(data["usage"]), Embodied.model_validate(data["embodied"])
+
+
+#####################################################################################
+### DATABASE
+#####################################################################################
+
+
+class DiskCache:
+    """Size-capped SQLite key-value store with one connection per thread."""
+
+    def __init__(self, path: str, maxsize: int = DISK_CACHE_SIZE, touch_interval: float = TOUCH_INTERVAL) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self.touch_interval = touch_interval
+        self.version = ""
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__writes = 0
+        # Number of writes between two checks of the size
+        self.__check_every = max(1, min(100, maxsize // 10))
+
+    def __connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self.__local.connection = connection
+        return connection
+
+    def set_version(self, version: str) -> None:
+        """Read and write entries of `version` from now on."""
+        self.version = version
+
+    def get(self, key: str) -> str | None:
+        try:
+            connection = self.__connection()
+            row = connection.execute(
+                "SELECT value, accessed FROM entries WHERE key = ? AND version = ?", (key, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > self.touch_interval:
+                connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+        except sqlite3.Error:
+            logger.exception("Could not read the disk cache %s", self.path)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            self.__connection().execute(
+                "INSERT OR REPLACE INTO entries (key, version, value, accessed) VALUES (?, ?, ?, ?)",
+                (key, self.version, value, time.time()),
+            )
+            with self.__lock:
+                self.__writes += 1
+                check = self.__writes % self.__check_every == 0
+            if check:
+                self.evict()
+        except sqlite3.Error:
+            logger.exception("Could not write to the disk cache %s", self.path)
+
+    def evict(self) -> int:
+        """Delete the least recently read entries above `maxsize`, down to 90 % of it."""
+        connection = self.__connection()
+        size = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if size <= self.maxsize:
+            return 0
+        cursor = connection.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+            (size - int(self.maxsize * 0.9),),
+        )
+        return cursor.rowcount
+
+    def get_or_compute(self, inputs: Any, compute, dump=dump_formatted, load=load_formatted):
+        key = canonical_key(inputs, self.version)
+        text = self.get(key)
+        if text is not None:
+            return load(text)
+        value = compute()
+        self.set(key, dump(value))
+        return value
+
+    def __len__(self) -> int:
+        return self.__connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
+import pandas as pd
+from ecologits.electricity_mix_repository import electricity_mixes
+
 
 PATH = "src/data/electricity_mix.csv"
 COUNTRY_CODES = [
@@ -72,3 +77,44 @@ def format_country_name(code: str) -> str | None:
 
 def format_electricity_mix_criterion(criterion: str) -> str | None:
     return CRITERIA.get(criterion)
+
+
+@lru_cache(maxsize=1)
+def electricity_mix_table() -> pd.DataFrame:
+    """
+    Impact factors (gwp, adpe, pe, wue per kWh) of every zone of `COUNTRY_CODES`, in the
+    same order. Built once per process and shared: do not modify it.
+    """
+    rows = []
+    for _, code in COUNTRY_CODES:
+        em = electricity_mixes.find_electricity_mix(code)
+        if em is not None:
+            rows.append((code, em.gwp, em.adpe, em.pe, em.wue))
+    return pd.DataFrame(rows, columns=["zone", "gwp", "adpe", "pe", "wue"])
+
+
+def location_sweep(**kwargs) -> pd.DataFrame:
+    """
+    Impacts of one request in every zone of `COUNTRY_CODES`, in a single batch evaluation.
+
+    Takes the arguments of `compute_llm_impacts` except the electricity mix ones and
+    returns one row per zone with its energy, gwp, adpe, pe and wcf.
+    """
+    from src.engine import compute_llm_impacts_batch
+
+    mixes = electricity_mix_table()
+    impacts = compute_llm_impacts_batch(
+        if_electricity_mix_gwp=mixes["gwp"].to_numpy(),
+        if_electricity_mix_adpe=mixes["adpe"].to_numpy(),
+        if_electricity_mix_pe=mixes["pe"].to_numpy(),
+        if_electricity_mix_wue=mixes["wue"].to_numpy(),
+        **kwargs,
+    )
+    return pd.DataFrame({
+        "zone": mixes["zone"],
+        "energy": impacts.energy,
+        "gwp": impacts.gwp,
+        "adpe": impacts.adpe,
+        "pe": impacts.pe,
+        "wcf": impacts.wcf,
+    })
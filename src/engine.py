@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+
+import numpy as np
+from ecologits.impacts.llm import (
+    BATCH_SIZE,
+    GPU_EMBODIED_IMPACT_ADPE,
+    GPU_EMBODIED_IMPACT_GWP,
+    GPU_EMBODIED_IMPACT_PE,
+    GPU_ENERGY_ALPHA,
+    GPU_ENERGY_BETA,
+    GPU_ENERGY_GAMMA,
+    GPU_MEMORY,
+    HARDWARE_LIFESPAN,
+    LATENCY_ALPHA,
+    LATENCY_BETA,
+    LATENCY_GAMMA,
+    MODEL_QUANTIZATION_BITS,
+    SERVER_EMBODIED_IMPACT_ADPE,
+    SERVER_EMBODIED_IMPACT_GWP,
+    SERVER_EMBODIED_IMPACT_PE,
+    SERVER_GPUS,
+    SERVER_POWER,
+)
+
+#####################################################################################
+### BATCH IMPACTS ENGINE
+#####################################################################################
+#
+# Column-oriented (NumPy) port of `ecologits.impacts.llm.compute_llm_impacts`.
+# Every input can be a scalar or an array, inputs are broadcast together and each
+# row gives the same figures as one scalar call. Operations are written in the same
+# order as the ecologits DAG assets so that results match to the last bits.
+#
+# Range values (RangeValue) are not handled here: evaluate the batch once with the
+# lower bounds and once with the upper bounds, like `compute_llm_impacts` does.
+
+
+@dataclass
+class BatchImpacts:
+    """Struct-of-arrays impacts, one row per request (kWh, kgCO2eq, kgSbeq, MJ, L)."""
+    energy: np.ndarray
+    gwp: np.ndarray
+    adpe: np.ndarray
+    pe: np.ndarray
+    wcf: np.ndarray
+    usage_gwp: np.ndarray
+    usage_adpe: np.ndarray
+    usage_pe: np.ndarray
+    usage_wcf: np.ndarray
+    embodied_gwp: np.ndarray
+    embodied_adpe: np.ndarray
+    embodied_pe: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.energy)
+
+    def __getitem__(self, item) -> BatchImpacts:
+        return BatchImpacts(**{f.name: getattr(self, f.name)[item] for f in fields(self)})
+
+    @property
+    def usage_energy(self) -> np.ndarray:
+        return self.energy
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def concatenate(cls, batches: list[BatchImpacts]) -> BatchImpacts:
+        return cls(**{
+            f.name: np.concatenate([getattr(b, f.name) for b in batches])
+            for f in fields(cls)
+        })
+
+    @classmethod
+    def midpoint(cls, low: BatchImpacts, high: BatchImpacts) -> BatchImpacts:
+        """Mean of two bounds, as `RangeValue.mean` does for the scalar path."""
+        return cls(**{
+            f.name: (getattr(low, f.name) + getattr(high, f.name)) / 2
+            for f in fields(cls)
+        })
+
+
+def compute_llm_impacts_batch(
+        model_active_parameter_count,
+        model_total_parameter_count,
+        output_token_count,
+        if_electricity_mix_adpe,
+        if_electricity_mix_pe,
+        if_electricity_mix_gwp,
+        if_electricity_mix_wue,
+        datacenter_pue,
+        datacenter_wue,
+        request_latency=None,
+        model_quantization_bits: int = MODEL_QUANTIZATION_BITS,
+        gpu_energy_alpha: float = GPU_ENERGY_ALPHA,
+        gpu_energy_beta: float = GPU_ENERGY_BETA,
+        gpu_energy_gamma: float = GPU_ENERGY_GAMMA,
+        latency_alpha: float = LATENCY_ALPHA,
+        latency_beta: float = LATENCY_BETA,
+        latency_gamma: float = LATENCY_GAMMA,
+        gpu_memory: float = GPU_MEMORY,
+        gpu_embodied_gwp: float = GPU_EMBODIED_IMPACT_GWP,
+        gpu_embodied_adpe: float = GPU_EMBODIED_IMPACT_ADPE,
+        gpu_embodied_pe: float = GPU_EMBODIED_IMPACT_PE,
+        server_gpu_count: int = SERVER_GPUS,
+        server_power: float = SERVER_POWER,
+        server_embodied_gwp: float = SERVER_EMBODIED_IMPACT_GWP,
+        server_embodied_adpe: float = SERVER_EMBODIED_IMPACT_ADPE,
+        server_embodied_pe: float = SERVER_EMBODIED_IMPACT_PE,
+        server_lifetime: float = HARDWARE_LIFESPAN,
+        batch_size: int = BATCH_SIZE,
+) -> BatchImpacts:
+    """
+    Compute the impacts of many LLM generation requests at once.
+
+    Takes the same arguments as `ecologits.impacts.llm.compute_llm_impacts` but as
+    scalars or 1-D arrays. A missing (`None` or NaN) request latency is treated as
+    unknown, as in the scalar path.
+    """
+    active = np.asarray(model_active_parameter_count, dtype=np.float64)
+    total = np.asarray(model_total_parameter_count, dtype=np.float64)
+    tokens = np.asarray(output_token_count, dtype=np.float64)
+    if request_latency is None:
+        request_latency = np.inf
+    latency = np.asarray(request_latency, dtype=np.float64)
+    pue = np.asarray(datacenter_pue, dtype=np.float64)
+    wue = np.asarray(datacenter_wue, dtype=np.float64)
+    mix_gwp = np.asarray(if_electricity_mix_gwp, dtype=np.float64)
+    mix_adpe = np.asarray(if_electricity_mix_adpe, dtype=np.float64)
+    mix_pe = np.asarray(if_electricity_mix_pe, dtype=np.float64)
+    mix_wue = np.asarray(if_electricity_mix_wue, dtype=np.float64)
+
+    # gpu_energy
+    gpu_energy_per_token = gpu_energy_alpha * np.exp(gpu_energy_beta * batch_size) * active + gpu_energy_gamma
+    gpu_energy_per_token = gpu_energy_per_token / 1000
+    gpu_energy = tokens * gpu_energy_per_token
+
+    # generation_latency
+    latency_per_token = latency_alpha * active + latency_beta * batch_size + latency_gamma
+    gpu_latency = tokens * latency_per_token
+    generation_latency = np.where(latency < gpu_latency, latency, gpu_latency)
+
+    # model_required_memory / gpu_required_count
+    model_required_memory = 1.2 * total * model_quantization_bits / 8
+    gpu_nb = np.ceil(model_required_memory / gpu_memory)
+    with np.errstate(divide="ignore"):
+        gpu_required_count = 2 ** np.ceil(np.log2(gpu_nb))
+
+    # server_energy / request_energy
+    server_energy = (generation_latency / 3600) * server_power * (gpu_required_count / server_gpu_count) * (1 / batch_size)
+    request_energy = pue * (server_energy + gpu_required_count * gpu_energy)
+
+    # usage
+    usage_gwp = request_energy * mix_gwp
+    usage_adpe = request_energy * mix_adpe
+    usage_pe = request_energy * mix_pe
+    usage_wcf = request_energy * (wue + pue * mix_wue)
+
+    # embodied
+    server_gpu_embodied_gwp = (gpu_required_count / server_gpu_count) * server_embodied_gwp + gpu_required_count * gpu_embodied_gwp
+    server_gpu_embodied_adpe = (gpu_required_count / server_gpu_count) * server_embodied_adpe + gpu_required_count * gpu_embodied_adpe
+    server_gpu_embodied_pe = (gpu_required_count / server_gpu_count) * server_embodied_pe + gpu_required_count * gpu_embodied_pe
+    embodied_gwp = generation_latency * server_gpu_embodied_gwp / (server_lifetime * batch_size)
+    embodied_adpe = generation_latency * server_gpu_embodied_adpe / (server_lifetime * batch_size)
+    embodied_pe = generation_latency * server_gpu_embodied_pe / (server_lifetime * batch_size)
+
+    columns = np.broadcast_arrays(
+        request_energy,
+        usage_gwp + embodied_gwp,
+        usage_adpe + embodied_adpe,
+        usage_pe + embodied_pe,
+        usage_wcf,
+        usage_gwp,
+        usage_adpe,
+        usage_pe,
+        usage_wcf,
+        embodied_gwp,
+        embodied_adpe,
+        embodied_pe,
+    )
+    return BatchImpacts(*(np.atleast_1d(c) for c in columns))
@@ -0,0 +1,154 @@
+"""
+Equivalences of the impacts (running, electric vehicle, streaming, power plants, ...).
+
+Every registered equivalence is computed in one pass from raw floats or arrays in the
+ecologits units (kWh for energy, kgCO2eq for GHG emissions), without pint. New
+equivalences are added to the registry with `register_equivalence` or
+`register_linear_equivalence`.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.utils import (
+    AIRPLANE_PARIS_NYC_GWP_EQ,
+    DAYS_IN_YEAR,
+    EV_ENERGY_EQ,
+    ONE_PERCENT_WORLD_POPULATION,
+    RUNNING_ENERGY_EQ,
+    STREAMING_GWP_EQ,
+    WALKING_ENERGY_EQ,
+    YEARLY_IRELAND_ELECTRICITY_CONSUMPTION,
+    YEARLY_NUCLEAR_ENERGY_EQ,
+    YEARLY_WIND_ENERGY_EQ,
+    EnergyProduction,
+    PhysicalActivity,
+    scale_array,
+)
+
+# Raw factors of the reference data, in ecologits units
+_RUNNING_KWH_PER_KM = RUNNING_ENERGY_EQ.to("kWh / km").magnitude
+_WALKING_KWH_PER_KM = WALKING_ENERGY_EQ.to("kWh / km").magnitude
+_EV_KWH_PER_KM = EV_ENERGY_EQ.to("kWh / km").magnitude
+_STREAMING_H_PER_KG = STREAMING_GWP_EQ.to("h / kgCO2eq").magnitude
+_YEARLY_NUCLEAR_KWH = YEARLY_NUCLEAR_ENERGY_EQ.to("kWh").magnitude
+_YEARLY_WIND_KWH = YEARLY_WIND_ENERGY_EQ.to("kWh").magnitude
+_YEARLY_IRELAND_KWH = YEARLY_IRELAND_ELECTRICITY_CONSUMPTION.to("kWh").magnitude
+_AIRPLANE_PARIS_NYC_KG = AIRPLANE_PARIS_NYC_GWP_EQ.to("kgCO2eq").magnitude
+_WORLD_YEAR = ONE_PERCENT_WORLD_POPULATION * DAYS_IN_YEAR
+
+# Same units as the pint helpers of `src.utils`
+DISTANCE_SCALES = (("km", 1.), ("meter", 1e3))
+DURATION_SCALES = (("h", 1.), ("min", 60.), ("s", 3600.))
+COUNT_SCALES = (("", 1.),)
+
+
+@dataclass(frozen=True)
+class EquivalenceValue:
+    magnitude: float
+    unit: str
+    kind: str | None = None
+
+
+@dataclass(frozen=True)
+class EquivalenceResult:
+    """Equivalences of many impacts: magnitudes, units and optional kind (e.g. running or walking)."""
+    magnitude: np.ndarray
+    unit: np.ndarray
+    kind: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.magnitude)
+
+    def __getitem__(self, i: int) -> EquivalenceValue:
+        return EquivalenceValue(
+            magnitude=float(self.magnitude[i]),
+            unit=str(self.unit[i]),
+            kind=str(self.kind[i]) if self.kind is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class Equivalence:
+    name: str
+    criterion: str  # "energy" (kWh) or "gwp" (kgCO2eq)
+    compute: Callable[[np.ndarray], EquivalenceResult]
+
+
+EQUIVALENCES: dict[str, Equivalence] = {}
+
+
+def register_equivalence(name: str, criterion: str):
+    """Register a function computing an `EquivalenceResult` from an array of raw impacts."""
+    def register(compute: Callable[[np.ndarray], EquivalenceResult]):
+        EQUIVALENCES[name] = Equivalence(name=name, criterion=criterion, compute=compute)
+        return compute
+    return register
+
+
+def register_linear_equivalence(name: str, criterion: str, factor: float, scales=COUNT_SCALES) -> None:
+    """Register an equivalence proportional to the impact, shown in the best unit of `scales`."""
+    def compute(values: np.ndarray) -> EquivalenceResult:
+        return EquivalenceResult(*scale_array(values * factor, scales))
+    EQUIVALENCES[name] = Equivalence(name=name, criterion=criterion, compute=compute)
+
+
+#####################################################################################
+### EQUIVALENCES
+#####################################################################################
+
+
+@register_equivalence("physical_activity", "energy")
+def _physical_activity(energy: np.ndarray) -> EquivalenceResult:
+    # Running when it is more than 1 km, walking otherwise
+    running = energy / _RUNNING_KWH_PER_KM
+    is_running = running > 1
+    distance = np.where(is_running, running, energy / _WALKING_KWH_PER_KM)
+    magnitude, unit = scale_array(distance, DISTANCE_SCALES)
+    kind = np.where(is_running, PhysicalActivity.RUNNING.value, PhysicalActivity.WALKING.value).astype(object)
+    return EquivalenceResult(magnitude, unit, kind)
+
+
+@register_equivalence("electricity_production", "energy")
+def _electricity_production(energy: np.ndarray) -> EquivalenceResult:
+    # Nuclear power plants when it is more than one plant, wind turbines otherwise
+    yearly = energy * _WORLD_YEAR
+    is_nuclear = yearly > _YEARLY_NUCLEAR_KWH
+    count = np.where(is_nuclear, yearly / _YEARLY_NUCLEAR_KWH, yearly / _YEARLY_WIND_KWH)
+    kind = np.where(is_nuclear, EnergyProduction.NUCLEAR.value, EnergyProduction.WIND.value).astype(object)
+    return EquivalenceResult(count, np.full(count.shape, "", dtype=object), kind)
+
+
+register_linear_equivalence("electric_vehicle", "energy", 1 / _EV_KWH_PER_KM, DISTANCE_SCALES)
+register_linear_equivalence("electricity_consumption_ireland", "energy", _WORLD_YEAR / _YEARLY_IRELAND_KWH)
+register_linear_equivalence("streaming", "gwp", _STREAMING_H_PER_KG, DURATION_SCALES)
+register_linear_equivalence("airplane_paris_nyc", "gwp", _WORLD_YEAR / _AIRPLANE_PARIS_NYC_KG)
+
+
+#####################################################################################
+### ENGINE
+#####################################################################################
+
+
+class EquivalenceEngine:
+    """Compute every equivalence of a registry at once."""
+
+    def __init__(self, equivalences: dict[str, Equivalence] | None = None) -> None:
+        self.equivalences = EQUIVALENCES if equivalences is None else equivalences
+
+    def compute(self, energy, gwp) -> dict[str, EquivalenceResult]:
+        """Equivalences of impacts in kWh and kgCO2eq (floats or arrays of the same length)."""
+        values = {
+            "energy": np.atleast_1d(np.asarray(energy, dtype=np.float64)),
+            "gwp": np.atleast_1d(np.asarray(gwp, dtype=np.float64)),
+        }
+        return {name: eq.compute(values[eq.criterion]) for name, eq in self.equivalences.items()}
+
+    def compute_one(self, energy: float, gwp: float) -> dict[str, EquivalenceValue]:
+        return {name: result[0] for name, result in self.compute(energy, gwp).items()}
+
+
+equivalence_engine = EquivalenceEngine()
@@ -1,284 +1,384 @@
-import pandas as pd
-import streamlit as st
-from ecologits.electricity_mix_repository import electricity_mixes
-from ecologits.impacts.llm import compute_llm_impacts
-
-from src.latency_estimator import latency_estimator
-from src.utils import format_impacts
-from src.impacts import display_impacts
-from src.electricity_mix import COUNTRY_CODES, format_electricity_mix_criterion, format_country_name
-from src.models import load_models
-from src.constants import PROMPTS
-from src.constants import PROMPTS
-
-import plotly.express as px
-
-
-def expert_mode():
-    st.markdown("### 🤓 Expert mode")
-
-    with st.container(border=True):
-        st.markdown("###### Configure the model")
-
-        ########## Model info ##########
-
-        provider_col, model_col = st.columns(2)
-
-        df = load_models(filter_main=True)
-
-        with provider_col:
-            providers_clean = [x for x in df["provider_clean"].unique()]
-            provider_exp = st.selectbox(
-                label="Provider",
-                options=providers_clean,
-                index=providers_clean.index("OpenAI"),
-                key=1,
-            )
-
-        with model_col:
-            models_clean = [
-                x
-                for x in df["name_clean"].unique()
-                if x in df[df["provider_clean"] == provider_exp]["name_clean"].unique()
-            ]
-            model_exp = st.selectbox(
-                label="Model",
-                options=models_clean,
-                key=2,
-            )
-
-        df_filtered = df[
-            (df["provider_clean"] == provider_exp) & (df["name_clean"] == model_exp)
-        ]
-
-        try:
-            total_params = int(df_filtered["total_parameters"].iloc[0])
-        except:
-            total_params = int(
-                (
-                    df_filtered["total_parameters"].values[0]["min"]
-                    + df_filtered["total_parameters"].values[0]["max"]
-                )
-                / 2
-            )
-
-        try:
-            active_params = int(df_filtered["active_parameters"].iloc[0])
-        except:
-            active_params = int(
-                (
-                    df_filtered["active_parameters"].values[0]["min"]
-                    + df_filtered["active_parameters"].values[0]["max"]
-                )
-                / 2
-            )
-
-        provider_raw = df_filtered["provider"].values[0]
-        model_name_raw = df_filtered["name"].values[0]
-        tps_raw = latency_estimator.get_throughput(provider_raw, model_name_raw)
-
-        ########## Model parameters ##########
-
-        active_params_col, total_params_col, throughput_col = st.columns(3)
-
-        with active_params_col:
-            active_params = st.number_input("Active parameters (B)", 0, None, active_params)
-
-        with total_params_col:
-            total_params = st.number_input("Total parameters (B)", 0, None, total_params)
-
-        with throughput_col:
-            throughput = st.number_input("Average TPS", 1.0, None, tps_raw)
-
-
-    with st.container(border=True):
-        st.markdown("###### Configure the prompt")
-
-        prompt_col, token_col = st.columns(2)
-
-        with prompt_col:
-            output_tokens_exp = st.selectbox(
-                label="Example prompt", options=[x[0] for x in PROMPTS], key=3
-            )
-
-        with token_col:
-            output_tokens = st.number_input(
-                label="Output completion tokens",
-                min_value=0,
-                value=[x[1] for x in PROMPTS if x[0] == output_tokens_exp][0],
-            )
-
-
-    with st.container(border=True):
-        st.markdown("###### Configure the data center")
-
-        dc_pue_col, dc_wue_col, dc_location_col = st.columns(3)
-        with dc_pue_col:
-            datacenter_pue = st.number_input(
-                label="Data center PUE",
-                value=1.2,
-                min_value=1.0
-            )
-        with dc_wue_col:
-            datacenter_wue = st.number_input(
-                label="Data center WUE [L / kWh]",
-                value=0.6,
-                min_value=0.
-            )
-        with dc_location_col:
-            dc_location = st.selectbox(
-                label="Data center location",
-                options=[c[1] for c in COUNTRY_CODES],
-                format_func=format_country_name,
-                index=0
-            )
-
-        em_gwp_col, em_adpe_col, em_pe_col, em_wue_col = st.columns(4)
-        electricity_mix = electricity_mixes.find_electricity_mix(dc_location)
-        with em_gwp_col:
-            em_gwp = st.number_input(
-                label="GHG emissions [kgCO2eq / kWh]",
-                value=electricity_mix.gwp,
-                format="%0.6f",
-            )
-        with em_adpe_col:
-            em_adpe = st.number_input(
-                label="Abiotic resources [kgSbeq / kWh]",
-                value=electricity_mix.adpe,
-                format="%0.13f",
-            )
-        with em_pe_col:
-            em_pe = st.number_input(
-                label="Primary energy [MJ / kWh]",
-                value=electricity_mix.pe,
-                format="%0.3f",
-            )
-        with em_wue_col:
-            em_wue = st.number_input(
-                label="Water consumption [L / kWh]",
-                value=electricity_mix.wue,
-                format="%0.3f",
-            )
-
-    estimated_latency = latency_estimator.estimate(
-        provider=provider_raw,
-        model_name=model_name_raw,
-        output_tokens=output_tokens,
-        throughput=throughput
-    )
-
-    impacts = compute_llm_impacts(
-        model_active_parameter_count=active_params,
-        model_total_parameter_count=total_params,
-        output_token_count=output_tokens,
-        request_latency=estimated_latency,
-        if_electricity_mix_gwp=em_gwp,
-        if_electricity_mix_adpe=em_adpe,
-        if_electricity_mix_pe=em_pe,
-        if_electricity_mix_wue=em_wue,
-        datacenter_pue=datacenter_pue,
-        datacenter_wue=datacenter_wue
-    )
-
-    impacts, usage, embodied = format_impacts(impacts)
-
-    with st.container(border=True):
-        st.markdown(
-            '<h3 align="center">Environmental Impacts</h2>', unsafe_allow_html=True
-        )
-
-        display_impacts(impacts)
-
-    with st.expander("⚖️ Usage vs Embodied"):
-        st.markdown(
-            '<h3 align="center">Embodied vs Usage comparison</h2>',
-            unsafe_allow_html=True,
-        )
-
-        st.markdown(
-            "The usage impacts account for the electricity consumption of the model while the embodied impacts account for resource extraction (e.g., minerals and metals), manufacturing, and transportation of the hardware."
-        )
-
-        col_ghg_comparison, col_adpe_comparison, col_pe_comparison = st.columns(3)
-
-        with col_ghg_comparison:
-            fig_gwp = px.pie(
-                values=[
-                    usage.gwp.value if isinstance(usage.gwp.value, float) else usage.gwp.value.mean,
-                    embodied.gwp.value if isinstance(embodied.gwp.value, float) else embodied.gwp.value.mean,
-                ],
-                names=["usage", "embodied"],
-                title="GHG emissions",
-                color_discrete_sequence=["#00BF63", "#0B3B36"],
-                width=100,
-            )
-            fig_gwp.update_layout(showlegend=False, title_x=0.5)
-
-            st.plotly_chart(fig_gwp)
-
-        with col_adpe_comparison:
-            fig_adpe = px.pie(
-                values=[
-                    usage.adpe.value if isinstance(usage.adpe.value, float) else usage.adpe.value.mean,
-                    embodied.adpe.value if isinstance(embodied.adpe.value, float) else embodied.adpe.value.mean,
-                ],
-                names=["usage", "embodied"],
-                title="Abiotic depletion",
-                color_discrete_sequence=["#0B3B36", "#00BF63"],
-                width=100,
-            )
-            fig_adpe.update_layout(showlegend=False, title_x=0.5)
-
-            st.plotly_chart(fig_adpe)
-
-        with col_pe_comparison:
-            fig_pe = px.pie(
-                values=[
-                    usage.pe.value if isinstance(usage.pe.value, float) else usage.pe.value.mean,
-                    embodied.pe.value if isinstance(embodied.pe.value, float) else embodied.pe.value.mean,
-                ],
-                names=["usage", "embodied"],
-                title="Primary energy",
-                color_discrete_sequence=["#00BF63", "#0B3B36"],
-                width=100,
-            )
-            fig_pe.update_layout(showlegend=False, title_x=0.5)
-
-            st.plotly_chart(fig_pe)
-
-    with st.expander("🌍️ Location impact"):
-        st.markdown(
-            '<h4 align="center">How can location impact the footprint ?</h4>',
-            unsafe_allow_html=True,
-        )
-
-        countries_to_compare = st.multiselect(
-            label="Countries to compare",
-            options=[c[1] for c in COUNTRY_CODES],
-            format_func=format_country_name,
-            default=["FRA", "USA", "CHN"],
-        )
-
-        try:
-            impact_type = st.selectbox(
-                label="Select an impact type to compare",
-                options=["gwp", "adpe", "pe", "wue"],
-                format_func=format_electricity_mix_criterion,
-                index=0,
-            )
-
-            df_comp = pd.DataFrame([em for em in electricity_mixes.list_electricity_mixes() if em.zone in countries_to_compare])
-            df_comp = df_comp.sort_values(by=impact_type, ascending=True)
-
-            fig_2 = px.bar(
-                df_comp,
-                x=df_comp.zone.apply(format_country_name),
-                y=impact_type,
-                text=impact_type,
-                color=impact_type,
-            )
-
-            st.plotly_chart(fig_2)
-
-        except:
-            st.warning("Can't display chart with no values.")
+import pandas as pd
+import streamlit as st
+
+from src.cache import data_version
+from src.debug import traced_fragment
+from src.expert_graph import expert_graph
+from src.utils import IMPACTS_SCALES, scale_factor, scale_value
+from src.impacts import display_impacts
+from src.electricity_mix import (
+    COUNTRY_CODES,
+    electricity_mix_table,
+    format_electricity_mix_criterion,
+    format_country_name,
+)
+from src.catalog import get_catalog
+from src.charts import pie_chart
+from src.tracing import span
+from src.constants import IMPACTS_LABELS, PROMPTS
+from src.constants import PROMPTS
+
+import plotly.express as px
+
+
+def expert_mode():
+    st.markdown("### 🤓 Expert mode")
+
+    _expert()
+
+
+# Changing the configuration only reruns expert mode. Expanders with widgets are fragments
+# of their own, given the values they depend on, so their widgets only rerun them.
+# Everything is computed by the nodes of `expert_graph`, memoized per session so that
+# only the ones depending on the changed inputs are recomputed.
+@traced_fragment
+def _expert():
+    evaluation = st.session_state.setdefault("expert_evaluation", expert_graph.evaluation())
+    evaluation.set(data_version=data_version())
+
+    with st.container(border=True):
+        st.markdown("###### Configure the model")
+
+        ########## Model info ##########
+
+        provider_col, model_col = st.columns(2)
+
+        with span("load_models"):
+            catalog = get_catalog(filter_main=True)
+
+        with provider_col:
+            providers_clean = list(catalog.providers)
+            provider_exp = st.selectbox(
+                label="Provider",
+                options=providers_clean,
+                index=providers_clean.index("OpenAI"),
+                key=1,
+            )
+
+        with model_col:
+            model_exp = st.selectbox(
+                label="Model",
+                options=catalog.models(provider_exp),
+                key=2,
+            )
+
+        evaluation.set(provider=provider_exp, model=model_exp)
+        default_active_params, default_total_params = evaluation["default_parameters"]
+
+        ########## Model parameters ##########
+
+        active_params_col, total_params_col, throughput_col = st.columns(3)
+
+        with active_params_col:
+            active_params = st.number_input("Active parameters (B)", 0, None, default_active_params)
+
+        with total_params_col:
+            total_params = st.number_input("Total parameters (B)", 0, None, default_total_params)
+
+        with throughput_col:
+            throughput = st.number_input("Average TPS", 1.0, None, evaluation["default_throughput"])
+
+        evaluation.set(active_parameters=active_params, total_parameters=total_params, throughput=throughput)
+
+
+    with st.container(border=True):
+        st.markdown("###### Configure the prompt")
+
+        prompt_col, token_col = st.columns(2)
+
+        with prompt_col:
+            output_tokens_exp = st.selectbox(
+                label="Example prompt", options=[x[0] for x in PROMPTS], key=3
+            )
+
+        with token_col:
+            output_tokens = st.number_input(
+                label="Output completion tokens",
+                min_value=0,
+                value=[x[1] for x in PROMPTS if x[0] == output_tokens_exp][0],
+            )
+
+        evaluation.set(output_tokens=output_tokens)
+
+
+    with st.container(border=True):
+        st.markdown("###### Configure the data center")
+
+        dc_pue_col, dc_wue_col, dc_location_col = st.columns(3)
+        with dc_pue_col:
+            datacenter_pue = st.number_input(
+                label="Data center PUE",
+                value=1.2,
+                min_value=1.0
+            )
+        with dc_wue_col:
+            datacenter_wue = st.number_input(
+                label="Data center WUE [L / kWh]",
+                value=0.6,
+                min_value=0.
+            )
+        with dc_location_col:
+            dc_location = st.selectbox(
+                label="Data center location",
+                options=[c[1] for c in COUNTRY_CODES],
+                format_func=format_country_name,
+                index=0
+            )
+
+        evaluation.set(datacenter_pue=datacenter_pue, datacenter_wue=datacenter_wue, location=dc_location)
+
+        em_gwp_col, em_adpe_col, em_pe_col, em_wue_col = st.columns(4)
+        electricity_mix = evaluation["electricity_mix"]
+        with em_gwp_col:
+            em_gwp = st.number_input(
+                label="GHG emissions [kgCO2eq / kWh]",
+                value=electricity_mix.gwp,
+                format="%0.6f",
+            )
+        with em_adpe_col:
+            em_adpe = st.number_input(
+                label="Abiotic resources [kgSbeq / kWh]",
+                value=electricity_mix.adpe,
+                format="%0.13f",
+            )
+        with em_pe_col:
+            em_pe = st.number_input(
+                label="Primary energy [MJ / kWh]",
+                value=electricity_mix.pe,
+                format="%0.3f",
+            )
+        with em_wue_col:
+            em_wue = st.number_input(
+                label="Water consumption [L / kWh]",
+                value=electricity_mix.wue,
+                format="%0.3f",
+            )
+
+        evaluation.set(
+            electricity_mix_gwp=em_gwp,
+            electricity_mix_adpe=em_adpe,
+            electricity_mix_pe=em_pe,
+            electricity_mix_wue=em_wue,
+        )
+
+    with st.container(border=True):
+        st.markdown(
+            '<h3 align="center">Environmental Impacts</h2>', unsafe_allow_html=True
+        )
+
+        impacts, usage, embodied = evaluation["formatted_impacts"]
+        display_impacts(impacts)
+
+    with st.expander("⚖️ Usage vs Embodied"), span("usage_vs_embodied"):
+        st.markdown(
+            '<h3 align="center">Embodied vs Usage comparison</h2>',
+            unsafe_allow_html=True,
+        )
+
+        st.markdown(
+            "The usage impacts account for the electricity consumption of the model while the embodied impacts account for resource extraction (e.g., minerals and metals), manufacturing, and transportation of the hardware."
+        )
+
+        col_ghg_comparison, col_adpe_comparison, col_pe_comparison = st.columns(3)
+
+        with col_ghg_comparison:
+            pie_chart(
+                values=[
+                    usage.gwp.value if isinstance(usage.gwp.value, float) else usage.gwp.value.mean,
+                    embodied.gwp.value if isinstance(embodied.gwp.value, float) else embodied.gwp.value.mean,
+                ],
+                names=["usage", "embodied"],
+                title="GHG emissions",
+                colors=["#00BF63", "#0B3B36"],
+            )
+
+        with col_adpe_comparison:
+            pie_chart(
+                values=[
+                    usage.adpe.value if isinstance(usage.adpe.value, float) else usage.adpe.value.mean,
+                    embodied.adpe.value if isinstance(embodied.adpe.value, float) else embodied.adpe.value.mean,
+                ],
+                names=["usage", "embodied"],
+                title="Abiotic depletion",
+                colors=["#0B3B36", "#00BF63"],
+            )
+
+        with col_pe_comparison:
+            pie_chart(
+                values=[
+                    usage.pe.value if isinstance(usage.pe.value, float) else usage.pe.value.mean,
+                    embodied.pe.value if isinstance(embodied.pe.value, float) else embodied.pe.value.mean,
+                ],
+                names=["usage", "embodied"],
+                title="Primary energy",
+                colors=["#00BF63", "#0B3B36"],
+            )
+
+    with st.expander("📏 Output tokens"):
+        _token_sweep(evaluation)
+
+    with st.expander("🌍️ Location impact"):
+        _location_impact(evaluation)
+
+    with st.expander("🎲 Uncertainty"):
+        _uncertainty(evaluation)
+
+
+@traced_fragment
+def _token_sweep(evaluation):
+    with span("token_sweep"):
+        st.markdown(
+            '<h4 align="center">How do the impacts grow with the length of the answer ?</h4>',
+            unsafe_allow_html=True,
+        )
+
+        token_criterion_col, max_tokens_col = st.columns(2)
+        with token_criterion_col:
+            token_criterion = st.selectbox(
+                label="Impacts of",
+                options=["gwp", "energy", "adpe", "pe", "wcf"],
+                format_func=lambda c: IMPACTS_LABELS[c],
+                key="token_sweep_criterion",
+            )
+        output_tokens = evaluation["output_tokens"]
+        with max_tokens_col:
+            max_tokens = st.number_input("Up to output tokens", 1, None, max(4 * output_tokens, 1000))
+
+        evaluation.set(sweep_max_tokens=max_tokens)
+        sweep_tokens, _ = evaluation["token_sweep"]
+        sweep_values = evaluation[f"{token_criterion}_sweep"]
+        scales = IMPACTS_SCALES[token_criterion]
+        _, unit = scale_value(sweep_values[-1], scales)
+        fig_tokens = px.line(
+            x=sweep_tokens,
+            y=sweep_values * scale_factor(unit, scales),
+            labels={"x": "Output tokens", "y": f"{IMPACTS_LABELS[token_criterion]} [{unit}]"},
+            color_discrete_sequence=["#00BF63"],
+        )
+        fig_tokens.add_vline(x=output_tokens, line_dash="dot", line_color="#0B3B36")
+        st.plotly_chart(fig_tokens)
+
+
+@traced_fragment
+def _location_impact(evaluation):
+    with span("location_impact"):
+        st.markdown(
+            '<h4 align="center">How can location impact the footprint ?</h4>',
+            unsafe_allow_html=True,
+        )
+
+        countries_to_compare = st.multiselect(
+            label="Countries to compare",
+            options=[c[1] for c in COUNTRY_CODES],
+            format_func=format_country_name,
+            default=["FRA", "USA", "CHN"],
+        )
+
+        try:
+            impact_type = st.selectbox(
+                label="Select an impact type to compare",
+                options=["gwp", "adpe", "pe", "wue"],
+                format_func=format_electricity_mix_criterion,
+                index=0,
+            )
+
+            df_comp = electricity_mix_table()
+            df_comp = df_comp[df_comp.zone.isin(countries_to_compare)].sort_values(by=impact_type, ascending=True)
+
+            fig_2 = px.bar(
+                df_comp,
+                x=df_comp.zone.apply(format_country_name),
+                y=impact_type,
+                text=impact_type,
+                color=impact_type,
+            )
+
+            st.plotly_chart(fig_2)
+
+        except:
+            st.warning("Can't display chart with no values.")
+
+        st.markdown(
+            '<h4 align="center">Impacts of this request in every country</h4>',
+            unsafe_allow_html=True,
+        )
+
+        sweep_criterion = st.selectbox(
+            label="Sort countries by",
+            options=["gwp", "adpe", "pe", "wcf", "energy"],
+            format_func=lambda c: IMPACTS_LABELS[c],
+            index=0,
+        )
+
+        df_sweep = evaluation["location_impacts"].sort_values(by=sweep_criterion, ascending=True)
+
+        # One display unit per column, chosen from its smallest value
+        columns = {"Country": df_sweep.zone.map(format_country_name)}
+        for criterion in ["energy", "gwp", "adpe", "pe", "wcf"]:
+            scales = IMPACTS_SCALES[criterion]
+            _, unit = scale_value(df_sweep[criterion].min(), scales)
+            columns[f"{IMPACTS_LABELS[criterion]} [{unit}]"] = df_sweep[criterion] * scale_factor(unit, scales)
+        st.dataframe(pd.DataFrame(columns), hide_index=True, use_container_width=True)
+
+
+@traced_fragment
+def _uncertainty(evaluation):
+    with span("monte_carlo"):
+        st.markdown(
+            '<h4 align="center">How uncertain are these impacts ?</h4>',
+            unsafe_allow_html=True,
+        )
+
+        st.markdown(
+            "Parameters, throughput and data center efficiency are sampled from distributions and the impacts of every sample are computed to show how spread out the results are."
+        )
+
+        # Models with unreleased architectures start with the uncertainty of their parameter range
+        default_spread = evaluation["default_params_spread"]
+
+        spread_params_col, spread_tps_col, spread_dc_col, kind_col = st.columns(4)
+        with spread_params_col:
+            params_spread = st.slider("Parameters uncertainty (± %)", 0, 100, default_spread)
+        with spread_tps_col:
+            tps_spread = st.slider("Throughput uncertainty (± %)", 0, 90, 20)
+        with spread_dc_col:
+            dc_spread = st.slider("PUE and WUE uncertainty (± %)", 0, 50, 10)
+        with kind_col:
+            kind = st.selectbox("Distribution", options=["uniform", "triangular"])
+
+        evaluation.set(params_spread=params_spread, tps_spread=tps_spread, dc_spread=dc_spread, distribution_kind=kind)
+        result = evaluation["monte_carlo"]
+
+        percentiles = result.percentiles((5., 50., 95.))
+        rows = []
+        for criterion in ["energy", "gwp", "adpe", "pe", "wcf"]:
+            scales = IMPACTS_SCALES[criterion]
+            _, unit = scale_value(percentiles[criterion][50.], scales)
+            factor = scale_factor(unit, scales)
+            rows.append({
+                "Criterion": IMPACTS_LABELS[criterion],
+                "Unit": unit,
+                "5th percentile": percentiles[criterion][5.] * factor,
+                "Median": percentiles[criterion][50.] * factor,
+                "Mean": result.mean(criterion) * factor,
+                "95th percentile": percentiles[criterion][95.] * factor,
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+        histogram_criterion = st.selectbox(
+            label="Distribution of",
+            options=["gwp", "adpe", "pe", "wcf", "energy"],
+            format_func=lambda c: IMPACTS_LABELS[c],
+        )
+        counts, edges = result.histogram(histogram_criterion)
+        scales = IMPACTS_SCALES[histogram_criterion]
+        _, unit = scale_value(percentiles[histogram_criterion][50.], scales)
+        centers = (edges[:-1] + edges[1:]) / 2 * scale_factor(unit, scales)
+        fig_mc = px.bar(
+            x=centers,
+            y=counts / len(result),
+            labels={"x": f"{IMPACTS_LABELS[histogram_criterion]} [{unit}]", "y": "Share of samples"},
+            color_discrete_sequence=["#00BF63"],
+        )
+        fig_mc.update_layout(bargap=0)
+        st.plotly_chart(fig_mc)
@@ -0,0 +1,284 @@
+"""
+Computations of expert mode as a graph of memoized nodes (see `src.graph`).
+
+The inputs are the widgets of expert mode (`provider`, `model`, `active_parameters`,
+`total_parameters`, `throughput`, `output_tokens`, `datacenter_pue`, `datacenter_wue`,
+`location` and the `electricity_mix_*` factors), the ones of its expanders and the
+`data_version` of the throughputs and electricity mixes.
+
+Energy and embodied impacts do not depend on the electricity mix nor on the water
+usage of the data center, and every usage impact is the energy times a factor of its
+own, so every criterion is a node: changing the WUE only recomputes the water
+consumption and what displays it, changing the location never looks up the catalog.
+
+The formatted impacts are also stored in the cache of `src.cache`, keyed by the inputs
+they depend on, so that they are shared between sessions and survive restarts when
+the disk cache is enabled.
+"""
+from __future__ import annotations
+
+import numpy as np
+from ecologits.electricity_mix_repository import electricity_mixes
+from ecologits.impacts.modeling import GWP, PE, WCF, ADPe, Usage
+from ecologits.utils.range_value import RangeValue
+
+from src.cache import cached_formatted_impacts
+from src.catalog import get_catalog
+from src.coefficients import extract_coefficients
+from src.electricity_mix import location_sweep
+from src.graph import Graph
+from src.latency_estimator import latency_estimator
+from src.montecarlo import distribution, run_monte_carlo
+from src.utils import QImpacts, format_adpe, format_energy, format_gwp, format_pe, format_wcf
+
+SWEEP_POINTS = 201
+
+expert_graph = Graph()
+
+
+def _mean(value) -> float:
+    return value.mean if isinstance(value, RangeValue) else value
+
+
+#####################################################################################
+### MODEL AND LOCATION
+#####################################################################################
+
+
+@expert_graph.node
+def record(provider, model):
+    return get_catalog(filter_main=True).find_by_display_name(provider, model)
+
+
+@expert_graph.node
+def default_parameters(record) -> tuple[int, int]:
+    """Active and total parameters, ranges of unreleased architectures collapsed to their mean."""
+    return int(_mean(record.active_parameters)), int(_mean(record.total_parameters))
+
+
+@expert_graph.node
+def default_throughput(record, data_version) -> float:
+    return latency_estimator.get_throughput(record.provider, record.name)
+
+
+@expert_graph.node
+def default_params_spread(record) -> int:
+    """Uncertainty on the parameters (± %) of models with unreleased architectures."""
+    if not isinstance(record.active_parameters, RangeValue):
+        return 0
+    low, high = record.active_parameters.min, record.active_parameters.max
+    return round(100 * (high - low) / (high + low))
+
+
+@expert_graph.node
+def electricity_mix(location, data_version):
+    return electricity_mixes.find_electricity_mix(location)
+
+
+@expert_graph.node
+def latency(record, output_tokens, throughput) -> float:
+    return latency_estimator.estimate(
+        provider=record.provider,
+        model_name=record.name,
+        output_tokens=output_tokens,
+        throughput=throughput,
+    )
+
+
+#####################################################################################
+### IMPACTS
+#####################################################################################
+
+
+@expert_graph.node
+def coefficients(active_parameters, total_parameters, datacenter_pue):
+    """Energy and embodied impacts per token and second, without any electricity mix."""
+    return extract_coefficients(
+        model_active_parameter_count=float(active_parameters),
+        model_total_parameter_count=float(total_parameters),
+        if_electricity_mix_adpe=0.,
+        if_electricity_mix_pe=0.,
+        if_electricity_mix_gwp=0.,
+        if_electricity_mix_wue=0.,
+        datacenter_pue=float(datacenter_pue),
+        datacenter_wue=0.,
+    )
+
+
+@expert_graph.node
+def request(coefficients, output_tokens, latency):
+    return coefficients.impacts(output_tokens, latency)
+
+
+@expert_graph.node
+def energy(request):
+    return request.energy
+
+
+@expert_graph.node
+def embodied(request):
+    return request.embodied
+
+
+@expert_graph.node
+def water_factor(electricity_mix_wue, datacenter_wue, datacenter_pue) -> float:
+    """Water consumed per kWh, on site and to produce the electricity."""
+    return float(datacenter_wue) + float(datacenter_pue) * float(electricity_mix_wue)
+
+
+@expert_graph.node
+def usage_gwp(energy, electricity_mix_gwp):
+    return GWP(value=energy.value * electricity_mix_gwp)
+
+
+@expert_graph.node
+def usage_adpe(energy, electricity_mix_adpe):
+    return ADPe(value=energy.value * electricity_mix_adpe)
+
+
+@expert_graph.node
+def usage_pe(energy, electricity_mix_pe):
+    return PE(value=energy.value * electricity_mix_pe)
+
+
+@expert_graph.node
+def usage_wcf(energy, water_factor):
+    return WCF(value=energy.value * water_factor)
+
+
+@expert_graph.node
+def usage(energy, usage_gwp, usage_adpe, usage_pe, usage_wcf):
+    return Usage(energy=energy, gwp=usage_gwp, adpe=usage_adpe, pe=usage_pe, wcf=usage_wcf)
+
+
+@expert_graph.node
+def energy_display(energy):
+    return format_energy(energy.value)
+
+
+@expert_graph.node
+def gwp_display(usage_gwp, embodied):
+    return format_gwp((usage_gwp + embodied.gwp).value)
+
+
+@expert_graph.node
+def adpe_display(usage_adpe, embodied):
+    return format_adpe((usage_adpe + embodied.adpe).value)
+
+
+@expert_graph.node
+def pe_display(usage_pe, embodied):
+    return format_pe((usage_pe + embodied.pe).value)
+
+
+@expert_graph.node
+def wcf_display(usage_wcf):
+    return format_wcf(usage_wcf.value)
+
+
+@expert_graph.node
+def impacts(energy_display, gwp_display, adpe_display, pe_display, wcf_display) -> QImpacts:
+    """Formatted impacts, as returned by `format_impacts`."""
+    return QImpacts(energy=energy_display, gwp=gwp_display, adpe=adpe_display, pe=pe_display, wcf=wcf_display)
+
+
+def _store(inputs, compute):
+    return cached_formatted_impacts({"view": "expert", **inputs}, compute)
+
+
+@expert_graph.node(store=_store)
+def formatted_impacts(impacts, usage, embodied):
+    """Formatted impacts, usage and embodied impacts, as returned by `format_impacts`."""
+    return impacts, usage, embodied
+
+
+#####################################################################################
+### OUTPUT TOKENS
+#####################################################################################
+
+
+@expert_graph.node
+def token_sweep(coefficients, throughput, sweep_max_tokens):
+    """Energy and embodied impacts from 0 to `sweep_max_tokens` output tokens."""
+    tokens = np.linspace(0, sweep_max_tokens, SWEEP_POINTS)
+    return tokens, coefficients.evaluate(tokens, tokens / throughput)
+
+
+@expert_graph.node
+def energy_sweep(token_sweep) -> np.ndarray:
+    return token_sweep[1].energy
+
+
+@expert_graph.node
+def gwp_sweep(token_sweep, electricity_mix_gwp) -> np.ndarray:
+    return token_sweep[1].energy * electricity_mix_gwp + token_sweep[1].embodied_gwp
+
+
+@expert_graph.node
+def adpe_sweep(token_sweep, electricity_mix_adpe) -> np.ndarray:
+    return token_sweep[1].energy * electricity_mix_adpe + token_sweep[1].embodied_adpe
+
+
+@expert_graph.node
+def pe_sweep(token_sweep, electricity_mix_pe) -> np.ndarray:
+    return token_sweep[1].energy * electricity_mix_pe + token_sweep[1].embodied_pe
+
+
+@expert_graph.node
+def wcf_sweep(token_sweep, water_factor) -> np.ndarray:
+    return token_sweep[1].energy * water_factor
+
+
+#####################################################################################
+### LOCATIONS AND UNCERTAINTY
+#####################################################################################
+
+
+@expert_graph.node
+def locations(active_parameters, total_parameters, output_tokens, latency, datacenter_pue):
+    """Impacts of the request in every zone, without the water consumed on site."""
+    return location_sweep(
+        model_active_parameter_count=active_parameters,
+        model_total_parameter_count=total_parameters,
+        output_token_count=output_tokens,
+        request_latency=latency,
+        datacenter_pue=datacenter_pue,
+        datacenter_wue=0.,
+    )
+
+
+@expert_graph.node
+def location_impacts(locations, datacenter_wue):
+    return locations.assign(wcf=locations["wcf"] + locations["energy"] * datacenter_wue)
+
+
+@expert_graph.node
+def monte_carlo(
+        active_parameters,
+        total_parameters,
+        throughput,
+        output_tokens,
+        datacenter_pue,
+        datacenter_wue,
+        electricity_mix_gwp,
+        electricity_mix_adpe,
+        electricity_mix_pe,
+        electricity_mix_wue,
+        params_spread,
+        tps_spread,
+        dc_spread,
+        distribution_kind,
+):
+    return run_monte_carlo(
+        active_parameters=distribution(active_parameters, params_spread / 100, distribution_kind),
+        total_parameters=distribution(total_parameters, params_spread / 100, distribution_kind),
+        throughput=distribution(throughput, tps_spread / 100, distribution_kind),
+        datacenter_pue=distribution(datacenter_pue, dc_spread / 100, distribution_kind),
+        datacenter_wue=distribution(datacenter_wue, dc_spread / 100, distribution_kind),
+        output_tokens=output_tokens,
+        electricity_mix_gwp=electricity_mix_gwp,
+        electricity_mix_adpe=electricity_mix_adpe,
+        electricity_mix_pe=electricity_mix_pe,
+        electricity_mix_wue=electricity_mix_wue,
+        seed=0,
+    )
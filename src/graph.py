@@ -0,0 +1,159 @@
+"""
+Incremental evaluation of a graph of memoized computations.
+
+Nodes are functions whose parameters name the inputs and nodes they depend on, like
+the assets of the ecologits DAG. An `Evaluation` holds the values of the inputs and of
+the nodes computed from them. Nodes are computed when read, and only again when one
+of their dependencies changed since: setting an input to a new value invalidates the
+nodes downstream of it and nothing else. A node recomputed to a value equal to the
+previous one does not invalidate its own dependents.
+
+    graph = Graph()
+
+    @graph.node
+    def energy(tokens, energy_per_token):
+        return tokens * energy_per_token
+
+    evaluation = graph.evaluation()
+    evaluation.set(tokens=100, energy_per_token=1e-6)
+    evaluation["energy"]
+
+A node registered with a `store` is also looked up in it, keyed by the values of the
+inputs it depends on, before its dependencies are even computed. That lets results
+outlive the evaluation, e.g. in the disk cache of `src.cache`.
+"""
+from __future__ import annotations
+
+import inspect
+from collections.abc import Callable
+from typing import Any
+
+from src.tracing import span
+
+# Looks up a node from the values of the inputs it depends on, computing it on a miss
+Store = Callable[[dict[str, Any], Callable[[], Any]], Any]
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Whether two values are equal, values without a boolean equality (arrays, frames) never are."""
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class Graph:
+    """Nodes and their dependencies, shared by every evaluation."""
+
+    def __init__(self) -> None:
+        self.__nodes: dict[str, Callable] = {}
+        self.__dependencies: dict[str, tuple[str, ...]] = {}
+        self.__stores: dict[str, Store] = {}
+        self.__inputs: dict[str, tuple[str, ...]] = {}
+
+    def node(self, func: Callable | None = None, *, store: Store | None = None) -> Callable:
+        """Register a node named after the function, depending on its parameters."""
+        if func is None:
+            return lambda f: self.node(f, store=store)
+        self.__inputs.clear()
+        self.__nodes[func.__name__] = func
+        self.__dependencies[func.__name__] = tuple(inspect.signature(func).parameters)
+        if store is not None:
+            self.__stores[func.__name__] = store
+        return func
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__nodes
+
+    def function(self, name: str) -> Callable:
+        return self.__nodes[name]
+
+    def dependencies(self, name: str) -> tuple[str, ...]:
+        return self.__dependencies[name]
+
+    def store(self, name: str) -> Store | None:
+        return self.__stores.get(name)
+
+    def inputs(self, name: str) -> tuple[str, ...]:
+        """Inputs a node depends on, directly or through other nodes, sorted."""
+        if name in self.__inputs:
+            return self.__inputs[name]
+        inputs, seen, stack = set(), set(), [name]
+        while stack:
+            for dependency in self.__dependencies[stack.pop()]:
+                if dependency in seen:
+                    continue
+                seen.add(dependency)
+                if dependency in self.__nodes:
+                    stack.append(dependency)
+                else:
+                    inputs.add(dependency)
+        self.__inputs[name] = tuple(sorted(inputs))
+        return self.__inputs[name]
+
+    def evaluation(self) -> Evaluation:
+        return Evaluation(self)
+
+
+class Evaluation:
+    """Values of the inputs and memoized nodes of a graph, for one user of it."""
+
+    def __init__(self, graph: Graph) -> None:
+        self.graph = graph
+        self.__values: dict[str, Any] = {}
+        # Revision at which every input or node last changed value
+        self.__changed: dict[str, int] = {}
+        # Revisions of the dependencies of every node when it was last computed
+        self.__computed_from: dict[str, tuple[int, ...]] = {}
+        self.__revision = 0
+        self.__pending: set[str] = set()
+        self.recomputed: list[str] = []  # nodes computed since the last change of an input
+
+    def set(self, **inputs: Any) -> None:
+        for name, value in inputs.items():
+            if name in self.graph:
+                raise ValueError(f"`{name}` is a node, not an input.")
+            if name in self.__values and _same(self.__values[name], value):
+                continue
+            self.__revision += 1
+            self.recomputed = []
+            self.__values[name] = value
+            self.__changed[name] = self.__revision
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.graph:
+            if name not in self.__values:
+                raise KeyError(f"`{name}` is neither a node nor a set input.")
+            return self.__values[name]
+        if name in self.__pending:
+            raise ValueError(f"`{name}` depends on itself.")
+
+        store = self.graph.store(name)
+        # A stored node is stamped with its inputs, so that a hit never computes the nodes in between
+        dependencies = self.graph.inputs(name) if store is not None else self.graph.dependencies(name)
+        arguments = self.__arguments(name, dependencies)
+        revisions = tuple(self.__changed[d] for d in dependencies)
+        if self.__computed_from.get(name) == revisions:
+            return self.__values[name]
+
+        function = self.graph.function(name)
+        with span(name):
+            if store is None:
+                value = function(**arguments)
+            else:
+                value = store(arguments, lambda: function(**self.__arguments(name, self.graph.dependencies(name))))
+        self.recomputed.append(name)
+        if name not in self.__values or not _same(self.__values[name], value):
+            self.__changed[name] = self.__revision
+        self.__values[name] = value
+        self.__computed_from[name] = revisions
+        return value
+
+    def __arguments(self, name: str, dependencies: tuple[str, ...]) -> dict[str, Any]:
+        self.__pending.add(name)
+        try:
+            return {d: self[d] for d in dependencies}
+        finally:
+            self.__pending.discard(name)
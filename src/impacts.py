@@ -1,16 +1,17 @@
 import streamlit as st
 from src.utils import (
-    format_energy_eq_electric_vehicle,
-    format_energy_eq_electricity_consumption_ireland,
-    format_energy_eq_electricity_production,
-    format_energy_eq_physical_activity,
-    format_gwp_eq_airplane_paris_nyc,
-    format_gwp_eq_streaming, range_plot,
+    ENERGY_SCALES,
+    GWP_SCALES,
     PhysicalActivity,
     EnergyProduction,
+    scale_factor,
 )
+from src.charts import range_chart
+from src.equivalences import equivalence_engine
+from src.tracing import traced
 
 
+@traced()
 def display_impacts(impacts):
     st.divider()
 
@@ -20,7 +21,7 @@ def display_impacts(impacts):
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'>⚡️</p><p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>Energy</p>""", unsafe_allow_html = True)
         st.markdown(f'<p align="center">Electricity consumption</p>', unsafe_allow_html = True)
         if impacts.ranges:
-            range_plot(impacts.energy.magnitude,impacts.energy_min.magnitude, impacts.energy_max.magnitude, impacts.energy.units)
+            range_chart(impacts.energy.magnitude,impacts.energy_min.magnitude, impacts.energy_max.magnitude, impacts.energy.units)
         else:
             st.latex(f'\Large {impacts.energy.magnitude:.3g} \ \large {impacts.energy.units}')
 
@@ -28,7 +29,7 @@ def display_impacts(impacts):
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'>🌍️</p><p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>GHG Emissions</p>""", unsafe_allow_html = True)
         st.markdown(f'<p align="center">Effect on global warming</p>', unsafe_allow_html = True)
         if impacts.ranges:
-            range_plot(impacts.gwp.magnitude,impacts.gwp_min.magnitude, impacts.gwp_max.magnitude, impacts.gwp.units)
+            range_chart(impacts.gwp.magnitude,impacts.gwp_min.magnitude, impacts.gwp_max.magnitude, impacts.gwp.units)
         else:
             st.latex(f'\Large {impacts.gwp.magnitude:.3g} \ \large {impacts.gwp.units}')
 
@@ -41,7 +42,7 @@ def display_impacts(impacts):
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>Abiotic Resources</p>""", unsafe_allow_html = True)
         st.markdown('<p align="center"> Use of metals and minerals</p>', unsafe_allow_html = True)
         if impacts.ranges:
-            range_plot(impacts.adpe.magnitude, impacts.adpe_min.magnitude, impacts.adpe_max.magnitude, impacts.adpe.units)
+            range_chart(impacts.adpe.magnitude, impacts.adpe_min.magnitude, impacts.adpe_max.magnitude, impacts.adpe.units)
         else:
             st.latex(f'\Large {impacts.adpe.magnitude:.3g} \ \large {impacts.adpe.units}')
 
@@ -50,7 +51,7 @@ def display_impacts(impacts):
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>Primary Energy</p>""", unsafe_allow_html = True)
         st.markdown(f'<p align="center">Use of natural energy resources</p>', unsafe_allow_html = True)
         if impacts.ranges:
-            range_plot(impacts.pe.magnitude, impacts.pe_min.magnitude, impacts.pe_max.magnitude, impacts.pe.units)
+            range_chart(impacts.pe.magnitude, impacts.pe_min.magnitude, impacts.pe_max.magnitude, impacts.pe.units)
         else:
             st.latex(f'\Large {impacts.pe.magnitude:.3g} \ \large {impacts.pe.units}')
 
@@ -59,7 +60,7 @@ def display_impacts(impacts):
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>Water</p>""", unsafe_allow_html = True)
         st.markdown(f'<p align="center">Water consumption</p>', unsafe_allow_html = True)
         if impacts.ranges:
-            range_plot(impacts.wcf.magnitude, impacts.wcf_min.magnitude, impacts.wcf_max.magnitude, impacts.wcf.units)
+            range_chart(impacts.wcf.magnitude, impacts.wcf_min.magnitude, impacts.wcf_max.magnitude, impacts.wcf.units)
         else:
             st.latex(f'\Large {impacts.wcf.magnitude:.3g} \ \large {impacts.wcf.units}')
         
@@ -68,17 +69,24 @@ def display_impacts(impacts):
 ############################################################################################################
 
 
+def compute_equivalents(impacts):
+    """All the equivalences of formatted impacts, computed in one pass from raw floats."""
+    energy = impacts.energy.magnitude / scale_factor(str(impacts.energy.units), ENERGY_SCALES)
+    gwp = impacts.gwp.magnitude / scale_factor(str(impacts.gwp.units), GWP_SCALES)
+    return equivalence_engine.compute_one(energy, gwp)
+
+
+@traced()
 def display_equivalent(impacts):
     st.divider()
 
-    ev_eq = format_energy_eq_electric_vehicle(impacts.energy)
-
-    streaming_eq = format_gwp_eq_streaming(impacts.gwp)
+    equivalents = compute_equivalents(impacts)
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        physical_activity, distance = format_energy_eq_physical_activity(impacts.energy)
+        distance = equivalents["physical_activity"]
+        physical_activity = distance.kind
         if physical_activity == PhysicalActivity.WALKING:
             physical_activity = "🚶 " + physical_activity.capitalize()
         if physical_activity == PhysicalActivity.RUNNING:
@@ -87,27 +95,27 @@ def display_equivalent(impacts):
         st.markdown(
             f'<h4 align="center">{physical_activity}</h4>', unsafe_allow_html=True
         )
-        st.latex(f"\Large {distance.magnitude:.3g} \ \large {distance.units}")
+        st.latex(f"\Large {distance.magnitude:.3g} \ \large {distance.unit}")
         st.markdown(
             '<p align="center"><i>Based on energy consumption<i></p>',
             unsafe_allow_html=True,
         )
 
     with col2:
-        ev_eq = format_energy_eq_electric_vehicle(impacts.energy)
+        ev_eq = equivalents["electric_vehicle"]
         st.markdown(
             '<h4 align="center">🔋 Electric Vehicle</h4>', unsafe_allow_html=True
         )
-        st.latex(f"\Large {ev_eq.magnitude:.3g} \ \large {ev_eq.units}")
+        st.latex(f"\Large {ev_eq.magnitude:.3g} \ \large {ev_eq.unit}")
         st.markdown(
             '<p align="center"><i>Based on energy consumption<i></p>',
             unsafe_allow_html=True,
         )
 
     with col3:
-        streaming_eq = format_gwp_eq_streaming(impacts.gwp)
+        streaming_eq = equivalents["streaming"]
         st.markdown('<h4 align="center">⏯️ Streaming</h4>', unsafe_allow_html=True)
-        st.latex(f"\Large {streaming_eq.magnitude:.3g} \ \large {streaming_eq.units}")
+        st.latex(f"\Large {streaming_eq.magnitude:.3g} \ \large {streaming_eq.unit}")
         st.markdown(
             '<p align="center"><i>Based on GHG emissions<i></p>',
             unsafe_allow_html=True,
@@ -127,9 +135,8 @@ def display_equivalent(impacts):
     col4, col5, col6 = st.columns(3)
 
     with col4:
-        electricity_production, count = format_energy_eq_electricity_production(
-            impacts.energy
-        )
+        count = equivalents["electricity_production"]
+        electricity_production = count.kind
         if electricity_production == EnergyProduction.NUCLEAR:
             emoji = "☢️"
             name = "Nuclear power plants"
@@ -146,7 +153,7 @@ def display_equivalent(impacts):
         )
 
     with col5:
-        ireland_count = format_energy_eq_electricity_consumption_ireland(impacts.energy)
+        ireland_count = equivalents["electricity_consumption_ireland"]
         st.markdown(
             f'<h4 align="center">🇮🇪 {ireland_count.magnitude:.3f} x Ireland <span style="font-size: 12px">(yearly ⚡️ cons.)</span></h2></h4>',
             unsafe_allow_html=True,
@@ -157,32 +164,34 @@ def display_equivalent(impacts):
         )
 
     with col6:
-        paris_nyc_airplane = format_gwp_eq_airplane_paris_nyc(impacts.gwp)
+        paris_nyc_airplane = equivalents["airplane_paris_nyc"]
         st.markdown(f'<h4 align="center">✈️ {round(paris_nyc_airplane.magnitude):,} Paris ↔ NYC</h4>', unsafe_allow_html = True)
         st.markdown(f'<p align="center"><i>Based on GHG emissions<i></p>', unsafe_allow_html = True)
 
+@traced()
 def display_equivalent_energy(impacts):
     st.markdown('<br>', unsafe_allow_html = True)
     
-    ev_eq = format_energy_eq_electric_vehicle(impacts.energy)
+    equivalents = compute_equivalents(impacts)
     
     col1, col2, col3 = st.columns(3)
 
     with col2:
-        physical_activity, distance = format_energy_eq_physical_activity(impacts.energy)
+        distance = equivalents["physical_activity"]
+        physical_activity = distance.kind
         if physical_activity == PhysicalActivity.WALKING:
             physical_activity = "🚶 " + physical_activity.capitalize()
         if physical_activity == PhysicalActivity.RUNNING:
             physical_activity = "🏃 " + physical_activity.capitalize()
 
         st.markdown(f'<h4 align="center">{physical_activity}</h4>', unsafe_allow_html = True)
-        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈  {distance.magnitude:.3g} <i>{distance.units} </p>""", unsafe_allow_html = True)
+        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈  {distance.magnitude:.3g} <i>{distance.unit} </p>""", unsafe_allow_html = True)
     
 
     with col3:
-        ev_eq = format_energy_eq_electric_vehicle(impacts.energy)
+        ev_eq = equivalents["electric_vehicle"]
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>🔋 Electric Vehicle</p>""", unsafe_allow_html = True)
-        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈ {ev_eq.magnitude:.3g} <i>{ev_eq.units} </p>""", unsafe_allow_html = True)
+        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈ {ev_eq.magnitude:.3g} <i>{ev_eq.unit} </p>""", unsafe_allow_html = True)
     
     with col1:
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>⚡️Energy</p>""", unsafe_allow_html = True)
@@ -198,7 +207,8 @@ def display_equivalent_energy(impacts):
 
     with col4:
 
-        electricity_production, count = format_energy_eq_electricity_production(impacts.energy)
+        count = equivalents["electricity_production"]
+        electricity_production = count.kind
         if electricity_production == EnergyProduction.NUCLEAR:
             emoji = "☢️"
             name = "Nuclear power plants"
@@ -209,15 +219,16 @@ def display_equivalent_energy(impacts):
         st.markdown(f'<p align="center">Energy produced yearly </p>', unsafe_allow_html = True)
         
     with col5:
-        ireland_count = format_energy_eq_electricity_consumption_ireland(impacts.energy)
+        ireland_count = equivalents["electricity_consumption_ireland"]
         st.markdown(f'<h4 align="center">⚡️ 🇮🇪 {ireland_count.magnitude:.3f} x Ireland </h4>', unsafe_allow_html = True)
         st.markdown(f'<p align="center">Yearly electricity consumption</p>', unsafe_allow_html = True)
 
     
+@traced()
 def display_equivalent_ghg(impacts):
     st.markdown('<br>', unsafe_allow_html = True)
       
-    streaming_eq = format_gwp_eq_streaming(impacts.gwp)
+    equivalents = compute_equivalents(impacts)
 
     col1, col2, col3 = st.columns(3)
 
@@ -229,9 +240,9 @@ def display_equivalent_ghg(impacts):
        
     
     with col2:
-        streaming_eq = format_gwp_eq_streaming(impacts.gwp)
+        streaming_eq = equivalents["streaming"]
         st.markdown(f"""<p style='font-size:30px;text-align: center;margin-bottom :2px'><strong>⏯️ Streaming</p>""", unsafe_allow_html = True)
-        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈ {streaming_eq.magnitude:.3g} <i>{streaming_eq.units} </p>""", unsafe_allow_html = True)
+        st.markdown(f"""<p style='font-size:35px;text-align: center'>≈ {streaming_eq.magnitude:.3g} <i>{streaming_eq.unit} </p>""", unsafe_allow_html = True)
         
     
     st.divider()
@@ -243,6 +254,6 @@ def display_equivalent_ghg(impacts):
     col4, col5, col6 = st.columns(3)
 
     with col5:
-        paris_nyc_airplane = format_gwp_eq_airplane_paris_nyc(impacts.gwp)
+        paris_nyc_airplane = equivalents["airplane_paris_nyc"]
         st.markdown(f'<h4 align="center">✈️ {round(paris_nyc_airplane.magnitude):,} Paris ↔ NYC</h4>', unsafe_allow_html = True)
         st.markdown(f'<p align="center"><i>Based on GHG emissions<i></p>', unsafe_allow_html = True)
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Score production request logs chunk by chunk.
+
+Reads CSV, JSONL or Parquet logs with one request per row (`provider`, `model`,
+`output_tokens` and an optional `latency` in seconds), computes the impacts of every
+request with the batch engine and streams the results to a file of the same kinds.
+Only one chunk is held in memory at a time.
+
+Usage:
+    python -m src.ingestion requests.csv impacts.csv --chunk-size 100000
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ecologits.electricity_mix_repository import electricity_mixes
+from ecologits.tracers.utils import PROVIDER_CONFIG_MAP
+from ecologits.utils.range_value import RangeValue
+
+from src.catalog import get_catalog
+from src.engine import BatchImpacts, compute_llm_impacts_batch
+from src.latency_estimator import latency_estimator
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+LOG_COLUMNS = ["provider", "model", "output_tokens", "latency"]
+
+IMPACT_COLUMNS = ["energy", "gwp", "adpe", "pe", "wcf"]
+SPLIT_COLUMNS = [
+    "usage_gwp",
+    "usage_adpe",
+    "usage_pe",
+    "usage_wcf",
+    "embodied_gwp",
+    "embodied_adpe",
+    "embodied_pe",
+]
+
+
+#####################################################################################
+### READERS / WRITERS
+#####################################################################################
+
+
+def _file_format(path: str | Path) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Unsupported log format `{suffix}`, expected CSV, JSONL or Parquet.")
+
+
+def read_logs(path: str | Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a log file as DataFrames of at most `chunk_size` rows."""
+    file_format = _file_format(path)
+    if file_format == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif file_format == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def write_results(chunks: Iterable[pd.DataFrame], path: str | Path) -> int:
+    """Write scored chunks to `path` as they come and return the number of rows."""
+    file_format = _file_format(path)
+    rows = 0
+    writer = None
+    with open(path, "wb") as fd:
+        for i, chunk in enumerate(chunks):
+            if file_format == "csv":
+                chunk.to_csv(fd, header=(i == 0), index=False)
+            elif file_format == "jsonl":
+                chunk.to_json(fd, orient="records", lines=True)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(fd, table.schema)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+            rows += len(chunk)
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+#####################################################################################
+### SCORING
+#####################################################################################
+
+
+def _bounds(value) -> tuple[float, float]:
+    if isinstance(value, RangeValue):
+        return float(value.min), float(value.max)
+    return float(value), float(value)
+
+
+@lru_cache(maxsize=1)
+def _model_table() -> pd.DataFrame:
+    """Parameters and data center configuration of every known model, one row per model."""
+    rows = []
+    for record in get_catalog(filter_main=False):
+        provider, name = record.provider, record.name
+        config = PROVIDER_CONFIG_MAP.get(provider)
+        if config is None:
+            continue
+        active_min, active_max = _bounds(record.active_parameters)
+        total_min, total_max = _bounds(record.total_parameters)
+        pue_min, pue_max = _bounds(config.datacenter_pue)
+        wue_min, wue_max = _bounds(config.datacenter_wue)
+        rows.append({
+            "provider": provider,
+            "model": name,
+            "active_min": active_min,
+            "active_max": active_max,
+            "total_min": total_min,
+            "total_max": total_max,
+            "pue_min": pue_min,
+            "pue_max": pue_max,
+            "wue_min": wue_min,
+            "wue_max": wue_max,
+            "zone": config.datacenter_location or "WOR",
+        })
+    return pd.DataFrame(rows)
+
+
+@lru_cache(maxsize=1)
+def _mix_table() -> pd.DataFrame:
+    return pd.DataFrame(
+        [(em.zone, em.gwp, em.adpe, em.pe, em.wue) for em in electricity_mixes.list_electricity_mixes()],
+        columns=["zone", "mix_gwp", "mix_adpe", "mix_pe", "mix_wue"],
+    )
+
+
+def score_requests(requests: pd.DataFrame, electricity_mix_zone: str | None = None) -> pd.DataFrame:
+    """
+    Compute the impacts of every request of a DataFrame in a single batch evaluation.
+
+    Models are resolved with the same catalog as the calculator and missing latencies
+    are estimated with `LatencyEstimator.estimate_many`. An optional `zone` column
+    overrides the electricity mix of the provider for its row. Rows with an unknown
+    model or zone get NaN impacts and an `error` message, like `llm_impacts` returns
+    an error for them.
+    """
+    if "latency" not in requests.columns:
+        requests = requests.assign(latency=np.nan)
+    merged = requests[LOG_COLUMNS].merge(_model_table(), on=["provider", "model"], how="left")
+    if electricity_mix_zone is not None:
+        merged["zone"] = electricity_mix_zone
+    elif "zone" in requests.columns:
+        zones = requests["zone"].to_numpy()
+        merged["zone"] = np.where(pd.isna(zones), merged["zone"].to_numpy(), zones)
+    merged = merged.merge(_mix_table(), on="zone", how="left")
+
+    tokens = merged["output_tokens"].to_numpy(dtype=np.float64)
+    latency = merged["latency"].to_numpy(dtype=np.float64, copy=True)
+    missing = np.isnan(latency)
+    latency[missing] = latency_estimator.estimate_many(
+        merged["provider"].to_numpy()[missing], merged["model"].to_numpy()[missing], tokens[missing]
+    )
+
+    def evaluate(bound: str) -> BatchImpacts:
+        return compute_llm_impacts_batch(
+            model_active_parameter_count=merged[f"active_{bound}"].to_numpy(),
+            model_total_parameter_count=merged[f"total_{bound}"].to_numpy(),
+            output_token_count=tokens,
+            request_latency=latency,
+            if_electricity_mix_adpe=merged["mix_adpe"].to_numpy(),
+            if_electricity_mix_pe=merged["mix_pe"].to_numpy(),
+            if_electricity_mix_gwp=merged["mix_gwp"].to_numpy(),
+            if_electricity_mix_wue=merged["mix_wue"].to_numpy(),
+            datacenter_pue=merged[f"pue_{bound}"].to_numpy(),
+            datacenter_wue=merged[f"wue_{bound}"].to_numpy(),
+        )
+
+    low, high = evaluate("min"), evaluate("max")
+    mean = BatchImpacts.midpoint(low, high)
+
+    result = requests.copy()
+    result["latency"] = latency
+    for column in IMPACT_COLUMNS:
+        result[column] = getattr(mean, column)
+        result[f"{column}_min"] = getattr(low, column)
+        result[f"{column}_max"] = getattr(high, column)
+    for column in SPLIT_COLUMNS:
+        result[column] = getattr(mean, column)
+
+    error = pd.Series(None, index=result.index, dtype=object)
+    error[merged["active_min"].isna().to_numpy()] = "model-not-registered"
+    error[merged["mix_gwp"].isna().to_numpy() & error.isna().to_numpy()] = "zone-not-registered"
+    result["error"] = error
+    return result
+
+
+def score_chunks(
+        chunks: Iterable[pd.DataFrame],
+        electricity_mix_zone: str | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Lazily score every chunk with `score_requests`."""
+    for chunk in chunks:
+        yield score_requests(chunk, electricity_mix_zone=electricity_mix_zone)
+
+
+def score_logs(
+        input_path: str | Path,
+        output_path: str | Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        electricity_mix_zone: str | None = None,
+) -> int:
+    chunks = read_logs(input_path, chunk_size=chunk_size)
+    return write_results(score_chunks(chunks, electricity_mix_zone=electricity_mix_zone), output_path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compute the impacts of every request of a log file.")
+    parser.add_argument("input", help="CSV, JSONL or Parquet file with provider, model, output_tokens and latency columns")
+    parser.add_argument("output", help="CSV, JSONL or Parquet file to write the impacts to")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--zone", default=None, help="Electricity mix zone overriding the provider's default")
+    args = parser.parse_args(argv)
+
+    rows = score_logs(args.input, args.output, chunk_size=args.chunk_size, electricity_mix_zone=args.zone)
+    print(f"Scored {rows} requests into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,90 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import math
+import os
+import threading
 from pathlib import Path
 
+import numpy as np
+
 _BASE_PATH = Path(__file__).parent / "data" / "throughputs.json"
 
+# Throughputs file in use, e.g. one fitted from our logs with `python -m src.throughput_fit`
+THROUGHPUTS_PATH = Path(os.environ.get("ECOLOGITS_THROUGHPUTS", _BASE_PATH))
+
+# Percentiles of the throughput that can be stored as `throughput_p<percentile>`: the
+# 10th percentile of the throughput gives the 90th percentile of the latency.
+THROUGHPUT_PERCENTILES = (10, 50)
+
+_Table = dict[tuple[str, str], tuple[float, dict[int, float]]]
+
+
+def _is_throughput(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value > 0
+
+
+def load_throughputs(file_path: str | Path) -> _Table:
+    """Parse and validate a throughputs file, raises `ValueError` when it is malformed."""
+    with open(file_path, "r") as fd:
+        data = json.load(fd)
+
+    if not isinstance(data, dict) or not isinstance(data.get("models"), list):
+        raise ValueError(f"{file_path}: expected an object with a `models` list.")
+    table = {}
+    for el in data["models"]:
+        if not isinstance(el, dict) or not isinstance(el.get("provider"), str) or not isinstance(el.get("name"), str):
+            raise ValueError(f"{file_path}: every model needs a `provider` and a `name`, got {el!r}.")
+        fields = ["throughput"] + [f"throughput_p{p}" for p in THROUGHPUT_PERCENTILES if f"throughput_p{p}" in el]
+        for field in fields:
+            if not _is_throughput(el.get(field)):
+                raise ValueError(f"{file_path}: `{field}` of {el['provider']}/{el['name']} must be a positive number.")
+        percentiles = {p: el[f"throughput_p{p}"] for p in THROUGHPUT_PERCENTILES if f"throughput_p{p}" in el}
+        table[(el["provider"], el["name"])] = (el["throughput"], percentiles)
+    return table
+
 
 class LatencyEstimator:
     __DEFAULT_TPS = 80.0
 
     def __init__(self, file_path: str | Path) -> None:
-        with open(file_path, "r") as fd:
-            data = json.load(fd)
+        self.__path = file_path
+        # Loaded on first use, then replaced as a whole by `reload` and never modified:
+        # readers always see a consistent table
+        self.__table: _Table | None = None
+        self.__lock = threading.Lock()
+
+    def __loaded(self) -> _Table:
+        table = self.__table
+        if table is None:
+            with self.__lock:
+                if self.__table is None:
+                    self.__table = load_throughputs(self.__path)
+                table = self.__table
+        return table
+
+    def load(self) -> None:
+        """Load the throughputs file now rather than on first use, raises `ValueError` when it is malformed."""
+        self.__loaded()
+
+    def reload(self, file_path: str | Path) -> set[tuple[str, str]]:
+        """
+        Swap in the throughputs of a new file and return the (provider, model) whose
+        entry changed. The current table is kept when the file is invalid.
+        """
+        table = load_throughputs(file_path)
+        old, self.__table = self.__loaded(), table
+        return {key for key in old.keys() | table.keys() if old.get(key) != table.get(key)}
 
-        self.__throughputs = {}
-        for el in data["models"]:
-            self.__throughputs[(el["provider"], el["name"])] = el["throughput"]
+    @property
+    def version(self) -> str:
+        """Digest of the throughputs in use, changes when a reload changes them."""
+        return hashlib.sha256(repr(sorted(self.__loaded().items())).encode()).hexdigest()
 
     def get_throughput(self, provider: str, model_name: str) -> float:
-        return float(self.__throughputs.get((provider, model_name), self.__DEFAULT_TPS))
+        entry = self.__loaded().get((provider, model_name))
+        return float(entry[0] if entry is not None else self.__DEFAULT_TPS)
 
     def estimate(self,
                  provider: str,
@@ -26,8 +92,42 @@ class LatencyEstimator:
                  output_tokens: int,
                  throughput: float | None = None) -> float:
         if throughput is None:
-            throughput = self.__throughputs.get((provider, model_name), self.__DEFAULT_TPS)
+            throughput = self.get_throughput(provider, model_name)
+        return float(output_tokens / throughput)
+
+    def estimate_many(self, provider, model_name, output_tokens) -> np.ndarray:
+        """
+        Vectorized `estimate`: latencies of requests given arrays (or single values) of
+        providers, models and output tokens, with the throughputs of one table.
+        """
+        tokens = np.asarray(output_tokens, dtype=np.float64)
+        providers = np.broadcast_to(np.asarray(provider, dtype=object), tokens.shape)
+        models = np.broadcast_to(np.asarray(model_name, dtype=object), tokens.shape)
+        table = self.__loaded()
+        throughputs = {}
+        for key in zip(providers.flat, models.flat):
+            if key not in throughputs:
+                entry = table.get(key)
+                throughputs[key] = float(entry[0] if entry is not None else self.__DEFAULT_TPS)
+        throughput = np.fromiter(
+            (throughputs[key] for key in zip(providers.flat, models.flat)), dtype=np.float64, count=tokens.size
+        )
+        return tokens / throughput.reshape(tokens.shape)
+
+    def estimate_percentile(self,
+                            provider: str,
+                            model_name: str,
+                            output_tokens: int,
+                            percentile: int = 50) -> float:
+        """
+        Latency under which `percentile` % of the requests complete (50 or 90), from the
+        fitted throughput percentiles. Falls back to `estimate` for models without them.
+        """
+        entry = self.__loaded().get((provider, model_name))
+        throughput = entry[1].get(100 - percentile) if entry is not None else None
+        if throughput is None:
+            return self.estimate(provider, model_name, output_tokens)
         return float(output_tokens / throughput)
 
 
-latency_estimator = LatencyEstimator(file_path=_BASE_PATH)
+latency_estimator = LatencyEstimator(file_path=THROUGHPUTS_PATH)
@@ -0,0 +1,155 @@
+"""
+Monte Carlo estimation of the impacts of one request.
+
+Parameter counts, throughput, PUE and WUE are drawn from distributions and every
+sample is evaluated in a single call of the batch engine, which takes a few
+milliseconds for tens of thousands of samples.
+
+Active and total parameter counts are sampled with the same uniform draws
+(comonotonic sampling): a sample with a large active parameter count also has a large
+total parameter count, like the min and max bounds that ecologits computes for
+`RangeValue` parameters. The other inputs are sampled independently.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from ecologits.utils.range_value import RangeValue
+
+from src.engine import BatchImpacts, compute_llm_impacts_batch
+
+DEFAULT_SAMPLES = 50_000
+DEFAULT_PERCENTILES = (5., 25., 50., 75., 95.)
+CRITERIA = ["energy", "gwp", "adpe", "pe", "wcf"]
+
+
+#####################################################################################
+### DISTRIBUTIONS
+#####################################################################################
+
+
+@dataclass(frozen=True)
+class Fixed:
+    value: float
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        return np.full(u.shape, self.value, dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class Uniform:
+    low: float
+    high: float
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        return self.low + u * (self.high - self.low)
+
+
+@dataclass(frozen=True)
+class Triangular:
+    low: float
+    mode: float
+    high: float
+
+    def ppf(self, u: np.ndarray) -> np.ndarray:
+        width = self.high - self.low
+        if width == 0:
+            return np.full(u.shape, self.low, dtype=np.float64)
+        split = (self.mode - self.low) / width
+        return np.where(
+            u < split,
+            self.low + np.sqrt(u * width * (self.mode - self.low)),
+            self.high - np.sqrt((1 - u) * width * (self.high - self.mode)),
+        )
+
+
+Distribution = Fixed | Uniform | Triangular
+
+
+def distribution(value: float | RangeValue, spread: float = 0., kind: str = "uniform") -> Distribution:
+    """
+    Distribution of a value: its range for a `RangeValue`, `value ± spread` (relative)
+    otherwise, sampled uniformly or with a triangular distribution centered on the mean.
+    """
+    if isinstance(value, RangeValue):
+        low, high = float(value.min), float(value.max)
+    else:
+        low, high = float(value) * (1 - spread), float(value) * (1 + spread)
+    if low == high:
+        return Fixed(low)
+    if kind == "triangular":
+        return Triangular(low, (low + high) / 2, high)
+    return Uniform(low, high)
+
+
+#####################################################################################
+### SIMULATION
+#####################################################################################
+
+
+@dataclass
+class MonteCarloResult:
+    samples: BatchImpacts
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def mean(self, criterion: str) -> float:
+        return float(np.mean(getattr(self.samples, criterion)))
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES) -> dict[str, dict[float, float]]:
+        """Percentiles of every criterion, `{criterion: {percentile: value}}`."""
+        result = {}
+        for criterion in CRITERIA:
+            values = np.percentile(getattr(self.samples, criterion), percentiles)
+            result[criterion] = dict(zip(percentiles, values.tolist()))
+        return result
+
+    def histogram(self, criterion: str, bins: int = 50) -> tuple[np.ndarray, np.ndarray]:
+        """Counts and bin edges of the samples of a criterion."""
+        return np.histogram(getattr(self.samples, criterion), bins=bins)
+
+
+def run_monte_carlo(
+        active_parameters: Distribution,
+        total_parameters: Distribution,
+        throughput: Distribution,
+        datacenter_pue: Distribution,
+        datacenter_wue: Distribution,
+        output_tokens: int,
+        electricity_mix_gwp: float,
+        electricity_mix_adpe: float,
+        electricity_mix_pe: float,
+        electricity_mix_wue: float,
+        samples: int = DEFAULT_SAMPLES,
+        seed: int | None = None,
+) -> MonteCarloResult:
+    """
+    Sample the impacts of a request of `output_tokens` tokens.
+
+    The latency of every sample is `output_tokens / throughput`, as estimated by
+    `LatencyEstimator`. Total parameter counts are never lower than the active ones
+    and PUE never lower than 1.
+    """
+    rng = np.random.default_rng(seed)
+    u = rng.random(samples)
+    active = active_parameters.ppf(u)
+    total = np.maximum(total_parameters.ppf(u), active)
+    tps = throughput.ppf(rng.random(samples))
+    pue = np.maximum(datacenter_pue.ppf(rng.random(samples)), 1.)
+    wue = datacenter_wue.ppf(rng.random(samples))
+
+    impacts = compute_llm_impacts_batch(
+        model_active_parameter_count=active,
+        model_total_parameter_count=total,
+        output_token_count=output_tokens,
+        request_latency=output_tokens / tps,
+        if_electricity_mix_adpe=electricity_mix_adpe,
+        if_electricity_mix_pe=electricity_mix_pe,
+        if_electricity_mix_gwp=electricity_mix_gwp,
+        if_electricity_mix_wue=electricity_mix_wue,
+        datacenter_pue=pue,
+        datacenter_wue=wue,
+    )
+    return MonteCarloResult(samples=impacts)
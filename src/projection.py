@@ -0,0 +1,170 @@
+"""
+Impacts of a whole workload: a traffic mix of models served every day.
+
+A workload is a table with one row per model and location (`provider`, `model`,
+`requests_per_day`, `output_tokens` and the optional `tokens_spread` and `zone`).
+`output_tokens` is the mean number of output tokens of the requests and
+`tokens_spread` the relative uncertainty of that mean. With latencies estimated from
+the throughputs, the impacts of a request are linear in its output tokens, so the
+daily totals only depend on the token distribution through its mean.
+
+The impacts of one request of every row, at the lower, mean and upper output tokens,
+are computed in a single batch evaluation with the model and electricity mix tables
+of the calculator (see `src.ingestion.score_requests`) and scaled by the daily
+volumes. Projections compound a monthly growth rate per scenario.
+
+Usage:
+    python -m src.projection workload.csv --months 24 --growth 0 0.05 0.15 --output projection.csv
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion import IMPACT_COLUMNS, read_logs, score_requests, write_results
+from src.utils import DAYS_IN_YEAR
+
+WORKLOAD_COLUMNS = ["provider", "model", "requests_per_day", "output_tokens", "tokens_spread", "zone"]
+BOUND_COLUMNS = [f"{c}{suffix}" for c in IMPACT_COLUMNS for suffix in ("", "_min", "_max")]
+
+DAYS_IN_MONTH = DAYS_IN_YEAR / 12
+PERIODS = {"day": 1., "month": DAYS_IN_MONTH, "year": float(DAYS_IN_YEAR)}
+
+# Display units of workload totals, larger than the ones of a single request
+WORKLOAD_SCALES = {
+    "energy": (("GWh", 1e-6), ("MWh", 1e-3), ("kWh", 1.), ("Wh", 1e3)),
+    "gwp": (("ktCO2eq", 1e-6), ("tCO2eq", 1e-3), ("kgCO2eq", 1.), ("gCO2eq", 1e3)),
+    "adpe": (("kgSbeq", 1.), ("gSbeq", 1e3), ("mgSbeq", 1e6)),
+    "pe": (("TJ", 1e-6), ("GJ", 1e-3), ("MJ", 1.), ("kJ", 1e3)),
+    "wcf": (("ML", 1e-6), ("m³", 1e-3), ("L", 1.), ("mL", 1e3)),
+}
+
+
+@dataclass(frozen=True)
+class GrowthScenario:
+    name: str
+    monthly_growth: float  # relative growth of every request volume from one month to the next
+
+
+DEFAULT_SCENARIOS = (
+    GrowthScenario("Flat", 0.),
+    GrowthScenario("Steady (+5%/month)", 0.05),
+    GrowthScenario("Fast (+15%/month)", 0.15),
+)
+
+
+#####################################################################################
+### WORKLOAD
+#####################################################################################
+
+
+def _normalize(workload: pd.DataFrame) -> pd.DataFrame:
+    missing = [c for c in ("provider", "model", "requests_per_day", "output_tokens") if c not in workload.columns]
+    if missing:
+        raise ValueError(f"Workload is missing the columns {', '.join(missing)}.")
+    workload = workload.reset_index(drop=True)
+    if "tokens_spread" not in workload.columns:
+        workload = workload.assign(tokens_spread=0.)
+    if "zone" not in workload.columns:
+        workload = workload.assign(zone=None)
+    spread = workload["tokens_spread"].fillna(0.)
+    if ((spread < 0) | (spread > 1)).any():
+        raise ValueError("`tokens_spread` must be between 0 and 1.")
+    if (workload["requests_per_day"] < 0).any() or (workload["output_tokens"] < 0).any():
+        raise ValueError("Request volumes and output tokens must be positive.")
+    return workload.assign(tokens_spread=spread)
+
+
+def score_workload(workload: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily impacts of every row of a workload (kWh, kgCO2eq, kgSbeq, MJ, L).
+
+    The `_min` and `_max` bounds combine the ranges of the models with the uncertainty
+    of the output tokens. Rows with an unknown model or zone get NaN impacts and an
+    `error`, like `score_requests`.
+    """
+    workload = _normalize(workload)
+    n = len(workload)
+    tokens = workload["output_tokens"].to_numpy(dtype=np.float64)
+    spread = workload["tokens_spread"].to_numpy(dtype=np.float64)
+
+    # Lower, mean and upper tokens of every row, evaluated together
+    requests = pd.DataFrame({
+        "provider": np.tile(workload["provider"].to_numpy(), 3),
+        "model": np.tile(workload["model"].to_numpy(), 3),
+        "output_tokens": np.concatenate([tokens * (1 - spread), tokens, tokens * (1 + spread)]),
+        "zone": np.tile(workload["zone"].to_numpy(dtype=object), 3),
+    })
+    scored = score_requests(requests)
+    low, mean, high = scored.iloc[:n], scored.iloc[n:2 * n], scored.iloc[2 * n:]
+
+    volume = workload["requests_per_day"].to_numpy(dtype=np.float64)
+    result = workload[WORKLOAD_COLUMNS].copy()
+    for column in IMPACT_COLUMNS:
+        result[column] = mean[column].to_numpy() * volume
+        result[f"{column}_min"] = low[f"{column}_min"].to_numpy() * volume
+        result[f"{column}_max"] = high[f"{column}_max"].to_numpy() * volume
+    result["error"] = mean["error"].to_numpy()
+    return result
+
+
+def workload_totals(daily: pd.DataFrame) -> pd.DataFrame:
+    """Total requests and impacts of the valid rows of `score_workload`, one row per period."""
+    valid = daily[daily["error"].isna()]
+    sums = valid[["requests_per_day"] + BOUND_COLUMNS].sum().rename({"requests_per_day": "requests"})
+    totals = pd.DataFrame([sums * days for days in PERIODS.values()], index=list(PERIODS))
+    totals.index.name = "period"
+    return totals
+
+
+def project_workload(
+        daily: pd.DataFrame,
+        scenarios: tuple[GrowthScenario, ...] | list[GrowthScenario] = DEFAULT_SCENARIOS,
+        months: int = 12,
+) -> pd.DataFrame:
+    """
+    Monthly requests and impacts of a workload scored with `score_workload`, for
+    `months` months and every scenario. Month 1 is the first month at the current
+    volumes, then every month grows by the rate of the scenario.
+    """
+    monthly = workload_totals(daily).loc["month"]
+    rates = np.array([s.monthly_growth for s in scenarios], dtype=np.float64)
+    growth = (1 + rates)[:, None] ** np.arange(months)[None, :]
+
+    projection = pd.DataFrame(
+        growth.reshape(-1, 1) * monthly.to_numpy()[None, :],
+        columns=monthly.index,
+    )
+    projection.insert(0, "month", np.tile(np.arange(1, months + 1), len(scenarios)))
+    projection.insert(0, "scenario", np.repeat([s.name for s in scenarios], months))
+    return projection
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Project the impacts of a workload of models over time.")
+    parser.add_argument("input", help="CSV, JSONL or Parquet file with the columns " + ", ".join(WORKLOAD_COLUMNS))
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--growth", type=float, nargs="+", default=None,
+                        help="Monthly growth rates of the scenarios (0.05 = +5%% per month)")
+    parser.add_argument("--output", default=None, help="CSV, JSONL or Parquet file to write the monthly projection to")
+    args = parser.parse_args(argv)
+
+    workload = pd.concat(list(read_logs(args.input)), ignore_index=True)
+    daily = score_workload(workload)
+    for row in daily[daily["error"].notna()].itertuples():
+        print(f"Skipped {row.provider}/{row.model}: {row.error}")
+    print(workload_totals(daily).to_string())
+
+    if args.output:
+        scenarios = DEFAULT_SCENARIOS
+        if args.growth is not None:
+            scenarios = tuple(GrowthScenario(f"{rate:+.1%}/month", rate) for rate in args.growth)
+        rows = write_results([project_workload(daily, scenarios, args.months)], args.output)
+        print(f"Wrote {rows} monthly rows into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Fit the throughput of the models from observed request latencies.
+
+Reads logs of requests (`provider`, `model`, `output_tokens`, `latency` in seconds,
+CSV, JSONL or Parquet) chunk by chunk and updates streaming estimates of the
+throughput of every model: running totals of tokens and latencies and P² quantile
+sketches, so that no history is kept in memory. The result is written as a throughputs file that
+`LatencyEstimator` can load, with the percentiles used for p50/p90 latencies.
+
+Usage:
+    python -m src.throughput_fit logs/*.parquet --output throughputs.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.latency_estimator import THROUGHPUT_PERCENTILES, THROUGHPUTS_PATH
+
+DEFAULT_MIN_SAMPLES = 20
+SIGNIFICANT_DIGITS = 4
+
+
+def _round_throughput(value: float) -> float:
+    """Round to significant digits: rounding to a decimal would write 0 for very slow models."""
+    return float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P² algorithm (Jain & Chlamtac, 1985).
+
+    Keeps five markers whatever the number of observations.
+    """
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.count = 0
+        self.__heights: list[float] = []
+        self.__positions = [1., 2., 3., 4., 5.]
+        self.__desired = [1., 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.]
+        self.__increments = [0., p / 2, p, (1 + p) / 2, 1.]
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        q = self.__heights
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self.__positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.__desired[i] += self.__increments[i]
+
+        for i in range(1, 4):
+            d = self.__desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # Piecewise parabolic prediction, linear when it leaves the neighbours
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        if self.count == 0:
+            return math.nan
+        if self.count <= 5:
+            # Exact quantile of the few observations
+            return float(np.quantile(self.__heights, self.p))
+        return self.__heights[2]
+
+
+class ThroughputSketch:
+    """Throughput (tokens / s) of one model and percentiles of its per-request throughputs."""
+
+    def __init__(self, percentiles: Iterable[int] = THROUGHPUT_PERCENTILES) -> None:
+        self.count = 0
+        self.tokens = 0.
+        self.latency = 0.
+        self.quantiles = {p: P2Quantile(p / 100) for p in percentiles}
+
+    def add(self, output_tokens: float, latency: float) -> None:
+        self.count += 1
+        self.tokens += output_tokens
+        self.latency += latency
+        for quantile in self.quantiles.values():
+            quantile.add(output_tokens / latency)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Total tokens over total latency. Latencies are estimated as tokens / throughput,
+        and the mean of the per-request throughputs would overestimate it (Jensen).
+        """
+        return self.tokens / self.latency if self.latency > 0 else math.nan
+
+
+class ThroughputFitter:
+    def __init__(self) -> None:
+        self.sketches: dict[tuple[str, str], ThroughputSketch] = {}
+
+    def _sketch(self, provider: str, model_name: str) -> ThroughputSketch:
+        sketch = self.sketches.get((provider, model_name))
+        if sketch is None:
+            sketch = self.sketches[(provider, model_name)] = ThroughputSketch()
+        return sketch
+
+    def update(self, provider: str, model_name: str, output_tokens: int, latency: float) -> None:
+        if output_tokens > 0 and 0 < latency < math.inf:
+            self._sketch(provider, model_name).add(output_tokens, latency)
+
+    def update_logs(self, logs: pd.DataFrame) -> None:
+        """Update the sketches with a chunk of logs, rows without a valid latency are skipped."""
+        tokens = logs["output_tokens"].to_numpy(dtype=np.float64)
+        latency = logs["latency"].to_numpy(dtype=np.float64)
+        valid = (tokens > 0) & np.isfinite(tokens) & (latency > 0) & np.isfinite(latency)
+        for provider, model_name, output_tokens, request_latency in zip(
+                logs["provider"].to_numpy()[valid], logs["model"].to_numpy()[valid],
+                tokens[valid].tolist(), latency[valid].tolist()):
+            self._sketch(provider, model_name).add(output_tokens, request_latency)
+
+    def to_dict(self, base: dict | None = None, min_samples: int = DEFAULT_MIN_SAMPLES) -> dict:
+        """
+        Throughputs file content: the models of `base` updated with the fitted ones
+        that have at least `min_samples` observations.
+        """
+        models = {(m["provider"], m["name"]): dict(m) for m in (base or {"models": []})["models"]}
+        for (provider, model_name), sketch in self.sketches.items():
+            if sketch.count < min_samples:
+                continue
+            model = models.setdefault((provider, model_name), {"provider": provider, "name": model_name})
+            model["throughput"] = _round_throughput(sketch.throughput)
+            for p, quantile in sketch.quantiles.items():
+                model[f"throughput_p{p}"] = _round_throughput(quantile.value)
+            model["samples"] = sketch.count
+        return {"models": list(models.values())}
+
+
+def fit_throughputs(
+        paths: Iterable[str | Path],
+        base_path: str | Path | None = THROUGHPUTS_PATH,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        chunk_size: int = 100_000,
+) -> dict:
+    from src.ingestion import read_logs
+
+    fitter = ThroughputFitter()
+    for path in paths:
+        for chunk in read_logs(path, chunk_size=chunk_size):
+            fitter.update_logs(chunk)
+
+    base = None
+    if base_path is not None:
+        with open(base_path) as fd:
+            base = json.load(fd)
+    return fitter.to_dict(base=base, min_samples=min_samples)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit model throughputs from request latency logs.")
+    parser.add_argument("logs", nargs="+", help="CSV, JSONL or Parquet files with provider, model, output_tokens and latency columns")
+    parser.add_argument("--output", required=True, help="Throughputs JSON file to write")
+    parser.add_argument("--base", default=str(THROUGHPUTS_PATH), help="Throughputs file to update (use '' to start empty)")
+    parser.add_argument("--min-samples", type=int, default=DEFAULT_MIN_SAMPLES,
+                        help="Observations needed before a model's throughput is replaced")
+    args = parser.parse_args(argv)
+
+    data = fit_throughputs(args.logs, base_path=args.base or None, min_samples=args.min_samples)
+    with open(args.output, "w") as fd:
+        json.dump(data, fd, indent=4)
+    fitted = sum(1 for m in data["models"] if "samples" in m)
+    print(f"Wrote {len(data['models'])} models ({fitted} fitted from logs) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
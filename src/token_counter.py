@@ -0,0 +1,339 @@
+"""
+Streaming token counter for large texts and files.
+
+The text is cut into chunks on boundaries that tiktoken never merges across, so the
+count is the same as encoding the whole text at once. Chunks are encoded by a pool
+of threads (tiktoken releases the GIL) a few at a time and only their lengths are
+kept: memory stays bounded whatever the size of the input.
+
+Corpora (a directory of text files or a JSONL file) can be counted from the command
+line with several encodings in one pass, spread across a pool of processes:
+    python -m src.token_counter prompts/ --encodings cl100k_base,o200k_base --output counts.csv
+    python -m src.token_counter dataset.jsonl --fields prompt,completion --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+DEFAULT_CHUNK_SIZE = 1 << 18  # characters
+DEFAULT_THREADS = min(8, os.cpu_count() or 1)
+
+# Inputs smaller than this are encoded in one call
+SMALL_TEXT_SIZE = 64 * 1024
+
+ProgressCallback = Callable[[int, int | None], None]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
+
+
+def safe_boundary(text: str) -> int:
+    """
+    Index of the last position of `text` where it can be cut without changing the tokens.
+
+    tiktoken pre-splits the text with a regex before BPE and, in both cl100k_base and
+    o200k_base, no piece spans a line break followed by a letter or a digit, nor a
+    non-space character followed by a single space and a letter. Punctuation after a
+    line break is not a boundary: o200k_base keeps "\n/" in one piece. Returns 0 when
+    `text` has no such position.
+    """
+    i = text.rfind("\n", 0, len(text) - 1)
+    while i != -1:
+        if text[i + 1].isalnum():
+            return i + 1
+        i = text.rfind("\n", 0, i)
+
+    i = text.rfind(" ", 1, len(text) - 1)
+    while i != -1:
+        if not text[i - 1].isspace() and text[i + 1].isalpha():
+            return i
+        i = text.rfind(" ", 1, i)
+    return 0
+
+
+def _read_blocks(source: str | BinaryIO | TextIO, block_size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for start in range(0, len(source), block_size):
+            yield source[start:start + block_size]
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        yield decoder.decode(block) if isinstance(block, bytes) else block
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_chunks(source: str | BinaryIO | TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield the text of `source` as chunks of roughly `chunk_size` characters cut on safe
+    boundaries. A chunk can only be larger when the text has no safe boundary at all.
+    """
+    pending = ""
+    for block in _read_blocks(source, chunk_size):
+        pending += block
+        while len(pending) >= chunk_size:
+            cut = safe_boundary(pending[:chunk_size + 1])
+            if cut == 0:
+                cut = safe_boundary(pending)
+                if cut == 0:
+                    break
+            yield pending[:cut]
+            pending = pending[cut:]
+    if pending:
+        yield pending
+
+
+def _source_size(source: str | BinaryIO | TextIO) -> int | None:
+    if isinstance(source, str):
+        return len(source)
+    try:
+        position = source.tell()
+        size = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return size - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def count_tokens(
+        source: str | BinaryIO | TextIO,
+        encoding_name: str = DEFAULT_ENCODING,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        num_threads: int = DEFAULT_THREADS,
+        progress: ProgressCallback | None = None,
+) -> int:
+    """
+    Count the tokens of a text or of a (binary, UTF-8 or text) file object.
+
+    `progress` is called after every batch of chunks with the amount of input processed
+    so far and the total (characters for strings, bytes or characters for files, None
+    when the size of the file is unknown).
+    """
+    encoding = get_encoding(encoding_name)
+    if isinstance(source, str) and len(source) <= SMALL_TEXT_SIZE:
+        count = len(encoding.encode_ordinary(source))
+        if progress is not None:
+            progress(len(source), len(source))
+        return count
+
+    total = _source_size(source)
+    is_binary = not isinstance(source, str) and not isinstance(source, io.TextIOBase)
+    count = 0
+    processed = 0
+    batch: list[str] = []
+
+    def flush() -> None:
+        nonlocal count, processed
+        count += sum(len(tokens) for tokens in encoding.encode_ordinary_batch(batch, num_threads=num_threads))
+        processed += sum(len(chunk.encode("utf-8")) if is_binary else len(chunk) for chunk in batch)
+        batch.clear()
+        if progress is not None:
+            progress(min(processed, total) if total is not None else processed, total)
+
+    for chunk in iter_chunks(source, chunk_size=chunk_size):
+        batch.append(chunk)
+        if len(batch) >= num_threads:
+            flush()
+    if batch:
+        flush()
+    if progress is not None and total is not None:
+        progress(total, total)
+    return count
+
+
+#####################################################################################
+### CORPUS COUNTING
+#####################################################################################
+
+
+# Large files are split in ranges of about this many bytes, counted by different workers
+SPLIT_SIZE = 16 << 20
+JSONL_BATCH_SIZE = 1000
+
+
+def _split_points(path: Path, size: int, split_size: int) -> list[int]:
+    """
+    Offsets cutting a file in ranges of about `split_size` bytes. Files are only cut
+    after a line break followed by an ASCII letter or digit, a safe boundary (see
+    `safe_boundary`) that is also a character boundary in UTF-8.
+    """
+    points = [0]
+    with open(path, "rb") as fd:
+        target = split_size
+        while target < size:
+            fd.seek(target)
+            window = fd.read(64 * 1024)
+            for i in range(len(window) - 1):
+                if window[i] == 0x0A and window[i + 1] < 0x80 and chr(window[i + 1]).isalnum():
+                    points.append(target + i + 1)
+                    break
+            target = max(points[-1], target) + split_size
+    points.append(size)
+    return points
+
+
+def _count_range(path: str, start: int, end: int, encodings: tuple[str, ...]) -> dict[str, int]:
+    with open(path, "rb") as fd:
+        fd.seek(start)
+        text = fd.read(end - start).decode("utf-8", errors="replace")
+    return {name: count_tokens(text, name, num_threads=1) for name in encodings}
+
+
+def _count_texts(texts: list[str], encodings: tuple[str, ...]) -> dict[str, int]:
+    return {
+        name: sum(len(tokens) for tokens in get_encoding(name).encode_ordinary_batch(texts, num_threads=1))
+        for name in encodings
+    }
+
+
+def _bounded_submit(
+        executor: ProcessPoolExecutor,
+        tasks: Iterable[tuple[Any, Callable, tuple]],
+        max_pending: int,
+) -> Iterator[tuple[Any, Any]]:
+    """Submit `(key, fn, args)` tasks keeping at most `max_pending` in flight, yield `(key, result)`."""
+    pending: deque[tuple[Any, Future]] = deque()
+    for key, fn, args in tasks:
+        pending.append((key, executor.submit(fn, *args)))
+        if len(pending) >= max_pending:
+            key, future = pending.popleft()
+            yield key, future.result()
+    while pending:
+        key, future = pending.popleft()
+        yield key, future.result()
+
+
+def _directory_tasks(root: Path, pattern: str, encodings: tuple[str, ...], split_size: int):
+    paths = [root] if root.is_file() else sorted(p for p in root.rglob(pattern) if p.is_file())
+    for path in paths:
+        size = path.stat().st_size
+        points = _split_points(path, size, split_size) if size > split_size else [0, size]
+        for start, end in zip(points[:-1], points[1:]):
+            yield (str(path), ""), _count_range, (str(path), start, end, encodings), end - start
+
+
+def _jsonl_tasks(path: Path, fields: list[str] | None, encodings: tuple[str, ...], batch_size: int):
+    batches: dict[str, list[str]] = {}
+    with open(path, encoding="utf-8", errors="replace") as fd:
+        for line in fd:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for field, value in record.items():
+                if (fields is None or field in fields) and isinstance(value, str):
+                    batch = batches.setdefault(field, [])
+                    batch.append(value)
+                    if len(batch) >= batch_size:
+                        yield (str(path), field), _count_texts, (batch, encodings), sum(len(t.encode("utf-8")) for t in batch)
+                        batches[field] = []
+    for field, batch in batches.items():
+        if batch:
+            yield (str(path), field), _count_texts, (batch, encodings), sum(len(t.encode("utf-8")) for t in batch)
+
+
+def count_corpus(
+        source: str | Path,
+        encodings: Iterable[str] = (DEFAULT_ENCODING,),
+        workers: int | None = None,
+        pattern: str = "*",
+        fields: list[str] | None = None,
+        split_size: int = SPLIT_SIZE,
+        batch_size: int = JSONL_BATCH_SIZE,
+) -> list[dict[str, Any]]:
+    """
+    Count the tokens of a corpus with several encodings using a pool of processes.
+
+    `source` is a directory (every file matching `pattern`, recursively), a text file
+    or a JSONL file (the string values of `fields`, all of them by default). Returns
+    one row per file (and per field for JSONL) with its size in bytes and its number
+    of tokens for every encoding.
+    """
+    source = Path(source)
+    encodings = tuple(encodings)
+    for name in encodings:
+        get_encoding(name)  # fail early on unknown encodings
+
+    if source.is_file() and source.suffix.lower() in (".jsonl", ".ndjson"):
+        tasks = _jsonl_tasks(source, fields, encodings, batch_size)
+    else:
+        tasks = _directory_tasks(source, pattern, encodings, split_size)
+
+    sizes: dict[tuple[str, str], int] = {}
+
+    def submitted():
+        for key, fn, args, size in tasks:
+            sizes[key] = sizes.get(key, 0) + size
+            yield key, fn, args
+
+    rows: dict[tuple[str, str], dict[str, Any]] = {}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, counts in _bounded_submit(executor, submitted(), max_pending=2 * workers):
+            row = rows.setdefault(key, {"file": key[0], "field": key[1], "bytes": 0, **{name: 0 for name in encodings}})
+            for name, count in counts.items():
+                row[name] += count
+    for key, row in rows.items():
+        row["bytes"] = sizes[key]
+    return [rows[key] for key in sorted(rows)]
+
+
+def aggregate_counts(rows: list[dict[str, Any]], encodings: Iterable[str]) -> dict[str, Any]:
+    total = {"file": "TOTAL", "field": "", "bytes": sum(row["bytes"] for row in rows)}
+    for name in encodings:
+        total[name] = sum(row[name] for row in rows)
+    return total
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Count the tokens of a corpus with one or more tiktoken encodings.")
+    parser.add_argument("source", help="Directory of text files, text file or JSONL file")
+    parser.add_argument("--encodings", default=DEFAULT_ENCODING, help="Comma-separated tiktoken encodings")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (all cores by default)")
+    parser.add_argument("--glob", default="*", help="Pattern of the files to count in a directory")
+    parser.add_argument("--fields", default=None, help="Comma-separated JSONL fields to count (all string fields by default)")
+    parser.add_argument("--output", default=None, help="CSV or JSON file for the per-file counts (CSV on stdout by default)")
+    args = parser.parse_args(argv)
+
+    encodings = [e.strip() for e in args.encodings.split(",") if e.strip()]
+    fields = [f.strip() for f in args.fields.split(",")] if args.fields else None
+    rows = count_corpus(args.source, encodings, workers=args.workers, pattern=args.glob, fields=fields)
+    total = aggregate_counts(rows, encodings)
+
+    columns = ["file", "field", "bytes"] + encodings
+    if args.output and Path(args.output).suffix.lower() == ".json":
+        with open(args.output, "w") as fd:
+            json.dump({"files": rows, "total": total}, fd, indent=2)
+    else:
+        with open(args.output, "w", newline="") if args.output else sys.stdout as fd:
+            writer = csv.DictWriter(fd, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+            writer.writerow(total)
+    if args.output:
+        print(", ".join(f"{name}: {total[name]} tokens" for name in encodings) + f" in {total['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
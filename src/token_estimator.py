@@ -1,13 +1,27 @@
 import streamlit as st
-import tiktoken
 from .content import TOKEN_ESTIMATOR_TEXT
+from .debug import traced_fragment
+from .token_counter import DEFAULT_ENCODING, SMALL_TEXT_SIZE, count_tokens
+from .tracing import traced
 
 
+@traced()
 def num_tokens_from_string(string: str, encoding_name: str) -> int:
     """Returns the number of tokens in a text string."""
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, encoding_name)
+
+
+@traced("count_tokens")
+def _count_with_progress(source, label: str) -> int:
+    bar = st.progress(0.0, text=label)
+
+    def progress(processed: int, total: int | None) -> None:
+        if total:
+            bar.progress(min(processed / total, 1.0), text=label)
+
+    count = count_tokens(source, DEFAULT_ENCODING, progress=progress)
+    bar.empty()
+    return count
 
 
 def token_estimator():
@@ -21,10 +35,36 @@ def token_estimator():
         TOKEN_ESTIMATOR_TEXT
     )
 
+    _estimator()
+
+
+# Typing or uploading only reruns the estimator, not the whole app
+@traced_fragment
+def _estimator():
     user_text_input = st.text_area(
         "Type or paste some text to estimate the amount of tokens.",
         "EcoLogits is a great project!",
     )
+    uploaded_file = st.file_uploader(
+        "Or upload a text file.",
+        type=["txt", "md", "csv", "json", "jsonl", "html", "xml", "py"],
+    )
+
+    # Large inputs are counted once and remembered for the next reruns
+    counts = st.session_state.setdefault("token_counts", {})
+    if uploaded_file is not None:
+        key = ("file", uploaded_file.file_id)
+        if key not in counts:
+            counts[key] = _count_with_progress(uploaded_file, f"Counting tokens of {uploaded_file.name}...")
+        value = counts[key]
+    elif len(user_text_input) <= SMALL_TEXT_SIZE:
+        value = num_tokens_from_string(user_text_input, DEFAULT_ENCODING)
+    else:
+        key = ("text", hash(user_text_input))
+        if key not in counts:
+            counts.clear()
+            counts[key] = _count_with_progress(user_text_input, "Counting tokens...")
+        value = counts[key]
 
     _, col2, _ = st.columns([2, 1, 2])
 
@@ -32,6 +72,6 @@ def token_estimator():
         st.metric(
             label="tokens estimated amount",
             # label_visibility = 'hidden',
-            value=num_tokens_from_string(user_text_input, "cl100k_base"),
+            value=value,
             border=True,
         )
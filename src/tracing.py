@@ -0,0 +1,119 @@
+"""
+Lightweight tracing of the stages of a rerun.
+
+A trace is started for a rerun with `start_trace` and the stages inside it are timed
+with the `span` context manager or the `traced` decorator. Without a trace in
+progress, spans do nothing but one context variable lookup.
+
+Traces are enabled with `ECOLOGITS_TRACE=1` (or the `?debug` query parameter of the
+app) and appended to the JSONL file `ECOLOGITS_TRACE_FILE` when it is set.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+TRACE_ENABLED = os.environ.get("ECOLOGITS_TRACE", "").lower() in ("1", "true", "yes")
+TRACE_FILE = os.environ.get("ECOLOGITS_TRACE_FILE")
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # seconds since the start of the trace
+    duration: float
+    depth: int
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    timestamp: float = field(default_factory=time.time)
+    duration: float = 0.
+    spans: list[Span] = field(default_factory=list)
+    _origin: float = field(default_factory=time.perf_counter, repr=False)
+    _depth: int = field(default=0, repr=False)
+    _token: Any = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration": self.duration,
+            "spans": [asdict(s) for s in self.spans],
+        }
+
+
+_current: ContextVar[Trace | None] = ContextVar("ecologits_trace", default=None)
+_file_lock = threading.Lock()
+_NO_SPAN = nullcontext()
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+def start_trace(name: str) -> Trace:
+    trace = Trace(name=name)
+    trace._token = _current.set(trace)
+    return trace
+
+
+def finish_trace(trace: Trace, path: str | None = TRACE_FILE) -> Trace:
+    """Stop recording spans in `trace` and append it to the JSONL file `path` if given."""
+    trace.duration = time.perf_counter() - trace._origin
+    _current.reset(trace._token)
+    if path:
+        line = json.dumps(trace.to_dict()) + "\n"
+        with _file_lock, open(path, "a") as fd:
+            fd.write(line)
+    return trace
+
+
+@contextmanager
+def _span(trace: Trace, name: str, attributes: dict[str, Any]) -> Iterator[None]:
+    start = time.perf_counter()
+    depth = trace._depth
+    trace._depth += 1
+    try:
+        yield
+    finally:
+        trace._depth = depth
+        end = time.perf_counter()
+        trace.spans.append(Span(name, start - trace._origin, end - start, depth, attributes))
+
+
+def span(name: str, **attributes: Any):
+    """Time the enclosed block as a stage of the current trace, if any."""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _span(trace, name, attributes)
+
+
+def traced(name: str | None = None) -> Callable:
+    """Decorator timing every call of a function as a span named after it."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _span(trace, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,11 +1,10 @@
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
 from ecologits.impacts.modeling import Impacts, Energy, GWP, ADPe, PE, WCF, Usage, Embodied
 
 from pint import UnitRegistry, Quantity
-import streamlit as st
-import plotly.graph_objects as go
 
 #####################################################################################
 ### UNITS DEFINITION
@@ -113,12 +112,78 @@ IRELAND_POPULATION_MILLION = 5
 # 1.77t for one passenger (round-trip) x 100 passenger
 AIRPLANE_PARIS_NYC_GWP_EQ = q("177000 kgCO2eq")
 
+#####################################################################################
+### UNIT SCALING
+#####################################################################################
+
+# Display units of each criterion, from the largest to the smallest, with the factor to
+# convert from the ecologits unit (kWh, kgCO2eq, kgSbeq, MJ, L). A value is shown in the
+# first unit where it is at least 1, or in the smallest one.
+ENERGY_SCALES = (("kWh", 1.), ("Wh", 1e3), ("mWh", 1e6))
+GWP_SCALES = (("kgCO2eq", 1.), ("gCO2eq", 1e3), ("mgCO2eq", 1e6))
+ADPE_SCALES = (("kgSbeq", 1.), ("gSbeq", 1e3), ("mgSbeq", 1e6), ("µgSbeq", 1e9))
+PE_SCALES = (("MJ", 1.), ("kJ", 1e3))
+WCF_SCALES = (("L", 1.), ("mL", 1e3))
+
+IMPACTS_SCALES = {
+    "energy": ENERGY_SCALES,
+    "gwp": GWP_SCALES,
+    "adpe": ADPE_SCALES,
+    "pe": PE_SCALES,
+    "wcf": WCF_SCALES,
+}
+
+
+def scale_value(value: float, scales: tuple[tuple[str, float], ...]) -> tuple[float, str]:
+    """Float-only equivalent of the `format_*` helpers, returns (magnitude, unit)."""
+    for unit, factor in scales[:-1]:
+        magnitude = value * factor
+        if not magnitude < 1:
+            return magnitude, unit
+    unit, factor = scales[-1]
+    return value * factor, unit
+
+
+def scale_factor(unit: str, scales: tuple[tuple[str, float], ...]) -> float:
+    for scale_unit, factor in scales:
+        if scale_unit == unit:
+            return factor
+    raise ValueError(f"Unknown unit `{unit}`.")
+
+
+def scale_array(values, scales: tuple[tuple[str, float], ...]) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized `scale_value`, returns arrays of magnitudes and units."""
+    values = np.asarray(values, dtype=np.float64)
+    unit, factor = scales[-1]
+    magnitudes = values * factor
+    units = np.full(values.shape, unit, dtype=object)
+    chosen = np.zeros(values.shape, dtype=bool)
+    for unit, factor in scales[:-1]:
+        scaled = values * factor
+        pick = ~chosen & ~(scaled < 1)
+        magnitudes[pick] = scaled[pick]
+        units[pick] = unit
+        chosen |= pick
+    return magnitudes, units
+
+
+def format_impacts_batch(impacts: dict[str, np.ndarray]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Scale arrays of impacts (in ecologits units) keyed by criterion, e.g. `BatchImpacts.to_dict()`."""
+    return {
+        criterion: scale_array(impacts[criterion], scales)
+        for criterion, scales in IMPACTS_SCALES.items()
+        if criterion in impacts
+    }
+
+
 #####################################################################################
 ### IMPACTS FORMATING
 #####################################################################################
 
 
 def format_energy(energy_value: float, energy_unit = Energy(value=0.).unit) -> Quantity:
+    if energy_unit == ENERGY_SCALES[0][0]:
+        return q(*scale_value(energy_value, ENERGY_SCALES))
     val = q(energy_value, energy_unit)
     if val < q("1 kWh"):
         val = val.to("Wh")
@@ -128,6 +193,8 @@ def format_energy(energy_value: float, energy_unit = Energy(value=0.).unit) -> Q
  
 
 def format_gwp(gwp_value: float, gwp_unit = GWP(value=0.).unit) -> Quantity:
+    if gwp_unit == GWP_SCALES[0][0]:
+        return q(*scale_value(gwp_value, GWP_SCALES))
     val = q(gwp_value, gwp_unit)
     if val < q("1 kgCO2eq"):
         val = val.to("gCO2eq")
@@ -137,6 +204,8 @@ def format_gwp(gwp_value: float, gwp_unit = GWP(value=0.).unit) -> Quantity:
 
 
 def format_adpe(adpe_value: float, adpe_unit = ADPe(value=0.).unit) -> Quantity:
+    if adpe_unit == ADPE_SCALES[0][0]:
+        return q(*scale_value(adpe_value, ADPE_SCALES))
     val = q(adpe_value, adpe_unit)
     if val < q("1 kgSbeq"):
         val = val.to("gSbeq")
@@ -148,6 +217,8 @@ def format_adpe(adpe_value: float, adpe_unit = ADPe(value=0.).unit) -> Quantity:
 
 
 def format_pe(pe_value: float, pe_unit = PE(value=0.).unit) -> Quantity:
+    if pe_unit == PE_SCALES[0][0]:
+        return q(*scale_value(pe_value, PE_SCALES))
     val = q(pe_value, pe_unit)
     if val < q("1 MJ"):
         val = val.to("kJ")
@@ -155,12 +226,20 @@ def format_pe(pe_value: float, pe_unit = PE(value=0.).unit) -> Quantity:
 
 
 def format_wcf(wcf_value: float, wcf_unit = WCF(value=0.).unit) -> Quantity:
+    if wcf_unit == WCF_SCALES[0][0]:
+        return q(*scale_value(wcf_value, WCF_SCALES))
     val = q(wcf_value, wcf_unit)
     if val < q("1 L"):
         val = val.to("mL")
     return val
 
 
+def _format_range(value, scales) -> tuple[Quantity, Quantity, Quantity]:
+    magnitude, unit = scale_value(value.mean, scales)
+    factor = scale_factor(unit, scales)
+    return q(magnitude, unit), q(value.min * factor, unit), q(value.max * factor, unit)
+
+
 def format_impacts(impacts: Impacts) -> tuple[QImpacts, Usage, Embodied]:
     if isinstance(impacts.energy.value, float):
         return QImpacts(
@@ -172,28 +251,28 @@ def format_impacts(impacts: Impacts) -> tuple[QImpacts, Usage, Embodied]:
         ), impacts.usage, impacts.embodied
 
     else:
-        energy = format_energy(impacts.energy.value.mean)
-        gwp = format_gwp(impacts.gwp.value.mean)
-        adpe = format_adpe(impacts.adpe.value.mean)
-        pe = format_pe(impacts.pe.value.mean)
-        wcf = format_wcf(impacts.wcf.value.mean)
+        energy, energy_min, energy_max = _format_range(impacts.energy.value, ENERGY_SCALES)
+        gwp, gwp_min, gwp_max = _format_range(impacts.gwp.value, GWP_SCALES)
+        adpe, adpe_min, adpe_max = _format_range(impacts.adpe.value, ADPE_SCALES)
+        pe, pe_min, pe_max = _format_range(impacts.pe.value, PE_SCALES)
+        wcf, wcf_min, wcf_max = _format_range(impacts.wcf.value, WCF_SCALES)
 
         return QImpacts(
             energy=energy,
-            energy_min=format_energy(impacts.energy.value.min).to(energy.units),
-            energy_max=format_energy(impacts.energy.value.max).to(energy.units),
+            energy_min=energy_min,
+            energy_max=energy_max,
             gwp=gwp,
-            gwp_min=format_gwp(impacts.gwp.value.min).to(gwp.units),
-            gwp_max=format_gwp(impacts.gwp.value.max).to(gwp.units),
+            gwp_min=gwp_min,
+            gwp_max=gwp_max,
             adpe=adpe,
-            adpe_min=format_adpe(impacts.adpe.value.min).to(adpe.units),
-            adpe_max=format_adpe(impacts.adpe.value.max).to(adpe.units),
+            adpe_min=adpe_min,
+            adpe_max=adpe_max,
             pe=pe,
-            pe_min=format_pe(impacts.pe.value.min).to(pe.units),
-            pe_max=format_pe(impacts.pe.value.max).to(pe.units),
+            pe_min=pe_min,
+            pe_max=pe_max,
             wcf=wcf,
-            wcf_min=format_wcf(impacts.wcf.value.min).to(wcf.units),
-            wcf_max=format_wcf(impacts.wcf.value.max).to(wcf.units),
+            wcf_min=wcf_min,
+            wcf_max=wcf_max,
             ranges=True
         ), impacts.usage, impacts.embodied
 
@@ -262,7 +341,10 @@ def format_gwp_eq_airplane_paris_nyc(gwp: Quantity) -> Quantity:
 #####################################################################################
 
 def range_plot (mean_val, min_val, max_val, unit):
-    
+    # Imported here so that the formatting helpers above can be used without the UI stack
+    import streamlit as st
+    import plotly.graph_objects as go
+
     fig = go.Figure()
 
     # Background bar
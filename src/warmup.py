@@ -0,0 +1,169 @@
+"""
+Warm-up of the expensive, process-wide state before the first request is served.
+
+Loads the pint unit registry, the ecologits repositories, the model catalog and the
+tokenizer once, times every component and optionally fails when the whole startup
+goes over a time budget (in seconds, `ECOLOGITS_STARTUP_BUDGET` by default).
+
+Usage:
+    python -m src.warmup --budget 10
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET_ENV = "ECOLOGITS_STARTUP_BUDGET"
+
+
+class StartupBudgetExceeded(RuntimeError):
+    def __init__(self, report: StartupReport) -> None:
+        super().__init__(
+            f"Startup took {report.total:.3g}s, over the {report.budget:g}s budget.\n{report.format()}"
+        )
+        self.report = report
+
+
+@dataclass
+class StartupReport:
+    timings: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    budget: float | None = None
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.total > self.budget
+
+    def to_dict(self) -> dict:
+        return {"timings": self.timings, "errors": self.errors, "total": self.total, "budget": self.budget}
+
+    def format(self) -> str:
+        width = max([len(name) for name in self.timings] + [5])
+        lines = []
+        for name, duration in self.timings.items():
+            status = f"  ERROR: {self.errors[name]}" if name in self.errors else ""
+            lines.append(f"{name:<{width}}  {duration * 1000:9.1f} ms{status}")
+        budget = f" / {self.budget * 1000:.1f} ms budget" if self.budget is not None else ""
+        lines.append(f"{'total':<{width}}  {self.total * 1000:9.1f} ms{budget}")
+        return "\n".join(lines)
+
+
+#####################################################################################
+### WARM-UP STEPS
+#####################################################################################
+
+
+def warm_units() -> None:
+    from src.utils import IMPACTS_SCALES, q
+
+    # Pint parses units and builds conversion factors on first use only
+    for scales in IMPACTS_SCALES.values():
+        for unit, _ in scales:
+            q(1., scales[0][0]).to(unit)
+
+
+def warm_ecologits_repositories() -> None:
+    from ecologits.electricity_mix_repository import electricity_mixes
+    from ecologits.model_repository import models
+    from ecologits.tracers.utils import PROVIDER_CONFIG_MAP, llm_impacts
+
+    from src.electricity_mix import electricity_mix_table
+
+    electricity_mix_table()
+    for config in PROVIDER_CONFIG_MAP.values():
+        electricity_mixes.find_electricity_mix(config.datacenter_location or "WOR")
+    # First evaluation of the impacts DAG
+    model = models.list_models()[0]
+    llm_impacts(provider=model.provider.value, model_name=model.name, output_token_count=100, request_latency=1.)
+
+
+def warm_model_catalog() -> None:
+    from src.catalog import get_catalog
+
+    get_catalog(filter_main=True)
+    get_catalog(filter_main=False)
+
+
+def warm_latency_estimator() -> None:
+    from src.latency_estimator import latency_estimator
+
+    latency_estimator.load()
+
+
+def warm_tokenizer() -> None:
+    from src.token_counter import get_encoding
+
+    get_encoding("cl100k_base")
+
+
+WARMUP_STEPS: dict[str, Callable[[], None]] = {
+    "units": warm_units,
+    "ecologits_repositories": warm_ecologits_repositories,
+    "model_catalog": warm_model_catalog,
+    "latency_estimator": warm_latency_estimator,
+    "tokenizer": warm_tokenizer,
+}
+
+
+def _budget_from_env() -> float | None:
+    budget = os.environ.get(STARTUP_BUDGET_ENV)
+    return float(budget) if budget else None
+
+
+def warm_up(steps: dict[str, Callable[[], None]] | None = None, budget: float | None = None) -> StartupReport:
+    """
+    Run every warm-up step once and return the time spent in each of them.
+
+    A failing step is reported but does not stop the others. Raises
+    `StartupBudgetExceeded` when the total goes over `budget` seconds (read from
+    `ECOLOGITS_STARTUP_BUDGET` when not given).
+    """
+    if steps is None:
+        steps = WARMUP_STEPS
+    if budget is None:
+        budget = _budget_from_env()
+
+    report = StartupReport(budget=budget)
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            report.errors[name] = f"{type(e).__name__}: {e}"
+            logger.exception("Warm-up step `%s` failed", name)
+        report.timings[name] = time.perf_counter() - start
+
+    logger.info("Startup report:\n%s", report.format())
+    if report.over_budget:
+        raise StartupBudgetExceeded(report)
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Warm up the calculator and report the startup time.")
+    parser.add_argument("--budget", type=float, default=None, help="Fail when startup takes more seconds than this")
+    args = parser.parse_args(argv)
+
+    try:
+        report = warm_up(budget=args.budget)
+    except StartupBudgetExceeded as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(report.format())
+    if report.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from src.catalog import get_catalog
+from src.constants import IMPACTS_LABELS
+from src.debug import traced_fragment
+from src.electricity_mix import COUNTRY_CODES
+from src.projection import (
+    DEFAULT_SCENARIOS,
+    GrowthScenario,
+    PERIODS,
+    WORKLOAD_SCALES,
+    project_workload,
+    score_workload,
+    workload_totals,
+)
+from src.utils import scale_factor, scale_value
+from src.tracing import span
+
+PROVIDER_LOCATION = "Provider's data centers"
+
+DEFAULT_WORKLOAD = [
+    ("OpenAI", 20_000_000, 400, 20),
+    ("Anthropic", 5_000_000, 600, 20),
+    ("Mistral AI", 2_000_000, 300, 20),
+]
+
+
+def _model_label(provider_clean: str, name_clean: str) -> str:
+    return f"{provider_clean} · {name_clean}"
+
+
+def _format(value: float, low: float, high: float, criterion: str) -> str:
+    scales = WORKLOAD_SCALES[criterion]
+    magnitude, unit = scale_value(value, scales)
+    factor = scale_factor(unit, scales)
+    return f"{magnitude:.3g} {unit} ({low * factor:.3g} – {high * factor:.3g})"
+
+
+def workload_mode():
+    st.markdown("### 📈 Workload projection")
+    st.markdown(
+        "Impacts of a traffic mix of models served every day, per day, month and year, and how they grow over time. "
+        "Bounds combine the uncertainty on the model architectures and on the mean output tokens of the requests."
+    )
+
+    _workload()
+
+
+# Editing the workload only reruns this view, the breakdown and the projection are
+# fragments of their own that reuse the scored workload
+@traced_fragment
+def _workload():
+    with span("load_models"):
+        catalog = get_catalog(filter_main=True)
+    records = {_model_label(r.provider_clean, r.name_clean): r for r in catalog}
+    locations = {label: zone for label, zone in COUNTRY_CODES}
+
+    with st.container(border=True):
+        st.markdown("###### Configure the workload")
+
+        default_rows = [
+            {
+                "Model": _model_label(provider, catalog.models(provider)[0]),
+                "Requests per day": volume,
+                "Mean output tokens": tokens,
+                "Tokens uncertainty (± %)": spread,
+                "Location": PROVIDER_LOCATION,
+            }
+            for provider, volume, tokens, spread in DEFAULT_WORKLOAD
+            if provider in catalog.providers
+        ]
+        edited = st.data_editor(
+            pd.DataFrame(default_rows),
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            key="workload",
+            column_config={
+                "Model": st.column_config.SelectboxColumn(options=list(records), required=True),
+                "Requests per day": st.column_config.NumberColumn(min_value=0, step=1000, required=True),
+                "Mean output tokens": st.column_config.NumberColumn(min_value=0, required=True),
+                "Tokens uncertainty (± %)": st.column_config.NumberColumn(min_value=0, max_value=100, default=0),
+                "Location": st.column_config.SelectboxColumn(
+                    options=[PROVIDER_LOCATION] + list(locations), default=PROVIDER_LOCATION
+                ),
+            },
+        )
+
+    edited = edited.dropna(subset=["Model", "Requests per day", "Mean output tokens"])
+    if edited.empty:
+        st.info("Add at least one model to the workload.")
+        return
+
+    workload = pd.DataFrame({
+        "provider": [records[m].provider for m in edited["Model"]],
+        "model": [records[m].name for m in edited["Model"]],
+        "requests_per_day": edited["Requests per day"].to_numpy(dtype=float),
+        "output_tokens": edited["Mean output tokens"].to_numpy(dtype=float),
+        "tokens_spread": edited["Tokens uncertainty (± %)"].fillna(0).to_numpy(dtype=float) / 100,
+        "zone": [locations.get(location) for location in edited["Location"]],
+    })
+    labels = edited["Model"].to_list()
+
+    with span("score_workload"):
+        daily = score_workload(workload)
+        totals = workload_totals(daily)
+
+    for label, error in zip(labels, daily["error"]):
+        if not pd.isna(error):
+            st.warning(f"{label} is left out of the totals: {error}.", icon="⚠️")
+
+    with st.container(border=True):
+        st.markdown(
+            f'<h4 align="center">{totals.loc["day", "requests"]:,.0f} requests per day</h4>',
+            unsafe_allow_html=True,
+        )
+        rows = []
+        for criterion in ["energy", "gwp", "adpe", "pe", "wcf"]:
+            row = {"Criterion": IMPACTS_LABELS[criterion]}
+            for period in PERIODS:
+                total = totals.loc[period]
+                row[f"Per {period}"] = _format(
+                    total[criterion], total[f"{criterion}_min"], total[f"{criterion}_max"], criterion
+                )
+            rows.append(row)
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+        _breakdown(daily, totals, labels)
+
+    with st.expander("📈 Growth scenarios", expanded=True):
+        _growth_scenarios(daily)
+
+
+@traced_fragment
+def _breakdown(daily: pd.DataFrame, totals: pd.DataFrame, labels: list[str]):
+    breakdown_criterion = st.selectbox(
+        label="Yearly breakdown by model of",
+        options=["gwp", "energy", "adpe", "pe", "wcf"],
+        format_func=lambda c: IMPACTS_LABELS[c],
+    )
+    scales = WORKLOAD_SCALES[breakdown_criterion]
+    _, unit = scale_value(totals.loc["year", breakdown_criterion], scales)
+    valid = daily["error"].isna().to_numpy()
+    yearly = daily[breakdown_criterion] * PERIODS["year"] * scale_factor(unit, scales)
+    fig_breakdown = px.bar(
+        x=pd.Series(labels)[valid],
+        y=yearly[valid],
+        labels={"x": "Model", "y": f"{IMPACTS_LABELS[breakdown_criterion]} [{unit}]"},
+        color_discrete_sequence=["#00BF63"],
+    )
+    st.plotly_chart(fig_breakdown)
+
+
+@traced_fragment
+def _growth_scenarios(daily: pd.DataFrame):
+    with span("project_workload"):
+        scenarios_col, months_col = st.columns([2, 1])
+        with scenarios_col:
+            scenarios_table = st.data_editor(
+                pd.DataFrame({
+                    "Scenario": [s.name for s in DEFAULT_SCENARIOS],
+                    "Monthly growth (%)": [100 * s.monthly_growth for s in DEFAULT_SCENARIOS],
+                }),
+                num_rows="dynamic",
+                hide_index=True,
+                use_container_width=True,
+                key="growth_scenarios",
+            ).dropna()
+        with months_col:
+            months = st.slider("Months", 1, 60, 24)
+            projection_criterion = st.selectbox(
+                label="Projection of",
+                options=["gwp", "energy", "adpe", "pe", "wcf"],
+                format_func=lambda c: IMPACTS_LABELS[c],
+            )
+
+        scenarios = [
+            GrowthScenario(str(name), growth / 100)
+            for name, growth in zip(scenarios_table["Scenario"], scenarios_table["Monthly growth (%)"])
+        ]
+        if not scenarios:
+            st.info("Add at least one growth scenario.")
+            return
+
+        projection = project_workload(daily, scenarios, months)
+        scales = WORKLOAD_SCALES[projection_criterion]
+        _, unit = scale_value(projection[projection_criterion].max(), scales)
+        factor = scale_factor(unit, scales)
+        fig_projection = px.line(
+            x=projection["month"],
+            y=projection[projection_criterion] * factor,
+            color=projection["scenario"],
+            labels={"x": "Month", "y": f"{IMPACTS_LABELS[projection_criterion]} per month [{unit}]", "color": "Scenario"},
+        )
+        st.plotly_chart(fig_projection)
+
+        cumulative = projection.groupby("scenario", sort=False).sum(numeric_only=True)
+        st.dataframe(
+            pd.DataFrame({
+                "Scenario": cumulative.index.to_list(),
+                f"Requests over {months} months": [f"{r:,.0f}" for r in cumulative["requests"]],
+                f"{IMPACTS_LABELS[projection_criterion]} over {months} months": [
+                    _format(row[projection_criterion], row[f"{projection_criterion}_min"],
+                            row[f"{projection_criterion}_max"], projection_criterion)
+                    for _, row in cumulative.iterrows()
+                ],
+            }),
+            hide_index=True,
+            use_container_width=True,
+        )
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import src.cache as cache
+from src.cache import cached_format_impacts, cached_llm_impacts, impacts_cache, llm_data_version
+from src.datasources import reload_throughputs
+from src.disk_cache import DiskCache
+from src.latency_estimator import THROUGHPUTS_PATH
+
+CHANGED = ("openai", "gpt-4o")
+UNRELATED = ("openai", "gpt-4o-mini")
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    disk_cache = DiskCache(str(tmp_path / "cache.sqlite"))
+    disk_cache.set_version("test")
+    monkeypatch.setattr(cache, "_disk_cache", disk_cache)
+    monkeypatch.setattr("src.disk_cache.DISK_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    impacts_cache.clear()
+    yield disk_cache
+    impacts_cache.clear()
+
+
+def _formatted(provider, model, compute=None):
+    inputs = {"view": "calculator", "provider": provider, "model": model, "output_tokens": 400}
+    if compute is None:
+        def compute():
+            return cached_llm_impacts(provider=provider, model_name=model, output_token_count=400)
+    return cached_format_impacts(inputs, compute, llm_data_version(provider, model))
+
+
+def _fail():
+    raise AssertionError("recomputed")
+
+
+def test_reloading_one_throughput_keeps_the_entries_of_other_models(disk_cache, tmp_path):
+    _formatted(*CHANGED)
+    unrelated = _formatted(*UNRELATED)
+    assert len(disk_cache) == 2
+
+    with open(THROUGHPUTS_PATH) as fd:
+        data = json.load(fd)
+    for el in data["models"]:
+        if (el["provider"], el["name"]) == CHANGED:
+            el["throughput"] *= 2
+    path = tmp_path / "throughputs.json"
+    path.write_text(json.dumps(data))
+    try:
+        assert reload_throughputs(path) == {CHANGED}
+
+        # Unrelated model: still in memory, and on disk for the other processes
+        assert _formatted(*UNRELATED, compute=_fail) is unrelated
+        impacts_cache.clear()
+        assert _formatted(*UNRELATED, compute=_fail)[0].energy == unrelated[0].energy
+
+        # Changed model: recomputed with the new throughput
+        recomputed = []
+        _formatted(*CHANGED, compute=lambda: recomputed.append(1) or cached_llm_impacts(
+            provider=CHANGED[0], model_name=CHANGED[1], output_token_count=400))
+        assert recomputed and len(disk_cache) == 3
+    finally:
+        reload_throughputs(THROUGHPUTS_PATH)
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pytest
+from ecologits.impacts.llm import compute_llm_impacts
+
+from src.coefficients import ImpactCoefficients, extract_coefficients
+
+CONFIGURATIONS = 100
+REQUESTS = 20
+
+
+def _configurations():
+    rng = np.random.default_rng(1)
+    for _ in range(CONFIGURATIONS):
+        active = float(rng.uniform(1, 1000))
+        yield {
+            "model_active_parameter_count": active,
+            "model_total_parameter_count": active * float(rng.uniform(1, 8)),
+            "if_electricity_mix_adpe": float(rng.uniform(1e-9, 1e-7)),
+            "if_electricity_mix_pe": float(rng.uniform(1, 15)),
+            "if_electricity_mix_gwp": float(rng.uniform(0.01, 0.9)),
+            "if_electricity_mix_wue": float(rng.uniform(0, 5)),
+            "datacenter_pue": float(rng.uniform(1, 1.6)),
+            "datacenter_wue": float(rng.uniform(0, 2)),
+        }, rng.integers(1, 5000, REQUESTS).astype(np.float64), rng.uniform(1, 1000, REQUESTS)
+
+
+@pytest.mark.parametrize("configuration, tokens, throughputs", list(_configurations()))
+def test_coefficients_reconstruct_compute_llm_impacts(configuration, tokens, throughputs):
+    coefficients = extract_coefficients(**configuration)
+    # Latencies from well below to well above the generation latency, and unknown
+    latencies = np.append(tokens[:-1] / throughputs[:-1], math.inf)
+    batch = coefficients.evaluate(tokens, latencies)
+
+    for i, (output_tokens, latency) in enumerate(zip(tokens.tolist(), latencies.tolist())):
+        expected = compute_llm_impacts(output_token_count=output_tokens, request_latency=latency, **configuration)
+        impacts = coefficients.impacts(output_tokens, latency)
+        for criterion in ("energy", "gwp", "adpe", "pe", "wcf"):
+            value = getattr(expected, criterion).value
+            assert getattr(impacts, criterion).value == pytest.approx(value, rel=1e-9), criterion
+            assert getattr(batch, criterion)[i] == pytest.approx(value, rel=1e-9), criterion
+        for criterion in ("gwp", "adpe", "pe"):
+            assert getattr(impacts.embodied, criterion).value == pytest.approx(
+                getattr(expected.embodied, criterion).value, rel=1e-9)
+
+
+def test_coefficients_round_trip():
+    configuration, tokens, throughputs = next(_configurations())
+    coefficients = extract_coefficients(**configuration)
+    restored = ImpactCoefficients.from_dict(coefficients.to_dict())
+    np.testing.assert_array_equal(
+        restored.evaluate(tokens, tokens / throughputs).energy,
+        coefficients.evaluate(tokens, tokens / throughputs).energy,
+    )
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from ecologits.impacts.llm import compute_llm_impacts
+
+from src.engine import compute_llm_impacts_batch
+
+CONFIGURATIONS = 300
+
+
+@pytest.fixture(scope="module")
+def configurations() -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    active = rng.uniform(1, 1000, CONFIGURATIONS)
+    tokens = rng.integers(1, 5000, CONFIGURATIONS).astype(np.float64)
+    return {
+        "model_active_parameter_count": active,
+        "model_total_parameter_count": active * rng.uniform(1, 8, CONFIGURATIONS),
+        "output_token_count": tokens,
+        # From well below to well above the generation latency
+        "request_latency": tokens / rng.uniform(1, 1000, CONFIGURATIONS),
+        "if_electricity_mix_adpe": rng.uniform(1e-9, 1e-7, CONFIGURATIONS),
+        "if_electricity_mix_pe": rng.uniform(1, 15, CONFIGURATIONS),
+        "if_electricity_mix_gwp": rng.uniform(0.01, 0.9, CONFIGURATIONS),
+        "if_electricity_mix_wue": rng.uniform(0, 5, CONFIGURATIONS),
+        "datacenter_pue": rng.uniform(1, 1.6, CONFIGURATIONS),
+        "datacenter_wue": rng.uniform(0, 2, CONFIGURATIONS),
+    }
+
+
+def test_batch_matches_compute_llm_impacts(configurations):
+    batch = compute_llm_impacts_batch(**configurations)
+
+    for i in range(CONFIGURATIONS):
+        impacts = compute_llm_impacts(**{name: float(values[i]) for name, values in configurations.items()})
+        expected = {
+            "energy": impacts.energy.value,
+            "gwp": impacts.gwp.value,
+            "adpe": impacts.adpe.value,
+            "pe": impacts.pe.value,
+            "wcf": impacts.wcf.value,
+            "usage_gwp": impacts.usage.gwp.value,
+            "usage_adpe": impacts.usage.adpe.value,
+            "usage_pe": impacts.usage.pe.value,
+            "usage_wcf": impacts.usage.wcf.value,
+            "embodied_gwp": impacts.embodied.gwp.value,
+            "embodied_adpe": impacts.embodied.adpe.value,
+            "embodied_pe": impacts.embodied.pe.value,
+        }
+        for name, value in expected.items():
+            assert getattr(batch, name)[i] == pytest.approx(value, rel=1e-12), (i, name)
+
+
+def test_batch_of_one_request_broadcasts_scalars(configurations):
+    one = {name: float(values[0]) for name, values in configurations.items()}
+    batch = compute_llm_impacts_batch(**one)
+    assert len(batch) == 1
+    assert batch.energy[0] == pytest.approx(compute_llm_impacts(**one).energy.value, rel=1e-12)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.utils import (
+    IMPACTS_SCALES,
+    format_adpe,
+    format_energy,
+    format_gwp,
+    format_pe,
+    format_wcf,
+    q,
+    scale_array,
+    scale_value,
+)
+
+FORMATTERS = {
+    "energy": format_energy,
+    "gwp": format_gwp,
+    "adpe": format_adpe,
+    "pe": format_pe,
+    "wcf": format_wcf,
+}
+
+# Log-spaced values and the thresholds between units, in ecologits units
+VALUES = np.concatenate([np.geomspace(1e-13, 1e4, 3000), [1., 1e-3, 1e-6, 1e-9, 0.]])
+
+
+def _pint_format(value: float, scales) -> tuple[float, str]:
+    """Unit choice by comparing quantities with pint, as the `format_*` helpers did."""
+    val = q(value, scales[0][0])
+    for (unit, _), (smaller, _) in zip(scales, scales[1:]):
+        if val < q(f"1 {unit}"):
+            val = val.to(smaller)
+    return val.magnitude, str(val.units)
+
+
+@pytest.mark.parametrize("criterion", FORMATTERS)
+def test_scale_value_matches_pint(criterion):
+    scales = IMPACTS_SCALES[criterion]
+    for value in VALUES.tolist():
+        magnitude, unit = scale_value(value, scales)
+        expected_magnitude, expected_unit = _pint_format(value, scales)
+        assert str(q(1, unit).units) == expected_unit, value
+        assert magnitude == pytest.approx(expected_magnitude, rel=1e-12), value
+
+
+@pytest.mark.parametrize("criterion", FORMATTERS)
+def test_format_helpers_match_pint(criterion):
+    scales = IMPACTS_SCALES[criterion]
+    for value in VALUES[::10].tolist():
+        formatted = FORMATTERS[criterion](value)
+        expected_magnitude, expected_unit = _pint_format(value, scales)
+        assert str(formatted.units) == expected_unit, value
+        assert formatted.magnitude == pytest.approx(expected_magnitude, rel=1e-12), value
+
+
+@pytest.mark.parametrize("criterion", FORMATTERS)
+def test_scale_array_matches_scale_value(criterion):
+    scales = IMPACTS_SCALES[criterion]
+    magnitudes, units = scale_array(VALUES, scales)
+    for value, magnitude, unit in zip(VALUES.tolist(), magnitudes.tolist(), units.tolist()):
+        assert (magnitude, unit) == scale_value(value, scales)
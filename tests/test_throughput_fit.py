@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from src.latency_estimator import THROUGHPUT_PERCENTILES, load_throughputs
+from src.throughput_fit import ThroughputFitter
+
+
+@pytest.mark.parametrize("throughput", [0.01, 0.04, 7.25, 144.63, 12345.6])
+def test_fitted_throughputs_load_back(throughput, tmp_path):
+    fitter = ThroughputFitter()
+    for i in range(100):
+        tokens = 100 + i
+        fitter.update("openai", "slow-model", tokens, tokens / (throughput * (1 + (i % 5) / 100)))
+
+    path = tmp_path / "throughputs.json"
+    path.write_text(json.dumps(fitter.to_dict()))
+    fitted, percentiles = load_throughputs(path)[("openai", "slow-model")]
+
+    assert fitted == pytest.approx(throughput, rel=0.05)
+    assert set(percentiles) == set(THROUGHPUT_PERCENTILES)
+    for value in percentiles.values():
+        assert value == pytest.approx(throughput, rel=0.05)
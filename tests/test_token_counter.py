@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from src.token_counter import _split_points, count_corpus, count_tokens, get_encoding
+
+ENCODINGS = ["cl100k_base", "o200k_base"]
+
+
+def _encoding(name: str):
+    try:
+        return get_encoding(name)
+    except Exception as e:  # the BPE files are downloaded on first use
+        pytest.skip(f"Could not load {name}: {e}")
+
+
+def _punctuation_heavy_texts() -> list[str]:
+    rng = random.Random(0)
+    pieces = ["word", " ", "\n", "\r\n", "/", "!!", "12345", "é", "  ", "'s", "\t", "...", "-", "(", ")"]
+    return [
+        "a!\n/b " * 50_000,
+        "".join(rng.choice("ab1 \n\n/!?.,;:-'\"()[]{}\t") for _ in range(300_000)),
+        "".join(rng.choice(pieces) for _ in range(100_000)),
+    ]
+
+
+@pytest.mark.parametrize("encoding_name", ENCODINGS)
+def test_streamed_count_matches_encoding_the_whole_text(encoding_name):
+    encoding = _encoding(encoding_name)
+    for text in _punctuation_heavy_texts():
+        assert count_tokens(text, encoding_name, chunk_size=4096) == len(encoding.encode_ordinary(text))
+
+
+@pytest.mark.parametrize("encoding_name", ENCODINGS)
+def test_corpus_split_in_ranges_matches_encoding_the_whole_file(encoding_name, tmp_path):
+    encoding = _encoding(encoding_name)
+    text = "".join(_punctuation_heavy_texts())
+    path = tmp_path / "corpus.txt"
+    path.write_bytes(text.encode("utf-8"))
+
+    split_size = 64 * 1024
+    assert len(_split_points(path, path.stat().st_size, split_size)) > 3
+    rows = count_corpus(path, [encoding_name], workers=2, split_size=split_size)
+    assert rows[0][encoding_name] == len(encoding.encode_ordinary(text))